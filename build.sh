@@ -8,4 +8,5 @@ npm install
 npm run build:css
 
 python manage.py collectstatic --no-input
-python manage.py migrate
\ No newline at end of file
+python manage.py migrate
+python manage.py createcachetable
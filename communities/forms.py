@@ -1,14 +1,33 @@
 from django import forms
-from .models import Community, CommunityImage, CalendarEvent
+from .models import Community, CommunityImage, CalendarEvent, UserProfile
 
 class CalendarEventForm(forms.ModelForm):
     class Meta:
         model = CalendarEvent
-        fields = ['title', 'date', 'description', 'is_public']
+        fields = ['title', 'date', 'description', 'is_public', 'recurrence', 'recurrence_until']
         widgets = {
             'date': forms.DateInput(attrs={'type': 'date'}),
             'description': forms.Textarea(attrs={'rows': 3}),
+            'recurrence_until': forms.DateInput(attrs={'type': 'date'}),
         }
+        labels = {
+            'recurrence': 'Repeats',
+            'recurrence_until': 'Repeats until',
+        }
+
+    def clean(self):
+        cleaned_data = super().clean()
+        until = cleaned_data.get('recurrence_until')
+        if until and not cleaned_data.get('recurrence'):
+            cleaned_data['recurrence_until'] = None
+        elif until and cleaned_data.get('date') and until < cleaned_data['date']:
+            self.add_error('recurrence_until', "The event has to start before it stops repeating.")
+        return cleaned_data
+
+class TrainingGroupForm(forms.ModelForm):
+    class Meta:
+        model = UserProfile
+        fields = ['training_group', 'session_reminders']
 
 class MultipleFileInput(forms.ClearableFileInput):
     allow_multiple_selected = True
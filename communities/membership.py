@@ -0,0 +1,114 @@
+"""
+The signed-in user's community and the communities they manage, resolved
+once per request as request.membership. The result is kept in the user's
+session under a per-user version, so most requests answer "which community,
+and are they a manager?" without touching the database. Versions live in the
+shared cache; anything that changes a membership drops the user's version
+(see communities.signals), again once the change has committed, and the next
+request resolves it in a single query. A version the cache has lost is
+replaced by a new one, so losing it only costs a query.
+"""
+import uuid
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils.functional import SimpleLazyObject, cached_property
+
+from .models import Community, UserProfile
+
+SESSION_KEY = '_membership'
+
+
+def _version_key(user_id):
+    return f'membership-version:{user_id}'
+
+
+def _get_version(user_id):
+    return cache.get_or_set(_version_key(user_id), lambda: uuid.uuid4().hex, None)
+
+
+def invalidate_membership(*user_ids):
+    """Makes the users' next request resolve their membership again."""
+    keys = [_version_key(user_id) for user_id in user_ids if user_id]
+    cache.delete_many(keys)
+    # A request between now and the commit would store what it read before the
+    # change under a fresh version, so that one is dropped too
+    transaction.on_commit(partial(cache.delete_many, keys))
+
+
+class Membership:
+    """
+    A user's community (`community_id`, with the Community itself loaded on
+    first use) and the communities they manage, as {'id', 'slug', 'name'}
+    dicts for menus.
+    """
+
+    def __init__(self, community_id=None, managed=(), community=None):
+        self.community_id = community_id
+        self.managed = list(managed)
+        self.managed_ids = frozenset(item['id'] for item in self.managed)
+        if community is not None:
+            self.__dict__['community'] = community
+
+    @cached_property
+    def community(self):
+        if self.community_id is None:
+            return None
+        return Community.objects.filter(id=self.community_id).first()
+
+    @property
+    def is_manager(self):
+        """Whether the user manages their own community."""
+        return self.community_id in self.managed_ids
+
+    def manages(self, community):
+        return community is not None and community.id in self.managed_ids
+
+    @classmethod
+    def resolve(cls, user):
+        """Reads a user's membership with one query."""
+        communities = Community.objects.annotate(
+            is_managed=Exists(Community.managers.through.objects.filter(community_id=OuterRef('pk'), user_id=user.id)),
+            is_member=Exists(UserProfile.objects.filter(community_id=OuterRef('pk'), user_id=user.id)),
+        ).filter(Q(is_managed=True) | Q(is_member=True)).order_by('name')
+        community = None
+        managed = []
+        for row in communities:
+            if row.is_member:
+                community = row
+            if row.is_managed:
+                managed.append({'id': row.id, 'slug': row.slug, 'name': row.name})
+        return cls(community.id if community else None, managed, community=community)
+
+
+def get_membership(request):
+    user = request.user
+    if not user.is_authenticated:
+        return Membership()
+
+    version = _get_version(user.id)
+    stored = request.session.get(SESSION_KEY)
+    if stored and stored['user'] == user.id and stored['version'] == version:
+        return Membership(stored['community'], stored['managed'])
+
+    membership = Membership.resolve(user)
+    request.session[SESSION_KEY] = {
+        'user': user.id,
+        'version': version,
+        'community': membership.community_id,
+        'managed': membership.managed,
+    }
+    return membership
+
+
+class MembershipMiddleware:
+    """Sets request.membership, resolved the first time something reads it."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.membership = SimpleLazyObject(lambda: get_membership(request))
+        return self.get_response(request)
@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-19 01:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0009_community_vdot_group_a_community_vdot_group_b_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='training_group',
+            field=models.CharField(blank=True, choices=[('a', 'Group A'), ('b', 'Group B'), ('c', 'Group C')], help_text='The pace group this member usually runs with', max_length=1),
+        ),
+    ]
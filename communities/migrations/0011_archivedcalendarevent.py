@@ -0,0 +1,32 @@
+# Generated by Django 6.1.2 on 2026-10-19 01:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0010_userprofile_training_group'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedCalendarEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.PositiveIntegerField(unique=True)),
+                ('title', models.CharField(max_length=200)),
+                ('date', models.DateField()),
+                ('description', models.TextField(blank=True)),
+                ('is_public', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('community', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_calendar_events', to='communities.community')),
+            ],
+            options={
+                'ordering': ['date'],
+                'indexes': [models.Index(fields=['community', 'date'], name='communities_communi_49f42a_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 6.1.2 on 2026-10-19 02:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0011_archivedcalendarevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarEventException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='The date the occurrence would have fallen on.')),
+                ('cancelled', models.BooleanField(default=True)),
+                ('title', models.CharField(blank=True, max_length=200)),
+                ('description', models.TextField(blank=True)),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+        migrations.AddField(
+            model_name='calendarevent',
+            name='recurrence',
+            field=models.CharField(blank=True, choices=[('', 'Does not repeat'), ('weekly', 'Every week'), ('fortnightly', 'Every two weeks'), ('monthly', 'Every month')], default='', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='calendarevent',
+            name='recurrence_until',
+            field=models.DateField(blank=True, help_text='Last date a repeating event can fall on. Leave empty to repeat indefinitely.', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='calendarevent',
+            index=models.Index(fields=['community', 'recurrence', 'date'], name='communities_communi_424a3f_idx'),
+        ),
+        migrations.AddField(
+            model_name='calendareventexception',
+            name='event',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exceptions', to='communities.calendarevent'),
+        ),
+        migrations.AddConstraint(
+            model_name='calendareventexception',
+            constraint=models.UniqueConstraint(fields=('event', 'date'), name='unique_calendar_event_exception'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-19 02:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0012_recurring_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='session_reminders',
+            field=models.BooleanField(default=True, help_text='Email me the evening before a session or event'),
+        ),
+    ]
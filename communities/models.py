@@ -48,8 +48,16 @@ class CommunityImage(models.Model):
         return f"Gallery image for {self.community.name}"
 
 class UserProfile(models.Model):
+    TRAINING_GROUP_CHOICES = [
+        ('a', 'Group A'),
+        ('b', 'Group B'),
+        ('c', 'Group C'),
+    ]
+
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     community = models.ForeignKey(Community, on_delete=models.SET_NULL, null=True, blank=True, related_name='members')
+    training_group = models.CharField(max_length=1, choices=TRAINING_GROUP_CHOICES, blank=True, help_text="The pace group this member usually runs with")
+    session_reminders = models.BooleanField(default=True, help_text="Email me the evening before a session or event")
     
     def __str__(self):
         return f"{self.user.username}'s Profile"
@@ -65,15 +73,68 @@ def save_user_profile(sender, instance, **kwargs):
         instance.profile.save()
 
 class CalendarEvent(models.Model):
+    """
+    A calendar entry. A recurring event is stored once, as its first date and
+    rule, and expanded into occurrences for whatever window is being shown;
+    see communities.recurrence.
+    """
+    WEEKLY = 'weekly'
+    FORTNIGHTLY = 'fortnightly'
+    MONTHLY = 'monthly'
+    RECURRENCE_CHOICES = [
+        ('', 'Does not repeat'),
+        (WEEKLY, 'Every week'),
+        (FORTNIGHTLY, 'Every two weeks'),
+        (MONTHLY, 'Every month'),
+    ]
+
     community = models.ForeignKey(Community, on_delete=models.CASCADE, related_name='calendar_events')
     title = models.CharField(max_length=200)
     date = models.DateField()
     description = models.TextField(blank=True)
     is_public = models.BooleanField(default=False, help_text="If checked, regular community members can see this event.")
+    recurrence = models.CharField(max_length=12, choices=RECURRENCE_CHOICES, blank=True, default='')
+    recurrence_until = models.DateField(null=True, blank=True, help_text="Last date a repeating event can fall on. Leave empty to repeat indefinitely.")
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['date']
+        indexes = [models.Index(fields=['community', 'recurrence', 'date'])]
 
     def __str__(self):
         return f"{self.title} on {self.date}"
+
+class CalendarEventException(models.Model):
+    """One occurrence of a recurring event that is cancelled or differs from the rule."""
+    event = models.ForeignKey(CalendarEvent, on_delete=models.CASCADE, related_name='exceptions')
+    date = models.DateField(help_text="The date the occurrence would have fallen on.")
+    cancelled = models.BooleanField(default=True)
+    title = models.CharField(max_length=200, blank=True)
+    description = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'date'], name='unique_calendar_event_exception'),
+        ]
+
+    def __str__(self):
+        return f"{self.event.title} on {self.date} ({'cancelled' if self.cancelled else 'changed'})"
+
+class ArchivedCalendarEvent(models.Model):
+    """A past CalendarEvent moved out of the hot table, see session_planner.archive."""
+    original_id = models.PositiveIntegerField(unique=True)
+    community = models.ForeignKey(Community, on_delete=models.CASCADE, related_name='archived_calendar_events')
+    title = models.CharField(max_length=200)
+    date = models.DateField()
+    description = models.TextField(blank=True)
+    is_public = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['date']
+        indexes = [models.Index(fields=['community', 'date'])]
+
+    def __str__(self):
+        return f"{self.title} on {self.date} (archived)"
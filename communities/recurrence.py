@@ -0,0 +1,104 @@
+"""
+Expansion of recurring calendar events. A rule is stored once and only turned
+into dated occurrences for the window being displayed, so a weekly club run
+is one row plus a row per cancelled or changed week, and reading a window
+touches just the rules overlapping it and their exceptions there.
+"""
+import calendar
+import copy
+from datetime import date, timedelta
+
+from django.db.models import Prefetch, Q
+
+from .models import CalendarEvent, CalendarEventException
+
+RECURRENCE_WEEKS = {
+    CalendarEvent.WEEKLY: 1,
+    CalendarEvent.FORTNIGHTLY: 2,
+}
+
+
+def occurrence_dates(event, start, end):
+    """Dates the event falls on between start and end inclusive, before exceptions."""
+    if not event.recurrence:
+        if start <= event.date <= end:
+            yield event.date
+        return
+
+    last = min(end, event.recurrence_until) if event.recurrence_until else end
+    if event.recurrence == CalendarEvent.MONTHLY:
+        skipped = max(0, (start.year - event.date.year) * 12 + start.month - event.date.month)
+        index = event.date.year * 12 + event.date.month - 1 + skipped
+        while True:
+            year, month = divmod(index, 12)
+            month += 1
+            index += 1
+            if (year, month) > (last.year, last.month):
+                return
+            if event.date.day > calendar.monthrange(year, month)[1]:
+                # Monthly on the 31st skips the shorter months
+                continue
+            day = date(year, month, event.date.day)
+            if day > last:
+                return
+            if day >= start:
+                yield day
+    else:
+        step = 7 * RECURRENCE_WEEKS[event.recurrence]
+        day = event.date
+        if start > day:
+            day += timedelta(days=-(-(start - day).days // step) * step)
+        while day <= last:
+            yield day
+            day += timedelta(days=step)
+
+
+def _occurrence(event, day, exception=None):
+    """A copy of the event standing for one occurrence, dated and with any changes applied."""
+    occurrence = copy.copy(event)
+    occurrence.date = day
+    occurrence.series_date = event.date
+    if exception is not None:
+        occurrence.title = exception.title or event.title
+        # Left alone otherwise, so a copy of a deferred description stays deferred
+        if exception.description:
+            occurrence.description = exception.description
+    return occurrence
+
+
+def recurring_occurrences(queryset, start, end):
+    """Occurrences of the queryset's recurring events between start and end, by date."""
+    rules = queryset.exclude(recurrence='').filter(
+        Q(recurrence_until__isnull=True) | Q(recurrence_until__gte=start), date__lte=end,
+    ).prefetch_related(Prefetch(
+        'exceptions',
+        queryset=CalendarEventException.objects.filter(date__range=(start, end)),
+        to_attr='window_exceptions',
+    ))
+    occurrences = []
+    for event in rules:
+        exceptions = {exception.date: exception for exception in event.window_exceptions}
+        for day in occurrence_dates(event, start, end):
+            exception = exceptions.get(day)
+            if exception is not None and exception.cancelled:
+                continue
+            occurrences.append(_occurrence(event, day, exception))
+    occurrences.sort(key=lambda occurrence: (occurrence.date, occurrence.id))
+    return occurrences
+
+
+def events_between(queryset, start, end):
+    """Single events and recurring occurrences between start and end, by date."""
+    singles = list(queryset.filter(recurrence='', date__range=(start, end)))
+    return sorted([*singles, *recurring_occurrences(queryset, start, end)], key=lambda event: (event.date, event.id))
+
+
+def next_occurrence(queryset, day):
+    """The first single event or recurring occurrence on or after `day`."""
+    single = queryset.filter(recurrence='', date__gte=day).order_by('date').first()
+    # Nothing after the next single event can come first
+    end = single.date if single else day + timedelta(days=366)
+    candidates = recurring_occurrences(queryset, day, end)[:1]
+    if single is not None:
+        candidates.append(single)
+    return min(candidates, key=lambda event: event.date, default=None)
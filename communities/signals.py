@@ -0,0 +1,37 @@
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+
+from .membership import invalidate_membership
+from .models import Community, UserProfile
+
+
+@receiver(post_save, sender=UserProfile)
+def profile_changed(sender, instance, **kwargs):
+    invalidate_membership(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Community.managers.through)
+def managers_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # The cleared managers are only known before they are removed
+        if reverse:
+            invalidate_membership(instance.id)
+        else:
+            invalidate_membership(*instance.managers.values_list('id', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        invalidate_membership(*([instance.id] if reverse else pk_set))
+
+
+@receiver(post_save, sender=Community)
+def community_renamed(sender, instance, created, **kwargs):
+    # Managers' menus show the community's name and slug
+    if not created:
+        invalidate_membership(*instance.managers.values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Community)
+def community_deleted(sender, instance, **kwargs):
+    invalidate_membership(
+        *instance.managers.values_list('id', flat=True),
+        *instance.members.values_list('user_id', flat=True),
+    )
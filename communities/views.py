@@ -1,10 +1,12 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
-from .models import Community, CommunityImage, CalendarEvent
+from .models import Community, CommunityImage, CalendarEvent, CalendarEventException
 from .forms import CommunityForm, CalendarEventForm
+from .recurrence import next_occurrence, occurrence_dates
 from merch.models import MerchItem
 from session_planner.models import Session
+from session_planner.projections import community_group_vdots, get_block_projection
 
 def community_list_view(request):
     communities = Community.objects.all()
@@ -19,28 +21,28 @@ def community_detail_view(request, slug):
         item.size_list = [s.strip() for s in item.available_sizes.split(',')]
         item.color_list = [c.strip() for c in item.available_colors.split(',')]
         
-    is_manager = request.user in community.managers.all()
+    membership = request.membership
+    is_manager = membership.manages(community)
     
     # Get the next scheduled workout
     next_session = community.sessions.filter(date__gte=timezone.now().date()).order_by('date').first()
     
     # Get the next calendar event
-    event_qs = community.calendar_events.filter(date__gte=timezone.now().date()).order_by('date')
+    event_qs = community.calendar_events.all()
     if not is_manager:
         event_qs = event_qs.filter(is_public=True)
-    next_event = event_qs.first()
+    next_event = next_occurrence(event_qs, timezone.now().date())
     
     # Check if visitor is a member of this community
-    is_member = False
-    if request.user.is_authenticated and hasattr(request.user, 'profile'):
-        is_member = request.user.profile.community == community
+    is_member = membership.community_id == community.id
 
     # Check if visitor is a manager of *another* community
-    is_visitor_manager = False
-    if request.user.is_authenticated and not is_manager:
-        is_visitor_manager = request.user.managed_communities_set.exclude(id=community.id).exists()
+    is_visitor_manager = not is_manager and bool(membership.managed_ids)
 
-    tradeable_blocks = community.training_blocks.filter(is_tradeable=True)
+    tradeable_blocks = community.training_blocks.filter(is_tradeable=True).order_by('-copy_count', '-created_at').prefetch_related('templates')
+    group_vdots = community_group_vdots(community)
+    for block in tradeable_blocks:
+        block.projection = get_block_projection(block, group_vdots, templates=block.templates.all())
 
     return render(request, 'communities/community_detail.html', {
         'community': community,
@@ -56,7 +58,7 @@ def community_detail_view(request, slug):
 @login_required
 def create_calendar_event_view(request, slug):
     community = get_object_or_404(Community, slug=slug)
-    if request.user not in community.managers.all():
+    if not request.membership.manages(community):
         return redirect('community-detail', slug=slug)
 
     if request.method == 'POST':
@@ -75,10 +77,32 @@ def create_calendar_event_view(request, slug):
     
     return render(request, 'communities/create_event.html', {'form': form, 'community': community})
 
+@login_required
+def cancel_event_occurrence_view(request, slug, pk, date):
+    """Skips one occurrence of a repeating event, e.g. no club run on a race weekend."""
+    from datetime import datetime
+    from django.http import HttpResponse
+
+    community = get_object_or_404(Community, slug=slug)
+    if not request.membership.manages(community):
+        return redirect('community-detail', slug=slug)
+    if request.method != 'POST':
+        return HttpResponse("Method not allowed", status=405)
+    event = get_object_or_404(CalendarEvent, pk=pk, community=community)
+    try:
+        day = datetime.strptime(date, '%Y-%m-%d').date()
+    except ValueError:
+        return HttpResponse("Invalid date", status=400)
+    if day not in occurrence_dates(event, day, day):
+        return HttpResponse("The event doesn't fall on that date", status=400)
+
+    CalendarEventException.objects.update_or_create(event=event, date=day, defaults={'cancelled': True})
+    return redirect('session-list')
+
 @login_required
 def community_edit_view(request, slug):
     community = get_object_or_404(Community, slug=slug)
-    if request.user not in community.managers.all():
+    if not request.membership.manages(community):
         return redirect('community-detail', slug=slug)
         
     all_merch = community.merch_items.all()
@@ -2,6 +2,23 @@ import pytest
 from django.contrib.auth.models import User
 from communities.models import Community, UserProfile
 
+@pytest.fixture(autouse=True)
+def _process_local_cache(settings):
+    # Deployments share a database or Redis cache between workers; a single test
+    # process doesn't need one, and query counts stay about the code under test
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+@pytest.fixture(autouse=True)
+def _immediate_tasks(settings):
+    # Tests run enqueued tasks inline instead of waiting on a db_worker
+    settings.TASKS = {'default': {'BACKEND': 'django.tasks.backends.immediate.ImmediateBackend'}}
+
+@pytest.fixture(autouse=True)
+def _temporary_media_root(settings, tmp_path):
+    # Saving a session renders its share cards, and merch tests upload images;
+    # neither should land in the project's media directory
+    settings.MEDIA_ROOT = tmp_path / 'media'
+
 @pytest.fixture
 def test_password():
     return "strong-test-pass"
@@ -0,0 +1,52 @@
+"""
+Moves delivered orders out of Order and OrderItem into ArchivedOrder, one batch
+per transaction. Order history views read both.
+"""
+from django.db import transaction
+
+from .models import ArchivedOrder, Order
+
+
+def archive_order_batch(batch_size):
+    """Archives up to batch_size delivered orders. Returns how many were moved."""
+    with transaction.atomic():
+        batch = list(
+            Order.objects.filter(status='DELIVERED').select_for_update()
+            .prefetch_related('order_items__item').order_by('id')[:batch_size]
+        )
+        if not batch:
+            return 0
+        archived = ArchivedOrder.objects.bulk_create([
+            ArchivedOrder(
+                original_id=order.id,
+                user_id=order.user_id,
+                customer_name=order.customer_name,
+                customer_email=order.customer_email,
+                shipping_address=order.shipping_address,
+                base_cost=order.base_cost,
+                split_shipping_cost=order.split_shipping_cost,
+                stripe_invoice_id=order.stripe_invoice_id,
+                status=order.status,
+                items=[
+                    {
+                        'item_id': line.item_id,
+                        'name': line.item.name,
+                        'size': line.size,
+                        'color': line.color,
+                        'quantity': line.quantity,
+                        'price_at_order': str(line.price_at_order),
+                    }
+                    for line in order.order_items.all()
+                ],
+                created_at=order.created_at,
+            )
+            for order in batch
+        ])
+        Through = ArchivedOrder.communities.through
+        Through.objects.bulk_create([
+            Through(archivedorder_id=archived_order.id, community_id=community_id)
+            for order, archived_order in zip(batch, archived)
+            for community_id in {line.item.community_id for line in order.order_items.all()}
+        ])
+        Order.objects.filter(id__in=[order.id for order in batch]).delete()
+    return len(batch)
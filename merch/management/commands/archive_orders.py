@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from merch.archive import archive_order_batch
+
+
+class Command(BaseCommand):
+    help = "Moves delivered orders into the order archive. Order history pages read both."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.ARCHIVE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        total = 0
+        while archived := archive_order_batch(options['batch_size']):
+            total += archived
+        self.stdout.write(self.style.SUCCESS(f"Archived {total} orders."))
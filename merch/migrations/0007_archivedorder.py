@@ -0,0 +1,39 @@
+# Generated by Django 6.1.2 on 2026-10-19 01:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0011_archivedcalendarevent'),
+        ('merch', '0006_alter_order_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.PositiveIntegerField(unique=True)),
+                ('customer_name', models.CharField(max_length=255)),
+                ('customer_email', models.EmailField(max_length=254)),
+                ('shipping_address', models.TextField(default='')),
+                ('base_cost', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('split_shipping_cost', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('stripe_invoice_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('status', models.CharField(choices=[('PENDING_INVOICE', 'Pending Invoice Calculation'), ('DRAFT_GENERATED', 'Draft Invoice Generated'), ('PAID_AWAITING_PRINT', 'Paid - Awaiting Print'), ('SENT_TO_MANUFACTURER', 'Sent to Manufacturer'), ('RECEIVED_FROM_MANUFACTURER', 'Received from Manufacturer'), ('DELIVERED', 'Delivered'), ('PAYMENT_FAILED', 'Payment Failed')], max_length=50)),
+                ('items', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('communities', models.ManyToManyField(related_name='archived_orders', to='communities.community')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_merch_orders', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
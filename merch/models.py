@@ -59,3 +59,34 @@ class OrderItem(models.Model):
     color = models.CharField(max_length=50)
     quantity = models.PositiveIntegerField(default=1)
     price_at_order = models.DecimalField(max_digits=10, decimal_places=2)
+
+class ArchivedOrder(models.Model):
+    """
+    A delivered order moved out of Order by the archive_orders command. Its lines
+    are kept inline as [{item_id, name, size, color, quantity, price_at_order}]
+    and the communities whose items it contained are kept for manager views.
+    See merch.archive.
+    """
+    original_id = models.PositiveIntegerField(unique=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_merch_orders')
+    communities = models.ManyToManyField(Community, related_name='archived_orders')
+    customer_name = models.CharField(max_length=255)
+    customer_email = models.EmailField()
+    shipping_address = models.TextField(default="")
+    base_cost = models.DecimalField(max_digits=10, decimal_places=2)
+    split_shipping_cost = models.DecimalField(max_digits=10, decimal_places=2)
+    stripe_invoice_id = models.CharField(max_length=255, blank=True, null=True)
+    status = models.CharField(max_length=50, choices=Order.STATUS_CHOICES)
+    items = models.JSONField(default=list)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Order #{self.original_id} - {self.customer_name} (archived)"
+
+    @property
+    def item_count(self):
+        return len(self.items)
@@ -152,3 +152,70 @@ class OrderFulfillmentTest(TestCase):
         self.order.refresh_from_db()
         self.assertEqual(self.order.status, 'PAID_AWAITING_PRINT')
 
+
+class CheckoutIdempotencyTest(TestCase):
+    def setUp(self):
+        self.community = Community.objects.create(name='Checkout Comm')
+        self.item = MerchItem.objects.create(
+            community=self.community, name='Singlet', price=30.00,
+            available_sizes='S', available_colors='Black'
+        )
+        self.client = Client()
+        self.client.post(reverse('add-to-cart'), {'item_id': self.item.id, 'size': 'S', 'color': 'Black'})
+
+    def test_repeated_checkout_creates_one_order(self):
+        from merch.models import Order
+        data = {
+            'customer_name': 'Runner', 'customer_email': 'runner@example.com',
+            'shipping_address': '1 Track Lane', 'idempotency_key': 'checkout-once',
+        }
+        first = self.client.post(reverse('checkout'), data)
+        second = self.client.post(reverse('checkout'), data)
+
+        self.assertContains(first, 'Thank you')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(Order.objects.filter(customer_email='runner@example.com').count(), 1)
+
+class OrderArchiveTest(TestCase):
+    def setUp(self):
+        from merch.models import Order, OrderItem
+        self.user = User.objects.create_user(username='buyer', password='password123')
+        self.manager = User.objects.create_user(username='archive_manager', password='password123')
+        self.community = Community.objects.create(name='Archive Merch')
+        self.community.managers.add(self.manager)
+        item = MerchItem.objects.create(
+            community=self.community, name='Vest', price=25.00, available_sizes='M', available_colors='Red'
+        )
+        self.delivered = Order.objects.create(user=self.user, customer_email='buyer@example.com', base_cost=25, status='DELIVERED')
+        OrderItem.objects.create(order=self.delivered, item=item, size='M', color='Red', price_at_order=25)
+        self.open = Order.objects.create(user=self.user, customer_email='buyer@example.com', base_cost=25, status='PAID_AWAITING_PRINT')
+        OrderItem.objects.create(order=self.open, item=item, size='M', color='Red', price_at_order=25)
+        self.client = Client()
+
+    def test_delivered_orders_are_archived_and_still_listed(self):
+        from django.core.management import call_command
+        from merch.models import ArchivedOrder, Order, OrderItem
+        call_command('archive_orders', stdout=io.StringIO())
+
+        self.assertEqual(list(Order.objects.values_list('id', flat=True)), [self.open.id])
+        self.assertFalse(OrderItem.objects.filter(order_id=self.delivered.id).exists())
+        archived = ArchivedOrder.objects.get()
+        self.assertEqual(archived.original_id, self.delivered.id)
+        self.assertEqual(archived.items[0]['name'], 'Vest')
+        self.assertEqual(list(archived.communities.all()), [self.community])
+
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(reverse('user-orders')), f'Order #{self.delivered.id}')
+        self.client.force_login(self.manager)
+        response = self.client.get(reverse('manage-orders', kwargs={'slug': self.community.slug}))
+        self.assertContains(response, 'Archived Orders (1)')
+
+        # The archived rows themselves are fetched when the list is opened
+        url = reverse('archived-orders', kwargs={'slug': self.community.slug})
+        self.assertContains(response, url)
+        response = self.client.get(url)
+        self.assertContains(response, '£25.00')
+        self.assertNotContains(response, 'Show More')
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 403)
@@ -1,11 +1,12 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.http import HttpResponse, HttpResponseForbidden
 from django.views.decorators.http import require_POST
-from .models import MerchItem, Order, OrderItem, MerchImage
+from .models import ArchivedOrder, MerchItem, Order, OrderItem, MerchImage
 from .forms import OrderForm, MerchItemForm
 from django.contrib import messages
 from communities.models import Community
 from django.contrib.auth.decorators import login_required
+from workouts.idempotency import idempotent
 
 def add_to_cart_view(request):
     if request.method == 'POST':
@@ -34,6 +35,7 @@ def remove_from_cart_view(request, index):
         
     return redirect('checkout')
 
+@idempotent
 def checkout_view(request):
     cart = request.session.get('cart', [])
     items = []
@@ -101,13 +103,14 @@ def user_orders_view(request):
     
     return render(request, 'merch/user_orders.html', {
         'active_orders': active_orders,
-        'past_orders': past_orders
+        'past_orders': past_orders,
+        'archived_orders': ArchivedOrder.objects.filter(user=request.user),
     })
 
 @login_required
 def add_merch_view(request, slug):
     community = get_object_or_404(Community, slug=slug)
-    if request.user not in community.managers.all():
+    if not request.membership.manages(community):
         return redirect('community-detail', slug=slug)
 
     if request.method == 'POST':
@@ -134,7 +137,7 @@ from decimal import Decimal
 @login_required
 def manage_orders_view(request, slug):
     community = get_object_or_404(Community, slug=slug)
-    if request.user not in community.managers.all():
+    if not request.membership.manages(community):
         return HttpResponseForbidden("You are not the manager of this community.")
     
     # Get all unique orders that have items belonging to this community
@@ -148,14 +151,33 @@ def manage_orders_view(request, slug):
         'community': community,
         'pending_orders': pending_orders,
         'released_orders': released_orders,
+        'archived_count': ArchivedOrder.objects.filter(communities=community).count(),
     }
     return render(request, 'merch/manage_orders.html', context)
 
+ARCHIVED_ORDERS_PAGE_SIZE = 25
+
+@login_required
+def archived_orders_view(request, slug):
+    """A page of the community's archived orders, loaded when the manage page's list is opened."""
+    from django.core.paginator import Paginator
+
+    community = get_object_or_404(Community, slug=slug)
+    if not request.membership.manages(community):
+        return HttpResponseForbidden("You are not the manager of this community.")
+
+    orders = ArchivedOrder.objects.filter(communities=community).only(
+        'customer_name', 'created_at', 'base_cost', 'split_shipping_cost',
+    )
+    page = Paginator(orders, ARCHIVED_ORDERS_PAGE_SIZE).get_page(request.GET.get('page'))
+    return render(request, 'merch/partials/_archived_orders.html', {'community': community, 'page': page})
+
 @login_required
 @require_POST
+@idempotent
 def release_orders_view(request, slug):
     community = get_object_or_404(Community, slug=slug)
-    if request.user not in community.managers.all():
+    if not request.membership.manages(community):
         return HttpResponseForbidden("You are not the manager of this community.")
         
     shipping_cost_str = request.POST.get('shipping_cost', '0')
@@ -241,7 +263,7 @@ def update_order_status_view(request, order_id):
     # Permission check: must be the manager of the community associated with items in this order
     # (Simplified: we check the first item's community manager)
     first_item = order.order_items.first()
-    if not first_item or request.user not in first_item.item.community.managers.all():
+    if not first_item or first_item.item.community_id not in request.membership.managed_ids:
         return HttpResponseForbidden("You are not authorized to update this order.")
         
     new_status = request.POST.get('status')
@@ -0,0 +1,344 @@
+"""
+Ingestion of recorded activities (GPX, TCX and FIT files). Files are read as a
+stream of trackpoints, reps are picked out of the speed changes as they go
+by, and only the per-rep summary is kept, so memory stays bounded however
+long the recording is.
+"""
+import math
+import struct
+from datetime import datetime
+from xml.etree.ElementTree import iterparse, ParseError
+
+from django.utils import timezone
+
+from workouts.utils import TRAINING_ZONES, _get_velocity_from_vdot, calculate_actual_tss, calculate_pace_from_vdot
+from .models import ActivityUpload, CompletedSession
+from .plans import get_group_plan
+
+ACTIVITY_FORMATS = ('gpx', 'tcx', 'fit')
+MAX_ACTIVITY_BYTES = 20 * 1024 * 1024
+# Files per bulk upload; where tasks run inline (Vercel) they are parsed in the request
+MAX_BULK_ACTIVITIES = 40
+# Speed has to stay on the other side of the threshold this long to count as a change
+DEBOUNCE_S = 5
+MIN_REP_S = 20
+MIN_REP_M = 100
+EARTH_RADIUS_M = 6371000
+FIT_EPOCH = 631065600  # 1989-12-31T00:00:00Z
+
+
+class ActivityError(ValueError):
+    """Raised when an activity file can't be read."""
+
+
+def activity_format(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension not in ACTIVITY_FORMATS:
+        raise ActivityError("Upload a .gpx, .tcx or .fit file")
+    return extension
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _parse_time(text):
+    return datetime.fromisoformat(text.strip().replace('Z', '+00:00')).timestamp()
+
+
+def _haversine(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def _iter_xml(fileobj, point_tag):
+    """
+    Yields each point element's children as a dict. Points are detached from
+    their parent once read, so only the open elements stay in memory.
+    """
+    open_elements = []
+    try:
+        for event, element in iterparse(fileobj, events=('start', 'end')):
+            if event == 'start':
+                open_elements.append(element)
+                continue
+            open_elements.pop()
+            if _local(element.tag) != point_tag:
+                continue
+            values = dict(element.attrib)
+            for child in element.iter():
+                if child is not element and child.text and child.text.strip():
+                    values[_local(child.tag)] = child.text
+            element.clear()
+            if open_elements:
+                open_elements[-1].remove(element)
+            yield values
+    except ParseError as e:
+        raise ActivityError(f"Activity file is not valid XML: {e}")
+
+
+def iter_gpx_points(fileobj):
+    """(timestamp, lat, lon, distance) of each GPX trackpoint. GPX carries no distance."""
+    for values in _iter_xml(fileobj, 'trkpt'):
+        if 'time' in values:
+            yield _parse_time(values['time']), float(values['lat']), float(values['lon']), None
+
+
+def iter_tcx_points(fileobj):
+    for values in _iter_xml(fileobj, 'Trackpoint'):
+        if 'Time' not in values:
+            continue
+        lat = float(values['LatitudeDegrees']) if 'LatitudeDegrees' in values else None
+        lon = float(values['LongitudeDegrees']) if 'LongitudeDegrees' in values else None
+        distance = float(values['DistanceMeters']) if 'DistanceMeters' in values else None
+        yield _parse_time(values['Time']), lat, lon, distance
+
+
+# Record message fields that are read: number -> (name, struct code, invalid value, scale)
+_FIT_FIELDS = {
+    253: ('timestamp', 'I', 0xFFFFFFFF, 1),
+    0: ('lat', 'i', 0x7FFFFFFF, 180 / 2 ** 31),
+    1: ('lon', 'i', 0x7FFFFFFF, 180 / 2 ** 31),
+    5: ('distance', 'I', 0xFFFFFFFF, 1 / 100),
+}
+_FIT_RECORD = 20
+
+
+def _read(fileobj, size):
+    data = fileobj.read(size)
+    if len(data) != size:
+        raise ActivityError("FIT file is truncated")
+    return data
+
+
+def iter_fit_points(fileobj):
+    """
+    A minimal FIT reader: walks the definition and data messages and yields the
+    timestamp, position and distance of each record message, skipping
+    everything else. Compressed timestamp headers and developer fields are
+    handled; CRCs are not checked.
+    """
+    header_size = _read(fileobj, 1)[0]
+    header = _read(fileobj, header_size - 1)
+    if header_size < 12 or header[7:11] != b'.FIT':
+        raise ActivityError("Not a FIT file")
+    remaining = struct.unpack('<I', header[3:7])[0]
+
+    definitions = {}
+    last_timestamp = None
+    while remaining > 0:
+        record_header = _read(fileobj, 1)[0]
+        remaining -= 1
+        time_offset = None
+        if record_header & 0x80:
+            # Compressed timestamp header: a data message with a 5 bit time offset
+            local = (record_header >> 5) & 0x03
+            time_offset = record_header & 0x1F
+        elif record_header & 0x40:
+            local = record_header & 0x0F
+            fixed = _read(fileobj, 5)
+            endian = '>' if fixed[1] else '<'
+            global_number = struct.unpack(endian + 'H', fixed[2:4])[0]
+            fields = [tuple(_read(fileobj, 3)) for _ in range(fixed[4])]
+            remaining -= 5 + 3 * len(fields)
+            developer_size = 0
+            if record_header & 0x20:
+                count = _read(fileobj, 1)[0]
+                developer = [tuple(_read(fileobj, 3)) for _ in range(count)]
+                developer_size = sum(size for _, size, _ in developer)
+                remaining -= 1 + 3 * count
+            definitions[local] = (endian, global_number, fields, developer_size)
+            continue
+        else:
+            local = record_header & 0x0F
+
+        if local not in definitions:
+            raise ActivityError("FIT data message has no definition")
+        endian, global_number, fields, developer_size = definitions[local]
+        values = {}
+        for number, size, _base_type in fields:
+            raw = _read(fileobj, size)
+            remaining -= size
+            if number not in _FIT_FIELDS:
+                continue
+            name, code, invalid, scale = _FIT_FIELDS[number]
+            if size != struct.calcsize(code):
+                continue
+            value = struct.unpack(endian + code, raw)[0]
+            if value != invalid:
+                values[name] = value * scale
+        _read(fileobj, developer_size)
+        remaining -= developer_size
+
+        if 'timestamp' in values:
+            last_timestamp = int(values['timestamp'])
+        elif time_offset is not None and last_timestamp is not None:
+            timestamp = (last_timestamp & ~0x1F) + time_offset
+            if time_offset < (last_timestamp & 0x1F):
+                timestamp += 0x20
+            last_timestamp = timestamp
+        if global_number == _FIT_RECORD and last_timestamp is not None:
+            yield last_timestamp + FIT_EPOCH, values.get('lat'), values.get('lon'), values.get('distance')
+
+
+POINT_READERS = {
+    'gpx': iter_gpx_points,
+    'tcx': iter_tcx_points,
+    'fit': iter_fit_points,
+}
+
+
+def iter_samples(fileobj, fmt):
+    """(elapsed seconds, metres covered) along the recording, whatever the format."""
+    start = previous = None
+    covered = 0.0
+    for timestamp, lat, lon, distance in POINT_READERS[fmt](fileobj):
+        if start is None:
+            start = timestamp
+        if distance is not None:
+            covered = distance
+        elif previous is not None and lat is not None and previous[0] is not None:
+            covered += _haversine(previous[0], previous[1], lat, lon)
+        if lat is not None:
+            previous = (lat, lon)
+        yield timestamp - start, covered
+
+
+def planned_reps(vdot, structure):
+    """Every rep of a workout in running order, with its target time."""
+    reps = []
+    for item in structure:
+        if item['type'] == 'block':
+            segments = item['segments'] * item['multiplier']
+        else:
+            segments = [item['segment']]
+        for segment in segments:
+            # Structures upgraded from v1 can keep a zone that no longer exists
+            if segment.get('intensity') not in TRAINING_ZONES:
+                continue
+            pace = calculate_pace_from_vdot(vdot, TRAINING_ZONES[segment['intensity']]['max'], segment['distance'])
+            if not pace:
+                continue
+            target_s = pace['target_pace']['minutes'] * 60 + pace['target_pace']['seconds']
+            reps.extend(
+                {'distance': segment['distance'], 'intensity': segment['intensity'], 'target_s': round(target_s, 1)}
+                for _ in range(segment['reps'])
+            )
+    return reps
+
+
+def rep_speed_threshold(vdot, structure):
+    """
+    Speed (m/s) separating reps from recoveries: halfway between easy pace and the
+    slowest pace any rep is planned at.
+    """
+    easy = _get_velocity_from_vdot(vdot, TRAINING_ZONES['Easy']['min']) / 60
+    intensities = [rep['intensity'] for rep in planned_reps(vdot, structure)] or ['Threshold']
+    slowest = min(_get_velocity_from_vdot(vdot, TRAINING_ZONES[zone]['max']) for zone in intensities) / 60
+    return (easy + slowest) / 2
+
+
+def detect_reps(samples, threshold_mps):
+    """
+    Splits a stream of (elapsed, covered) samples into reps: stretches run at or
+    above threshold_mps for at least MIN_REP_S and MIN_REP_M. Returns the reps
+    as (distance, time_s) dicts along with the recording's total distance and
+    duration.
+    """
+    reps = []
+    fast = False
+    rep_start = candidate = previous = None
+    elapsed = covered = 0
+
+    def close(end):
+        distance, duration = end[1] - rep_start[1], end[0] - rep_start[0]
+        if duration >= MIN_REP_S and distance >= MIN_REP_M:
+            reps.append({'distance': round(distance), 'time_s': round(duration, 1)})
+
+    for sample in samples:
+        elapsed, covered = sample
+        if previous is not None and sample[0] > previous[0]:
+            is_fast = (sample[1] - previous[1]) / (sample[0] - previous[0]) >= threshold_mps
+            if is_fast == fast:
+                candidate = None
+            else:
+                if candidate is None:
+                    candidate = previous
+                if sample[0] - candidate[0] >= DEBOUNCE_S:
+                    if is_fast:
+                        rep_start = candidate
+                    else:
+                        close(candidate)
+                    fast, candidate = is_fast, None
+        previous = sample
+    if fast and previous is not None:
+        close(candidate or previous)
+    return reps, covered, elapsed
+
+
+def analyse_activity(fileobj, fmt, vdot, structure):
+    """
+    Reads an activity and compares it with the workout it was run for. Returns
+    the compact summary stored on ActivityUpload.
+    """
+    try:
+        reps, distance, duration = detect_reps(iter_samples(fileobj, fmt), rep_speed_threshold(vdot, structure))
+    except ActivityError:
+        raise
+    except (ValueError, KeyError, struct.error):
+        raise ActivityError("Activity file could not be read")
+    if duration <= 0:
+        raise ActivityError("Activity file has no timed trackpoints")
+    planned = planned_reps(vdot, structure)
+    for index, rep in enumerate(reps):
+        rep['pace_per_km_s'] = round(rep['time_s'] / rep['distance'] * 1000, 1)
+        if index < len(planned):
+            target = planned[index]
+            # Compare against the planned pace over the distance actually covered
+            target_s = target['target_s'] / target['distance'] * rep['distance']
+            rep.update(planned_distance=target['distance'], intensity=target['intensity'],
+                       target_s=round(target_s, 1), delta_s=round(rep['time_s'] - target_s, 1))
+    return {
+        'reps': reps,
+        'distance_m': round(distance),
+        'duration_s': round(duration),
+        'actual_tss': calculate_actual_tss(vdot, reps),
+    }
+
+
+def process_upload(upload):
+    """
+    Analyses a stored upload against its group's workout and records the
+    session as completed with the TSS actually run. The raw file is removed
+    afterwards either way.
+    """
+    try:
+        if upload.structure_json is not None:
+            name, vdot, structure = upload.group_name, upload.vdot, upload.structure_json
+        elif upload.group is not None:
+            # Uploaded before groups were copied onto the upload
+            name, vdot, structure = upload.group.name, upload.group.vdot, upload.group.get_structure()
+        else:
+            raise ActivityError("The session group this was uploaded for no longer exists")
+        if upload.session and upload.session.date > timezone.now().date():
+            raise ActivityError("This session hasn't happened yet")
+        with upload.file.open('rb') as fileobj:
+            summary = analyse_activity(fileobj, upload.format, vdot, structure)
+    except ActivityError as e:
+        upload.status, upload.error = ActivityUpload.FAILED, str(e)
+    else:
+        upload.status, upload.error = ActivityUpload.PROCESSED, ''
+        upload.reps = summary['reps']
+        upload.distance_m = summary['distance_m']
+        upload.duration_s = summary['duration_s']
+        upload.actual_tss = summary['actual_tss']
+        upload.planned_tss = get_group_plan(name, vdot, structure)['summary']['tss']
+        if upload.session_id:
+            CompletedSession.objects.update_or_create(user=upload.user, session=upload.session, defaults={
+                'date': upload.session.date, 'group_name': name, 'tss': upload.actual_tss,
+            })
+    upload.processed_at = timezone.now()
+    upload.file.delete(save=False)
+    upload.save()
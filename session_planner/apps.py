@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SessionPlannerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'session_planner'
+
+    def ready(self):
+        import session_planner.signals
@@ -0,0 +1,106 @@
+"""
+Moves past sessions and calendar events out of the hot tables into
+ArchivedSession and ArchivedCalendarEvent, one batch per transaction. A
+session's groups, check-ins and revisions go with it, and its segment index
+rows are moved over. Readers of history (session history, the month view, old
+session links) read both.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from communities.models import ArchivedCalendarEvent, CalendarEvent
+from .models import ArchivedSession, IndexedSegment, Session
+from .structure import CURRENT_STRUCTURE_VERSION
+
+
+def archive_horizon():
+    """Sessions and events dated before this are archived."""
+    return timezone.now().date() - timedelta(days=settings.ARCHIVE_SESSIONS_AFTER_DAYS)
+
+
+def _archived_session(session):
+    return ArchivedSession(
+        original_id=session.id,
+        community_id=session.community_id,
+        creator_id=session.creator_id,
+        title=session.title,
+        date=session.date,
+        description=session.description,
+        structure_json=session.structure_json,
+        structure_version=session.structure_version,
+        # Resolved here, while a group without its own structure can still read the session's
+        groups=[
+            {
+                'name': group.name,
+                'vdot': group.vdot,
+                'structure_json': group.get_structure(),
+                'structure_version': CURRENT_STRUCTURE_VERSION,
+            }
+            for group in sorted(session.groups.all(), key=lambda group: group.id)
+        ],
+        check_ins=[
+            {'user_id': check_in.user_id, 'checked_in_at': check_in.checked_in_at.isoformat()}
+            for check_in in session.check_ins.all()
+        ],
+        revisions=[
+            {
+                'number': revision.number,
+                'author_id': revision.author_id,
+                'snapshot': revision.snapshot,
+                'patch': revision.patch,
+                'created_at': revision.created_at.isoformat(),
+            }
+            for revision in sorted(session.revisions.all(), key=lambda revision: revision.number)
+        ],
+        created_at=session.created_at,
+        updated_at=session.updated_at,
+    )
+
+
+def archive_session_batch(before, batch_size):
+    """Archives up to batch_size sessions dated before `before`. Returns how many were moved."""
+    with transaction.atomic():
+        batch = list(
+            Session.objects.filter(date__lt=before).select_for_update()
+            .prefetch_related('groups', 'check_ins', 'revisions').order_by('id')[:batch_size]
+        )
+        if not batch:
+            return 0
+        ids = [session.id for session in batch]
+        ArchivedSession.objects.bulk_create([_archived_session(session) for session in batch], ignore_conflicts=True)
+        IndexedSegment.objects.filter(session_id__in=ids).update(
+            session=None,
+            archived_session=Subquery(ArchivedSession.objects.filter(original_id=OuterRef('session_id')).values('id')[:1]),
+        )
+        Session.objects.filter(id__in=ids).delete()
+    return len(batch)
+
+
+def archive_event_batch(before, batch_size):
+    """Archives up to batch_size calendar events dated before `before`."""
+    with transaction.atomic():
+        # Repeating events are a single row that keeps producing occurrences, so they stay put
+        batch = list(
+            CalendarEvent.objects.filter(date__lt=before, recurrence='').select_for_update().order_by('id')[:batch_size]
+        )
+        if not batch:
+            return 0
+        ArchivedCalendarEvent.objects.bulk_create([
+            ArchivedCalendarEvent(
+                original_id=event.id,
+                community_id=event.community_id,
+                title=event.title,
+                date=event.date,
+                description=event.description,
+                is_public=event.is_public,
+                created_at=event.created_at,
+            )
+            for event in batch
+        ], ignore_conflicts=True)
+        CalendarEvent.objects.filter(id__in=[event.id for event in batch]).delete()
+    return len(batch)
+
@@ -0,0 +1,201 @@
+import hashlib
+import io
+import json
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageDraw, ImageFont
+
+from .plans import _process_and_calculate_group_plan, format_segment_text
+
+# Bump when the card layout changes so existing cards are re-rendered
+CARD_RENDERER_VERSION = 1
+CARD_WIDTH = 720
+CARD_PADDING = 32
+CARD_GAP = 24
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+
+
+def _font(size):
+    return ImageFont.load_default(size=size)
+
+
+def group_whatsapp_text(plan):
+    """Formats a calculated group plan the way the "Copy WhatsApp" button shares it."""
+    text = f"*{plan['name']} Session*\n"
+    for item in plan['workout_structure']:
+        if item['type'] == 'block':
+            text += f"\n*{item['multiplier']} sets of:*\n"
+            for seg in item['segments']:
+                text += f" - {format_segment_text(seg)}\n"
+        else:
+            text += f"{format_segment_text(item['segment'])}\n"
+    return text
+
+
+def session_whatsapp_text(session, plans):
+    text = f"*{session.title}*\n_{session.date:%A, %b %d}_\n\n"
+    for plan in plans:
+        text += group_whatsapp_text(plan) + '\n' + '-' * 20 + '\n\n'
+    return text
+
+
+def session_group_plans(session, groups=None):
+    if groups is None:
+        groups = session.groups.all().order_by('id')
+    return [_process_and_calculate_group_plan(group.name, group.vdot, group.get_structure()) for group in groups]
+
+
+def share_cards_hash(session, plans, layout='sheet'):
+    """Content address for a card: changes whenever anything drawn on it does."""
+    payload = json.dumps({
+        'version': CARD_RENDERER_VERSION,
+        'layout': layout,
+        'title': session.title,
+        'date': str(session.date),
+        'plans': [
+            {'name': p['name'], 'vdot': p['vdot'], 'structure': p['workout_structure'],
+             'summary': {k: v for k, v in p['summary'].items() if k != 'zone_time_s'}}
+            for p in plans
+        ],
+    }, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def share_cards_source_hash(session, groups):
+    """
+    Hash of everything the cards are drawn from, computable without calculating
+    any plans, so the detail page can tell whether stored cards are current.
+    """
+    payload = json.dumps({
+        'version': CARD_RENDERER_VERSION,
+        'title': session.title,
+        'date': str(session.date),
+        'groups': [[group.name, group.vdot, group.get_structure()] for group in groups],
+    }, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _card_lines(plan):
+    """Flattens a plan into (text, detail, indent, is_heading) rows for drawing."""
+    rows = []
+    for item in plan['workout_structure']:
+        if item['type'] == 'block':
+            rows.append((f"{item['multiplier']}x Sets of:", '', 0, True))
+            segments = [(seg, 1) for seg in item['segments']]
+        else:
+            segments = [(item['segment'], 0)]
+        for seg, indent in segments:
+            rows.append((
+                f"{seg['reps']} x {seg['distance']}m  {seg['intensity']} @ {seg['rest']}s",
+                f"{seg['target_pace']}  LAP {seg['lap_time']}  100m {seg['split_100m']}",
+                indent,
+                False,
+            ))
+    return rows
+
+
+def render_group_card(session, plan):
+    """Draws a single group's card as a PNG image."""
+    title_font, heading_font, body_font, small_font = _font(40), _font(30), _font(26), _font(22)
+    rows = _card_lines(plan)
+    summary = plan['summary']
+    summary_rows = [
+        ('Distance', summary['distance']),
+        ('Active Time', summary['active_time']),
+        ('Total Time', summary['total_time']),
+        ('TSS Score', str(summary['tss'])),
+    ]
+
+    header_height = 150
+    row_height = 78
+    height = header_height + CARD_PADDING + len(rows) * row_height + CARD_PADDING + len(summary_rows) * 42 + CARD_PADDING
+    image = Image.new('RGB', (CARD_WIDTH, height), WHITE)
+    draw = ImageDraw.Draw(image)
+
+    draw.rectangle([0, 0, CARD_WIDTH - 1, height - 1], outline=BLACK, width=4)
+    draw.rectangle([0, 0, CARD_WIDTH - 1, header_height], fill=BLACK)
+    draw.text((CARD_PADDING, 24), plan['name'].upper(), font=title_font, fill=WHITE)
+    draw.text((CARD_PADDING, 78), f"VDOT: {plan['vdot']}", font=small_font, fill=WHITE)
+    draw.text((CARD_PADDING, 108), f"{session.title} - {session.date:%a %d %b}", font=small_font, fill=WHITE)
+
+    y = header_height + CARD_PADDING
+    for text, detail, indent, is_heading in rows:
+        x = CARD_PADDING + indent * 32
+        if is_heading:
+            draw.text((x, y + 20), text.upper(), font=heading_font, fill=BLACK)
+        else:
+            draw.rectangle([x, y, CARD_WIDTH - CARD_PADDING, y + row_height - 10], outline=BLACK, width=2)
+            draw.text((x + 12, y + 8), text, font=body_font, fill=BLACK)
+            draw.text((x + 12, y + 38), detail, font=small_font, fill=BLACK)
+        y += row_height
+
+    y += CARD_PADDING - 10
+    draw.line([0, y, CARD_WIDTH, y], fill=BLACK, width=2)
+    y += 12
+    for label, value in summary_rows:
+        draw.text((CARD_PADDING, y), label.upper(), font=small_font, fill=BLACK)
+        value_width = draw.textlength(value, font=body_font)
+        draw.text((CARD_WIDTH - CARD_PADDING - value_width, y), value, font=body_font, fill=BLACK)
+        y += 42
+    return image
+
+
+def render_session_card(images):
+    """Lays the group cards out side by side for the "Download All" image."""
+    width = sum(img.width for img in images) + CARD_GAP * (len(images) + 1)
+    height = max(img.height for img in images) + CARD_GAP * 2
+    sheet = Image.new('RGB', (width, height), WHITE)
+    x = CARD_GAP
+    for img in images:
+        sheet.paste(img, (x, CARD_GAP))
+        x += img.width + CARD_GAP
+    return sheet
+
+
+def _card_path(digest):
+    return f"session_cards/{digest[:2]}/{digest}.png"
+
+
+def _store_png(image, path):
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', optimize=True)
+    return default_storage.save(path, ContentFile(buffer.getvalue()))
+
+
+def build_share_cards(session):
+    """
+    Renders the PNG cards and WhatsApp text for every group of a session.
+    Cards are stored under the hash of what they show, so unchanged cards are
+    never redrawn. Returns the value stored on Session.share_cards.
+    """
+    session_groups = list(session.groups.all().order_by('id'))
+    plans = session_group_plans(session, session_groups)
+    if not plans:
+        return None
+
+    groups = []
+    images = {}
+    for index, plan in enumerate(plans):
+        path = _card_path(share_cards_hash(session, [plan], layout='group'))
+        if not default_storage.exists(path):
+            images[index] = render_group_card(session, plan)
+            path = _store_png(images[index], path)
+        groups.append({'name': plan['name'], 'image': path, 'text': group_whatsapp_text(plan)})
+
+    digest = share_cards_hash(session, plans)
+    path = _card_path(digest)
+    if not default_storage.exists(path):
+        sheet = render_session_card([
+            images.get(index) or render_group_card(session, plan) for index, plan in enumerate(plans)
+        ])
+        path = _store_png(sheet, path)
+
+    return {
+        'hash': digest,
+        'source': share_cards_source_hash(session, session_groups),
+        'image': path,
+        'text': session_whatsapp_text(session, plans),
+        'groups': groups,
+    }
@@ -0,0 +1,52 @@
+"""
+Session attendance. Members check in by scanning the session's QR code or by
+entering their community's join code on the night. A check-in is a single
+insert that the (session, user) unique constraint makes idempotent, so a
+crowd checking in at once never waits on a read or a lock. The attendance
+count shown on the board is cached; a check-in drops it and the next read
+counts the table again.
+"""
+from django.core import signing
+from django.core.cache import cache
+
+from .models import SessionCheckIn
+
+CHECKIN_SALT = 'session_planner.checkin'
+# A QR code only works on the day it was shown, not from a screenshot next week
+CHECKIN_TOKEN_MAX_AGE = 60 * 60 * 12
+# Also bounds how long a count read just before a check-in can stay cached
+CHECKIN_COUNT_TIMEOUT = 60
+
+
+def make_checkin_token(session):
+    return signing.TimestampSigner(salt=CHECKIN_SALT).sign(str(session.id))
+
+
+def read_checkin_token(token):
+    """Returns the session id a check-in token was signed for, or None if it is invalid or expired."""
+    try:
+        return int(signing.TimestampSigner(salt=CHECKIN_SALT).unsign(token, max_age=CHECKIN_TOKEN_MAX_AGE))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def _count_key(session_id):
+    return f'checkins:{session_id}'
+
+
+def check_in(session, user):
+    """
+    Records that the member is at the session. Checking in again is a no-op.
+    The cached count is dropped rather than incremented, since the insert
+    doesn't report whether it conflicted; the next read counts exactly.
+    """
+    SessionCheckIn.objects.bulk_create([SessionCheckIn(session=session, user=user)], ignore_conflicts=True)
+    cache.delete(_count_key(session.id))
+
+
+def attendance_count(session_id):
+    return cache.get_or_set(
+        _count_key(session_id),
+        lambda: SessionCheckIn.objects.filter(session_id=session_id).count(),
+        CHECKIN_COUNT_TIMEOUT,
+    )
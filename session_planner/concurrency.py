@@ -0,0 +1,29 @@
+from django.db.models import F
+
+
+def posted_version(post_data):
+    """The version number an edit form was rendered with, or None if it didn't send one."""
+    try:
+        return int(post_data.get('version', ''))
+    except ValueError:
+        return None
+
+
+def claim_version(instance, expected_version):
+    """
+    Moves a row from expected_version to the next version with a single conditional
+    UPDATE. Returns False if someone else saved it first, in which case nothing was
+    written. Inside a transaction the claimed row stays locked until commit, so the
+    rest of the edit can't interleave with another one.
+    """
+    updated = type(instance)._default_manager.filter(
+        pk=instance.pk, version=expected_version,
+    ).update(version=F('version') + 1)
+    if updated:
+        instance.version = expected_version + 1
+    return bool(updated)
+
+
+def bump_version(model, pk):
+    """Marks a row as changed for edits that don't go through claim_version."""
+    model._default_manager.filter(pk=pk).update(version=F('version') + 1)
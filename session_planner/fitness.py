@@ -0,0 +1,101 @@
+"""
+Per-member training load as exponentially weighted averages of daily TSS:
+chronic load (CTL, fitness), acute load (ATL, fatigue) and their balance
+(TSB, form). Each DailyLoad row holds the averages after that day, so a new
+completion only folds the days from its own date onwards into the stored
+values rather than replaying the member's full history.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import CompletedSession, DailyLoad, RunnerFitness
+
+CTL_DAYS = 42
+ATL_DAYS = 7
+# Form below this is the usual "overreaching" line
+OVERREACHING_TSB = -30
+
+
+def _average(previous, rest_days, tss, days):
+    """Decays an average over the rest days, then folds in the day's TSS."""
+    value = previous * (1 - 1 / days) ** rest_days
+    return value + (tss - value) / days
+
+
+def decayed(load, day):
+    """(ctl, atl, tsb) for a later day with no training since `load`."""
+    # Never grows the load back for a day before the one it was computed for
+    rest_days = max(0, (day - load.day).days)
+    ctl = load.ctl * (1 - 1 / CTL_DAYS) ** rest_days
+    atl = load.atl * (1 - 1 / ATL_DAYS) ** rest_days
+    return ctl, atl, ctl - atl
+
+
+def update_daily_load(user_id, day):
+    """
+    Recomputes the member's load for `day` from their completions and carries
+    the change forward through any later days. Logging today's session
+    touches only today's row.
+    """
+    tss = CompletedSession.objects.filter(user_id=user_id, date=day).aggregate(total=Sum('tss'))['total'] or 0
+    with transaction.atomic():
+        loads = DailyLoad.objects.select_for_update().filter(user_id=user_id)
+        previous = loads.filter(day__lt=day).order_by('-day').first()
+        following = list(loads.filter(day__gt=day).order_by('day'))
+        if tss:
+            current, _ = DailyLoad.objects.update_or_create(
+                user_id=user_id, day=day, defaults={'tss': tss, 'ctl': 0, 'atl': 0, 'tsb': 0},
+            )
+            following.insert(0, current)
+        else:
+            loads.filter(day=day).delete()
+
+        for load in following:
+            ctl = atl = 0
+            rest_days = 0
+            if previous is not None:
+                ctl, atl = previous.ctl, previous.atl
+                rest_days = (load.day - previous.day).days - 1
+            load.ctl = _average(ctl, rest_days, load.tss, CTL_DAYS)
+            load.atl = _average(atl, rest_days, load.tss, ATL_DAYS)
+            load.tsb = load.ctl - load.atl
+            previous = load
+        DailyLoad.objects.bulk_update(following, ['ctl', 'atl', 'tsb'])
+
+        latest = following[-1] if following else previous
+        _store_latest(user_id, latest)
+
+
+def _store_latest(user_id, latest):
+    from communities.models import UserProfile
+
+    if latest is None:
+        RunnerFitness.objects.filter(user_id=user_id).delete()
+        return
+    community_id = UserProfile.objects.filter(user_id=user_id).values_list('community_id', flat=True).first()
+    RunnerFitness.objects.update_or_create(user_id=user_id, defaults={
+        'community_id': community_id, 'day': latest.day,
+        'ctl': latest.ctl, 'atl': latest.atl, 'tsb': latest.tsb,
+    })
+
+
+def overreaching_runners(community, threshold=OVERREACHING_TSB):
+    """
+    Members whose form today is below the threshold, most fatigued first, as
+    dicts of their RunnerFitness and its (ctl, atl, tsb) decayed to today.
+    Resting only raises a negative TSB, so the stored one narrows the query.
+    """
+    today = timezone.now().date()
+    since = today - timedelta(days=ATL_DAYS)
+    candidates = RunnerFitness.objects.filter(
+        community=community, tsb__lt=threshold, day__gte=since,
+    ).select_related('user')
+    runners = []
+    for fitness in candidates:
+        ctl, atl, tsb = decayed(fitness, today)
+        if tsb < threshold:
+            runners.append({'fitness': fitness, 'ctl': ctl, 'atl': atl, 'tsb': tsb})
+    return sorted(runners, key=lambda runner: runner['tsb'])
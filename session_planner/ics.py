@@ -0,0 +1,157 @@
+import hashlib
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+
+from communities.models import CalendarEvent
+from communities.recurrence import recurring_occurrences
+from .models import Session
+from .plans import _process_and_calculate_group_plan, format_segment_text, group_for_training_group
+from .schedule_cache import get_schedule_version
+
+FEED_SALT = 'session_planner.ics'
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+# How far back the feed reaches, so calendars keep recent sessions after they happen
+FEED_HISTORY_DAYS = 28
+# How far ahead repeating events are written out
+FEED_RECURRING_AHEAD = timedelta(days=365)
+PRODID = '-//RunTRASH//Speed Sessions//EN'
+
+
+def make_feed_token(community, user=None):
+    """Signs a feed token for a community, or for a single member of it."""
+    payload = {'c': community.id}
+    if user is not None:
+        payload['u'] = user.id
+    return signing.Signer(salt=FEED_SALT).sign_object(payload)
+
+
+def read_feed_token(token):
+    """Returns the (community_id, user_id) a token was signed for, or None if it is invalid."""
+    try:
+        payload = signing.Signer(salt=FEED_SALT).unsign_object(token)
+    except signing.BadSignature:
+        return None
+    return payload.get('c'), payload.get('u')
+
+
+def _escape(text):
+    return (
+        str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    """Folds a content line to 75 octets as required by RFC 5545."""
+    parts = []
+    current, size = '', 0
+    for char in line:
+        char_size = len(char.encode('utf-8'))
+        # Continuation lines start with a space, which counts towards their 75 octets
+        limit = 75 if not parts else 74
+        if size + char_size > limit:
+            parts.append(current)
+            current, size = '', 0
+        current += char
+        size += char_size
+    parts.append(current)
+    return '\r\n '.join(parts)
+
+
+def _format_stamp(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _event_lines(uid, date, summary, description, stamp, url=None):
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{uid}',
+        f'DTSTAMP:{_format_stamp(stamp)}',
+        f"DTSTART;VALUE=DATE:{date.strftime('%Y%m%d')}",
+        f"DTEND;VALUE=DATE:{(date + timedelta(days=1)).strftime('%Y%m%d')}",
+        f'SUMMARY:{_escape(summary)}',
+    ]
+    if description:
+        lines.append(f'DESCRIPTION:{_escape(description)}')
+    if url:
+        lines.append(f'URL:{url}')
+    lines.append('END:VEVENT')
+    return lines
+
+
+def _session_description(session, training_group):
+    groups = list(session.groups.all())
+    own_group = group_for_training_group(groups, training_group)
+    if own_group:
+        groups = [own_group]
+
+    parts = []
+    if session.description:
+        parts.append(session.description)
+    for group in groups:
+        plan = _process_and_calculate_group_plan(group.name, group.vdot, group.get_structure())
+        lines = [f"{plan['name']} (VDOT {plan['vdot']})"]
+        for item in plan['workout_structure']:
+            if item['type'] == 'block':
+                lines.append(f"{item['multiplier']} sets of:")
+                lines.extend(f" - {format_segment_text(seg)}" for seg in item['segments'])
+            else:
+                lines.append(format_segment_text(item['segment']))
+        lines.append(f"Distance {plan['summary']['distance']}, total time {plan['summary']['total_time']}, TSS {plan['summary']['tss']}")
+        parts.append('\n'.join(lines))
+    return '\n\n'.join(parts)
+
+
+def render_feed(community, training_group=''):
+    """Renders the iCalendar feed for a community's sessions and public events."""
+    since = timezone.now().date() - timedelta(days=FEED_HISTORY_DAYS)
+    sessions = Session.objects.filter(community=community, date__gte=since).prefetch_related('groups').order_by('date')
+    public_events = CalendarEvent.objects.filter(community=community, is_public=True)
+    events = [
+        *public_events.filter(recurrence='', date__gte=since).order_by('date'),
+        *recurring_occurrences(public_events, since, timezone.now().date() + FEED_RECURRING_AHEAD),
+    ]
+
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(community.name)}',
+    ]
+    for session in sessions:
+        url = settings.SITE_URL + reverse('session-detail', kwargs={'pk': session.id})
+        lines += _event_lines(
+            f'session-{session.id}@runtrash.com', session.date, session.title,
+            _session_description(session, training_group), session.updated_at, url=url,
+        )
+    for event in events:
+        # Each occurrence of a repeating event is its own calendar entry
+        uid = f"event-{event.id}-{event.date:%Y%m%d}" if event.recurrence else f'event-{event.id}'
+        lines += _event_lines(
+            f'{uid}@runtrash.com', event.date, event.title,
+            event.description, event.created_at,
+        )
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(_fold(line) for line in lines) + '\r\n'
+
+
+def get_feed(community, training_group=''):
+    """
+    Returns the (body, etag) of a community's feed from the cache, rendering it only
+    when the schedule has changed since it was last built. Member feeds share the
+    cached copy for their training group.
+    """
+    key = f"ics-feed:{community.id}:{training_group or 'all'}:{get_schedule_version(community.id)}:{timezone.now().date()}"
+    cached = cache.get(key)
+    if cached is None:
+        body = render_feed(community, training_group=training_group)
+        cached = (body, '"%s"' % hashlib.sha256(body.encode()).hexdigest())
+        cache.set(key, cached, FEED_CACHE_TIMEOUT)
+    return cached
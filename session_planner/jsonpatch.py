@@ -0,0 +1,94 @@
+"""
+The subset of RFC 6902 JSON Patch used for session revisions: add, remove and
+replace, addressed with RFC 6901 JSON Pointers.
+"""
+import copy
+import difflib
+import json
+
+
+def _escape(token):
+    return str(token).replace('~', '~0').replace('/', '~1')
+
+
+def _unescape(token):
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def _keys(items):
+    return [json.dumps(item, sort_keys=True, default=str) for item in items]
+
+
+def make_patch(src, dst, path=''):
+    """Returns a list of operations that turns src into dst."""
+    if type(src) is not type(dst):
+        return [{'op': 'replace', 'path': path, 'value': dst}]
+
+    if isinstance(src, dict):
+        ops = []
+        for key in src:
+            if key not in dst:
+                ops.append({'op': 'remove', 'path': f'{path}/{_escape(key)}'})
+        for key, value in dst.items():
+            if key in src:
+                ops.extend(make_patch(src[key], value, f'{path}/{_escape(key)}'))
+            else:
+                ops.append({'op': 'add', 'path': f'{path}/{_escape(key)}', 'value': value})
+        return ops
+
+    if isinstance(src, list):
+        # Match unchanged items so an insertion or removal is one op, not a
+        # replace of everything after it
+        matcher = difflib.SequenceMatcher(None, _keys(src), _keys(dst), autojunk=False)
+        ops = []
+        # Work from the end so the indexes of earlier items stay valid
+        for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+            if tag == 'equal':
+                continue
+            common = min(i2 - i1, j2 - j1)
+            # Items replaced one for one are diffed in place, so an edited field is a single op
+            for offset in range(common):
+                ops.extend(make_patch(src[i1 + offset], dst[j1 + offset], f'{path}/{i1 + offset}'))
+            for index in range(i2 - 1, i1 + common - 1, -1):
+                ops.append({'op': 'remove', 'path': f'{path}/{index}'})
+            for offset in range(common, j2 - j1):
+                ops.append({'op': 'add', 'path': f'{path}/{i1 + offset}', 'value': dst[j1 + offset]})
+        return ops
+
+    return [] if src == dst else [{'op': 'replace', 'path': path, 'value': dst}]
+
+
+def _resolve(doc, path):
+    """Returns (container, key) for the last token of a pointer."""
+    tokens = [_unescape(token) for token in path.split('/')[1:]]
+    target = doc
+    for token in tokens[:-1]:
+        target = target[int(token)] if isinstance(target, list) else target[token]
+    key = tokens[-1]
+    if isinstance(target, list) and key != '-':
+        key = int(key)
+    return target, key
+
+
+def apply_patch(doc, patch):
+    """Applies a patch to a copy of doc and returns the result."""
+    doc = copy.deepcopy(doc)
+    for op in patch:
+        if op['path'] == '':
+            if op['op'] != 'replace':
+                raise ValueError(f"Unsupported operation on the document root: {op['op']}")
+            doc = copy.deepcopy(op['value'])
+            continue
+        container, key = _resolve(doc, op['path'])
+        if op['op'] == 'add':
+            if isinstance(container, list):
+                container.insert(len(container) if key == '-' else key, copy.deepcopy(op['value']))
+            else:
+                container[key] = copy.deepcopy(op['value'])
+        elif op['op'] == 'remove':
+            del container[key]
+        elif op['op'] == 'replace':
+            container[key] = copy.deepcopy(op['value'])
+        else:
+            raise ValueError(f"Unsupported patch operation: {op['op']}")
+    return doc
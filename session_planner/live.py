@@ -0,0 +1,107 @@
+"""
+In-process publish/subscribe behind the session detail page's server-sent
+events. Subscribers are asyncio queues on the ASGI event loop; publish can be
+called from any thread (views run in a sync thread) and hands each message to
+the subscriber's loop. Publishing only reaches subscribers in the same process,
+so a stream can also be given a poll that looks for changes made elsewhere
+whenever it has been idle for POLL_S.
+"""
+import asyncio
+import json
+import threading
+
+# While idle a stream polls for changes published by other worker processes,
+# or sends a comment line that keeps proxies from closing the connection
+POLL_S = 10
+# Clients reconnect this long after losing the stream
+RETRY_MS = 5000
+# A slow client only ever needs the latest state, so older messages are dropped
+SUBSCRIBER_QUEUE_SIZE = 8
+
+_subscribers = {}
+_lock = threading.Lock()
+
+
+def format_event(event, data):
+    """Encodes one server-sent event with a JSON payload."""
+    lines = [f'event: {event}']
+    lines += [f'data: {line}' for line in json.dumps(data).splitlines()]
+    return '\n'.join(lines) + '\n\n'
+
+
+def subscribe(channel):
+    """Registers a queue for a channel on the running event loop."""
+    queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    with _lock:
+        _subscribers.setdefault(channel, set()).add((asyncio.get_running_loop(), queue))
+    return queue
+
+
+def unsubscribe(channel, queue):
+    with _lock:
+        subscribers = _subscribers.get(channel, set())
+        subscribers.difference_update({entry for entry in subscribers if entry[1] is queue})
+        if not subscribers:
+            _subscribers.pop(channel, None)
+
+
+def subscriber_count(channel):
+    with _lock:
+        return len(_subscribers.get(channel, ()))
+
+
+def _offer(queue, message):
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(message)
+
+
+def publish(channel, event, data):
+    """Sends an event to everyone subscribed to a channel. Safe to call from any thread."""
+    with _lock:
+        subscribers = list(_subscribers.get(channel, ()))
+    if not subscribers:
+        return
+    message = format_event(event, data)
+    for loop, queue in subscribers:
+        try:
+            loop.call_soon_threadsafe(_offer, queue, message)
+        except RuntimeError:
+            # The subscriber's loop has closed; its stream's cleanup will remove it
+            pass
+
+
+class EventStream:
+    """
+    The body of an event-stream response: published events plus keepalives.
+    `poll` is an optional coroutine function awaited after each idle POLL_S,
+    returning a message to send or None. Django calls close() when the response
+    is closed, which unsubscribes.
+    """
+
+    def __init__(self, channel, poll=None):
+        self.channel = channel
+        self.poll = poll
+        self.queue = None
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.closed:
+            raise StopAsyncIteration
+        if self.queue is None:
+            self.queue = subscribe(self.channel)
+            return f'retry: {RETRY_MS}\n\n'
+        try:
+            return await asyncio.wait_for(self.queue.get(), POLL_S)
+        except TimeoutError:
+            message = await self.poll() if self.poll else None
+            return message or ': keepalive\n\n'
+
+    def close(self):
+        self.closed = True
+        if self.queue is not None:
+            unsubscribe(self.channel, self.queue)
+            self.queue = None
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from session_planner.archive import archive_event_batch, archive_horizon, archive_session_batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves sessions and calendar events older than ARCHIVE_SESSIONS_AFTER_DAYS into "
+        "the archive tables. History pages read both, so this is safe to run live."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.ARCHIVE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        before = archive_horizon()
+        for label, archive_batch in (('sessions', archive_session_batch), ('calendar events', archive_event_batch)):
+            total = 0
+            while archived := archive_batch(before, options['batch_size']):
+                total += archived
+            self.stdout.write(self.style.SUCCESS(f"Archived {total} {label} dated before {before}."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from session_planner.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recomputes the weekly group rollups from every session. They are kept current on save, so this is only needed to backfill."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--community', type=int, help="Only rebuild this community's rollups.")
+
+    def handle(self, *args, **options):
+        weeks = rebuild_rollups(options['community'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {weeks} weeks."))
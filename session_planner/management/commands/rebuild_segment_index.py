@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from session_planner.segment_index import rebuild_index
+from session_planner.similarity import rebuild_features
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the IndexedSegment and WorkoutFeatures tables from every session and block template structure."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        sessions, templates = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {sessions} sessions and {templates} templates."))
+        features = rebuild_features(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Stored {features} similarity vectors."))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from session_planner.popularity import refresh_trending_blocks
+from session_planner.tasks import refresh_trending_blocks as refresh_trending_blocks_task
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the trending training blocks list from recent copies and applications. Run it periodically, e.g. hourly."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--background', action='store_true', help="Enqueue the refresh as a background task instead.")
+
+    def handle(self, *args, **options):
+        if options['background']:
+            refresh_trending_blocks_task.enqueue()
+            self.stdout.write("Trending refresh enqueued.")
+            return
+        count = refresh_trending_blocks()
+        self.stdout.write(self.style.SUCCESS(f"{count} blocks are trending."))
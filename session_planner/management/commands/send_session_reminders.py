@@ -0,0 +1,27 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from session_planner.reminders import send_reminders
+from session_planner.tasks import send_session_reminders
+
+
+class Command(BaseCommand):
+    help = "Emails members a digest of tomorrow's sessions and events. Run it once a day, e.g. in the early evening."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Send reminders for this day (YYYY-MM-DD) instead of tomorrow.")
+        parser.add_argument('--background', action='store_true', help="Enqueue the sending as a background task instead.")
+
+    def handle(self, *args, **options):
+        try:
+            day = date.fromisoformat(options['date']) if options['date'] else timezone.localdate() + timedelta(days=1)
+        except ValueError:
+            raise CommandError("--date must be in YYYY-MM-DD format")
+        if options['background']:
+            send_session_reminders.enqueue(day=day.isoformat())
+            self.stdout.write(f"Reminders for {day} enqueued.")
+            return
+        count = send_reminders(day)
+        self.stdout.write(self.style.SUCCESS(f"Sent {count} reminders for {day}."))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from session_planner.models import BlockSessionTemplate, Session, SessionGroup
+from session_planner.tasks import upgrade_structure_batch, upgrade_structures
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrites structure_json rows stored in an older format to the current one. "
+        "Rows are upgraded on read regardless, so this is optional and safe to run live."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--background', action='store_true', help="Enqueue the upgrade as a background task instead.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if options['background']:
+            upgrade_structures.enqueue(batch_size=batch_size)
+            self.stdout.write("Structure upgrade enqueued.")
+            return
+
+        for model in (Session, SessionGroup, BlockSessionTemplate):
+            total = 0
+            while upgraded := upgrade_structure_batch(model, batch_size):
+                total += upgraded
+            self.stdout.write(self.style.SUCCESS(f"Upgraded {total} {model._meta.verbose_name_plural}."))
@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-19 01:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('session_planner', '0006_trainingblock_community_trainingblock_is_tradeable'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='share_cards',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
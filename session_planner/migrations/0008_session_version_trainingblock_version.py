@@ -0,0 +1,23 @@
+# Generated by Django 6.1.2 on 2026-10-19 01:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('session_planner', '0007_session_share_cards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='trainingblock',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 6.1.2 on 2026-10-19 01:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# jsonb_path_ops GIN indexes back structure_json__contains lookups on Postgres.
+# SQLite has no equivalent, so there these lookups go through IndexedSegment.
+STRUCTURE_INDEXES = [
+    ('session_planner_session', 'session_planner_session_structure_gin'),
+    ('session_planner_blocksessiontemplate', 'session_planner_template_structure_gin'),
+]
+
+
+def create_structure_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, name in STRUCTURE_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ((structure_json::jsonb) jsonb_path_ops)'
+        )
+
+
+def drop_structure_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for _table, name in STRUCTURE_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0010_userprofile_training_group'),
+        ('session_planner', '0008_session_version_trainingblock_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexedSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(blank=True, null=True)),
+                ('position', models.PositiveIntegerField()),
+                ('distance', models.PositiveIntegerField()),
+                ('intensity', models.CharField(max_length=20)),
+                ('reps', models.PositiveIntegerField()),
+                ('rest', models.PositiveIntegerField()),
+                ('multiplier', models.PositiveIntegerField(default=1)),
+                ('community', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='communities.community')),
+                ('session', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='indexed_segments', to='session_planner.session')),
+                ('template', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='indexed_segments', to='session_planner.blocksessiontemplate')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['distance', 'intensity'], name='session_pla_distanc_aac228_idx'), models.Index(fields=['community', 'date'], name='session_pla_communi_7e533b_idx')],
+            },
+        ),
+        migrations.RunPython(create_structure_indexes, drop_structure_indexes),
+    ]
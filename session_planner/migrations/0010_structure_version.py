@@ -0,0 +1,28 @@
+# Generated by Django 6.1.2 on 2026-10-19 01:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('session_planner', '0009_indexedsegment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blocksessiontemplate',
+            name='structure_version',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='structure_version',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='sessiongroup',
+            name='structure_version',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.1.2 on 2026-10-19 01:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0011_archivedcalendarevent'),
+        ('session_planner', '0011_sessionrevision'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.PositiveIntegerField(unique=True)),
+                ('title', models.CharField(max_length=200)),
+                ('date', models.DateField()),
+                ('description', models.TextField(blank=True)),
+                ('structure_json', models.JSONField()),
+                ('structure_version', models.PositiveSmallIntegerField(default=1)),
+                ('groups', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('community', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_sessions', to='communities.community')),
+                ('creator', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['community', 'date'], name='session_pla_communi_22d1a3_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 6.1.2 on 2026-10-19 01:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# The full-text index over BlockSearchDocument, see session_planner.search.
+# Postgres gets a generated, weighted tsvector column with a GIN index; SQLite an
+# external-content FTS5 table that triggers keep in step with the documents.
+DOCUMENT_TABLE = 'session_planner_blocksearchdocument'
+FTS_TABLE = 'session_planner_blocksearch_fts'
+FTS_COLUMNS = 'title, target_distance, template_titles, description'
+NEW_COLUMNS = 'new.title, new.target_distance, new.template_titles, new.description'
+OLD_COLUMNS = 'old.title, old.target_distance, old.template_titles, old.description'
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            f"ALTER TABLE {DOCUMENT_TABLE} ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('english', title), 'A') || "
+            "setweight(to_tsvector('english', target_distance || ' ' || template_titles), 'B') || "
+            "setweight(to_tsvector('english', description), 'C')) STORED"
+        )
+        schema_editor.execute(
+            f'CREATE INDEX session_planner_blocksearch_gin ON {DOCUMENT_TABLE} USING gin (search_vector)'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({FTS_COLUMNS}, "
+            f"content='{DOCUMENT_TABLE}', content_rowid='block_id', tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {DOCUMENT_TABLE} BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, {FTS_COLUMNS}) VALUES (new.block_id, {NEW_COLUMNS}); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {DOCUMENT_TABLE} BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {FTS_COLUMNS}) VALUES ('delete', old.block_id, {OLD_COLUMNS}); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON {DOCUMENT_TABLE} BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {FTS_COLUMNS}) VALUES ('delete', old.block_id, {OLD_COLUMNS}); "
+            f"INSERT INTO {FTS_TABLE}(rowid, {FTS_COLUMNS}) VALUES (new.block_id, {NEW_COLUMNS}); END"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS session_planner_blocksearch_gin')
+        schema_editor.execute(f'ALTER TABLE {DOCUMENT_TABLE} DROP COLUMN IF EXISTS search_vector')
+    elif vendor == 'sqlite':
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def index_tradeable_blocks(apps, schema_editor):
+    TrainingBlock = apps.get_model('session_planner', 'TrainingBlock')
+    BlockSearchDocument = apps.get_model('session_planner', 'BlockSearchDocument')
+    for block in TrainingBlock.objects.filter(is_tradeable=True).prefetch_related('templates'):
+        BlockSearchDocument.objects.create(
+            block=block,
+            title=block.title,
+            target_distance=block.target_distance,
+            template_titles=' '.join(t.title for t in sorted(block.templates.all(), key=lambda t: t.week_number)),
+            description=block.description,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('session_planner', '0012_archivedsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlockSearchDocument',
+            fields=[
+                ('block', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='session_planner.trainingblock')),
+                ('title', models.TextField()),
+                ('target_distance', models.TextField(blank=True)),
+                ('template_titles', models.TextField(blank=True)),
+                ('description', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(index_tradeable_blocks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 6.1.2 on 2026-10-19 01:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('session_planner', '0013_blocksearchdocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingBlock',
+            fields=[
+                ('block', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='session_planner.trainingblock')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('refreshed_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['rank'],
+            },
+        ),
+        migrations.AddField(
+            model_name='trainingblock',
+            name='apply_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='trainingblock',
+            name='copy_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='BlockUsageDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('copies', models.PositiveIntegerField(default=0)),
+                ('applies', models.PositiveIntegerField(default=0)),
+                ('block', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_days', to='session_planner.trainingblock')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('block', 'day'), name='unique_block_usage_day')],
+            },
+        ),
+    ]
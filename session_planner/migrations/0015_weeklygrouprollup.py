@@ -0,0 +1,32 @@
+# Generated by Django 6.1.2 on 2026-10-19 02:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0011_archivedcalendarevent'),
+        ('session_planner', '0014_block_popularity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeeklyGroupRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField()),
+                ('group_name', models.CharField(max_length=50)),
+                ('sessions', models.PositiveIntegerField(default=0)),
+                ('distance_km', models.FloatField(default=0)),
+                ('time_min', models.FloatField(default=0)),
+                ('tss', models.FloatField(default=0)),
+                ('community', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weekly_rollups', to='communities.community')),
+            ],
+            options={
+                'ordering': ['week_start', 'group_name'],
+                'constraints': [models.UniqueConstraint(fields=('community', 'week_start', 'group_name'), name='unique_weekly_group_rollup')],
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 6.1.2 on 2026-10-19 02:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('communities', '0011_archivedcalendarevent'),
+        ('session_planner', '0015_weeklygrouprollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompletedSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('group_name', models.CharField(max_length=50)),
+                ('tss', models.FloatField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('session', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='completions', to='session_planner.session')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='completed_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['user', 'date'], name='session_pla_user_id_8a8d03_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'session'), name='unique_session_completion')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyLoad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('tss', models.FloatField()),
+                ('ctl', models.FloatField()),
+                ('atl', models.FloatField()),
+                ('tsb', models.FloatField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_loads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['day'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'day'), name='unique_daily_load')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RunnerFitness',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fitness', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('day', models.DateField()),
+                ('ctl', models.FloatField()),
+                ('atl', models.FloatField()),
+                ('tsb', models.FloatField()),
+                ('community', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='runner_fitness', to='communities.community')),
+            ],
+            options={
+                'ordering': ['tsb'],
+                'indexes': [models.Index(fields=['community', 'tsb', 'day'], name='session_pla_communi_07f72c_idx')],
+            },
+        ),
+    ]
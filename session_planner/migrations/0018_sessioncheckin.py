@@ -0,0 +1,29 @@
+# Generated by Django 6.1.2 on 2026-10-19 02:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('session_planner', '0017_activityupload'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionCheckIn',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('checked_in_at', models.DateTimeField(auto_now_add=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='check_ins', to='session_planner.session')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='session_check_ins', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['checked_in_at'],
+                'constraints': [models.UniqueConstraint(fields=('session', 'user'), name='unique_session_check_in')],
+            },
+        ),
+    ]
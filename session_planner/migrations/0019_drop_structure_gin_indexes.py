@@ -0,0 +1,36 @@
+from django.db import migrations
+
+
+# Nothing filters with structure_json__contains: segment filters go through
+# IndexedSegment, so these indexes from 0009 only added write cost.
+STRUCTURE_INDEXES = [
+    ('session_planner_session', 'session_planner_session_structure_gin'),
+    ('session_planner_blocksessiontemplate', 'session_planner_template_structure_gin'),
+]
+
+
+def drop_structure_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for _table, name in STRUCTURE_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+def create_structure_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, name in STRUCTURE_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ((structure_json::jsonb) jsonb_path_ops)'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('session_planner', '0018_sessioncheckin'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_structure_indexes, create_structure_indexes),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.1.2 on 2026-10-19 03:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('session_planner', '0019_drop_structure_gin_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkoutFeatures',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vector', models.JSONField()),
+                ('session', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='features', to='session_planner.session')),
+                ('template', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='features', to='session_planner.blocksessiontemplate')),
+            ],
+        ),
+    ]
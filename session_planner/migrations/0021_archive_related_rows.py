@@ -0,0 +1,29 @@
+# Generated by Django 6.1.2 on 2026-10-19 03:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('session_planner', '0020_workoutfeatures'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedsession',
+            name='check_ins',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='archivedsession',
+            name='revisions',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='indexedsegment',
+            name='archived_session',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='indexed_segments', to='session_planner.archivedsession'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.1.2 on 2026-10-19 03:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('session_planner', '0021_archive_related_rows'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activityupload',
+            name='group_name',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='activityupload',
+            name='structure_json',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='activityupload',
+            name='vdot',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
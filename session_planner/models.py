@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
 from communities.models import Community
+from .structure import upgrade_structure
 
 class Session(models.Model):
     title = models.CharField(max_length=200)
@@ -16,6 +17,16 @@ class Session(models.Model):
     # Store the base raw structure as JSON
     # This includes the item_types, reps, distances, intensities, rests, block_multipliers
     structure_json = models.JSONField()
+    # Format version structure_json was written in, see session_planner.structure
+    structure_version = models.PositiveSmallIntegerField(default=1)
+
+    # Pre-rendered PNG cards and WhatsApp text for sharing, built in the background
+    # by session_planner.tasks.render_session_share_cards
+    share_cards = models.JSONField(null=True, blank=True)
+
+    # Incremented on every save; edits are only applied if the version they were
+    # made against is still current (see session_planner.concurrency)
+    version = models.PositiveIntegerField(default=1)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -26,6 +37,9 @@ class Session(models.Model):
     def __str__(self):
         return f"{self.title} - {self.date}"
 
+    def get_structure(self):
+        return upgrade_structure(self.structure_json, self.structure_version)
+
 class SessionGroup(models.Model):
     session = models.ForeignKey(Session, related_name='groups', on_delete=models.CASCADE)
     name = models.CharField(max_length=50)
@@ -34,12 +48,15 @@ class SessionGroup(models.Model):
     # Optional override of the structure for this specific group
     # If null, it should use the session's structure_json
     structure_json = models.JSONField(null=True, blank=True)
+    structure_version = models.PositiveSmallIntegerField(default=1)
     
     def __str__(self):
         return f"{self.name} (VDOT: {self.vdot})"
     
     def get_structure(self):
-        return self.structure_json if self.structure_json else self.session.structure_json
+        if self.structure_json:
+            return upgrade_structure(self.structure_json, self.structure_version)
+        return self.session.get_structure()
 
 class TrainingBlock(models.Model):
     title = models.CharField(max_length=200)
@@ -48,18 +65,358 @@ class TrainingBlock(models.Model):
     created_by = models.ForeignKey(User, related_name='training_blocks', on_delete=models.CASCADE)
     community = models.ForeignKey(Community, related_name='training_blocks', on_delete=models.CASCADE, null=True, blank=True)
     is_tradeable = models.BooleanField(default=False)
+    # Bumped whenever the block or its templates change, see session_planner.concurrency
+    version = models.PositiveIntegerField(default=1)
+    # Lifetime usage, incremented in place by session_planner.popularity
+    copy_count = models.PositiveIntegerField(default=0)
+    apply_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return self.title
 
+class BlockUsageDay(models.Model):
+    """Copies and applications of a block on one day, the input to the trending score."""
+    block = models.ForeignKey(TrainingBlock, related_name='usage_days', on_delete=models.CASCADE)
+    day = models.DateField()
+    copies = models.PositiveIntegerField(default=0)
+    applies = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['block', 'day'], name='unique_block_usage_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.block_id} on {self.day}"
+
+class TrendingBlock(models.Model):
+    """
+    The materialized trending list, rebuilt periodically by
+    session_planner.popularity.refresh_trending_blocks so pages can show it
+    without aggregating usage on each request.
+    """
+    block = models.OneToOneField(TrainingBlock, primary_key=True, related_name='trending', on_delete=models.CASCADE)
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['rank']
+
+    def __str__(self):
+        return f"#{self.rank} {self.block_id}"
+
+class BlockSearchDocument(models.Model):
+    """
+    The searchable text of a tradeable block, kept current on save by signals.
+    The full-text index over it lives outside the model: a generated tsvector
+    column with a GIN index on Postgres, an FTS5 table on SQLite. See
+    session_planner.search.
+    """
+    block = models.OneToOneField(TrainingBlock, primary_key=True, related_name='search_document', on_delete=models.CASCADE)
+    title = models.TextField()
+    target_distance = models.TextField(blank=True)
+    template_titles = models.TextField(blank=True)
+    description = models.TextField(blank=True)
+
+    def __str__(self):
+        return self.title
+
 class BlockSessionTemplate(models.Model):
     block = models.ForeignKey(TrainingBlock, related_name='templates', on_delete=models.CASCADE)
     week_number = models.IntegerField()
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     structure_json = models.JSONField()
+    structure_version = models.PositiveSmallIntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.title} (Week {self.week_number})"
+
+    def get_structure(self):
+        return upgrade_structure(self.structure_json, self.structure_version)
+
+class IndexedSegment(models.Model):
+    """
+    One segment of a session's, session group's or block template's
+    structure_json, flattened so that questions like "400m reps at Interval
+    pace" can be asked in SQL. Archiving a session moves its rows to the
+    ArchivedSession.
+    Maintained by session_planner.segment_index; rebuild with
+    `manage.py rebuild_segment_index`.
+    """
+    session = models.ForeignKey(Session, related_name='indexed_segments', on_delete=models.CASCADE, null=True, blank=True)
+    template = models.ForeignKey(BlockSessionTemplate, related_name='indexed_segments', on_delete=models.CASCADE, null=True, blank=True)
+    archived_session = models.ForeignKey('ArchivedSession', related_name='indexed_segments', on_delete=models.CASCADE, null=True, blank=True)
+    # Denormalized from the session so history filters don't need a join
+    community = models.ForeignKey(Community, related_name='+', on_delete=models.CASCADE, null=True, blank=True)
+    date = models.DateField(null=True, blank=True)
+
+    position = models.PositiveIntegerField()
+    distance = models.PositiveIntegerField()
+    intensity = models.CharField(max_length=20)
+    reps = models.PositiveIntegerField()
+    rest = models.PositiveIntegerField()
+    # Sets of the repeat block the segment belongs to, 1 for a single segment
+    multiplier = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['distance', 'intensity']),
+            models.Index(fields=['community', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.reps}x{self.distance}m {self.intensity}"
+
+class WorkoutFeatures(models.Model):
+    """
+    The similarity feature vector of a session or block template, computed when
+    it is saved so a similarity query only reads stored vectors. Maintained by
+    session_planner.similarity; rebuild with `manage.py rebuild_segment_index`.
+    """
+    session = models.OneToOneField(Session, related_name='features', on_delete=models.CASCADE, null=True, blank=True)
+    template = models.OneToOneField(BlockSessionTemplate, related_name='features', on_delete=models.CASCADE, null=True, blank=True)
+    vector = models.JSONField()
+
+    def __str__(self):
+        return f"Features of {self.session or self.template}"
+
+class SessionRevision(models.Model):
+    """
+    One saved state of a session. Most revisions store only a JSON Patch against
+    the previous one; every SNAPSHOT_INTERVAL-th stores the full document so
+    rebuilding any revision takes a bounded number of patches. See
+    session_planner.revisions.
+    """
+    session = models.ForeignKey(Session, related_name='revisions', on_delete=models.CASCADE)
+    number = models.PositiveIntegerField()
+    author = models.ForeignKey(User, related_name='+', on_delete=models.SET_NULL, null=True, blank=True)
+    snapshot = models.JSONField(null=True, blank=True)
+    patch = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-number']
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'number'], name='unique_session_revision_number'),
+        ]
+
+    def __str__(self):
+        return f"{self.session_id} r{self.number}"
+
+class ArchivedSession(models.Model):
+    """
+    A past session moved out of Session by the archive_schedule command so the
+    hot tables stay small. Groups, check-ins and revisions are kept inline,
+    since an archived session is only ever read whole:
+
+        groups     [{name, vdot, structure_json, structure_version}]
+        check_ins  [{user_id, checked_in_at}]
+        revisions  [{number, author_id, snapshot, patch, created_at}]
+
+    See session_planner.archive.
+    """
+    is_archived = True
+
+    original_id = models.PositiveIntegerField(unique=True)
+    community = models.ForeignKey(Community, related_name='archived_sessions', on_delete=models.CASCADE, null=True, blank=True)
+    creator = models.ForeignKey(User, related_name='+', on_delete=models.SET_NULL, null=True)
+    title = models.CharField(max_length=200)
+    date = models.DateField()
+    description = models.TextField(blank=True)
+    structure_json = models.JSONField()
+    structure_version = models.PositiveSmallIntegerField(default=1)
+    groups = models.JSONField(default=list)
+    check_ins = models.JSONField(default=list)
+    revisions = models.JSONField(default=list)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-date']
+        indexes = [models.Index(fields=['community', 'date'])]
+
+    def __str__(self):
+        return f"{self.title} - {self.date} (archived)"
+
+    def get_structure(self):
+        return upgrade_structure(self.structure_json, self.structure_version)
+
+    def get_group_structure(self, group):
+        """One of `groups`' structure, falling back to the session's like SessionGroup.get_structure."""
+        if group['structure_json']:
+            return upgrade_structure(group['structure_json'], group['structure_version'])
+        return self.get_structure()
+
+class WeeklyGroupRollup(models.Model):
+    """
+    One group's training totals for a community's week (starting Monday).
+    Recomputed for just the affected weeks whenever a session is saved, shifted
+    or deleted, so season charts never have to calculate plans. See
+    session_planner.rollups.
+    """
+    community = models.ForeignKey(Community, related_name='weekly_rollups', on_delete=models.CASCADE)
+    week_start = models.DateField()
+    group_name = models.CharField(max_length=50)
+    sessions = models.PositiveIntegerField(default=0)
+    distance_km = models.FloatField(default=0)
+    time_min = models.FloatField(default=0)
+    tss = models.FloatField(default=0)
+
+    class Meta:
+        ordering = ['week_start', 'group_name']
+        constraints = [
+            models.UniqueConstraint(fields=['community', 'week_start', 'group_name'], name='unique_weekly_group_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.group_name} w/c {self.week_start}"
+
+
+class CompletedSession(models.Model):
+    """
+    A member's record of having run a session, with the TSS of the group they ran
+    it with. The date and TSS are copied so the record outlives the session being
+    edited or archived.
+    """
+    user = models.ForeignKey(User, related_name='completed_sessions', on_delete=models.CASCADE)
+    session = models.ForeignKey(Session, related_name='completions', on_delete=models.SET_NULL, null=True, blank=True)
+    date = models.DateField()
+    group_name = models.CharField(max_length=50)
+    tss = models.FloatField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-date']
+        indexes = [models.Index(fields=['user', 'date'])]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'session'], name='unique_session_completion'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} completed {self.group_name} on {self.date}"
+
+class DailyLoad(models.Model):
+    """
+    A member's training load on a day they trained: the day's TSS and the
+    chronic/acute load and balance after it. Rest days are not stored, their
+    decay is applied when the next day is. See session_planner.fitness.
+    """
+    user = models.ForeignKey(User, related_name='daily_loads', on_delete=models.CASCADE)
+    day = models.DateField()
+    tss = models.FloatField()
+    ctl = models.FloatField()
+    atl = models.FloatField()
+    tsb = models.FloatField()
+
+    class Meta:
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day'], name='unique_daily_load'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.day}: CTL {self.ctl:.0f} ATL {self.atl:.0f}"
+
+class RunnerFitness(models.Model):
+    """
+    A member's most recent DailyLoad, denormalized with their community so the
+    club-wide overreaching list is a single indexed query.
+    """
+    user = models.OneToOneField(User, related_name='fitness', on_delete=models.CASCADE, primary_key=True)
+    community = models.ForeignKey(Community, related_name='runner_fitness', on_delete=models.CASCADE, null=True)
+    day = models.DateField()
+    ctl = models.FloatField()
+    atl = models.FloatField()
+    tsb = models.FloatField()
+
+    class Meta:
+        ordering = ['tsb']
+        indexes = [models.Index(fields=['community', 'tsb', 'day'])]
+
+    def __str__(self):
+        return f"{self.user}: TSB {self.tsb:.0f} on {self.day}"
+
+class ReminderDelivery(models.Model):
+    """A member's reminder digest for a day, recorded once sent so a rerun skips them."""
+    user = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
+    day = models.DateField()
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'user'], name='unique_reminder_delivery'),
+        ]
+
+    def __str__(self):
+        return f"Reminder for {self.day} to {self.user}"
+
+class ActivityUpload(models.Model):
+    """
+    A recorded activity (GPX, TCX or FIT) a member ran a session's group
+    workout with. The group's name, VDOT and structure are copied at upload, so
+    the activity is analysed against what was run even if the session is edited
+    before it is processed. The file is kept only until it has been processed;
+    what remains is the summary of each detected rep. See session_planner.activity.
+    """
+    PENDING = 'pending'
+    PROCESSED = 'processed'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (PROCESSED, 'Processed'),
+        (FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, related_name='activity_uploads', on_delete=models.CASCADE)
+    session = models.ForeignKey(Session, related_name='activity_uploads', on_delete=models.SET_NULL, null=True, blank=True)
+    group = models.ForeignKey(SessionGroup, related_name='+', on_delete=models.SET_NULL, null=True, blank=True)
+    group_name = models.CharField(max_length=50, blank=True)
+    vdot = models.FloatField(null=True, blank=True)
+    # The group's resolved structure, at CURRENT_STRUCTURE_VERSION
+    structure_json = models.JSONField(null=True, blank=True)
+    file = models.FileField(upload_to='activities/', blank=True)
+    format = models.CharField(max_length=3)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    error = models.CharField(max_length=200, blank=True)
+    # [{distance, time_s, pace_per_km_s, planned_distance, intensity, target_s, delta_s}, ...]
+    reps = models.JSONField(default=list, blank=True)
+    distance_m = models.PositiveIntegerField(null=True, blank=True)
+    duration_s = models.PositiveIntegerField(null=True, blank=True)
+    actual_tss = models.PositiveIntegerField(null=True, blank=True)
+    planned_tss = models.PositiveIntegerField(null=True, blank=True)
+    uploaded_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-uploaded_at']
+
+    def __str__(self):
+        return f"{self.user} {self.format.upper()} upload ({self.status})"
+
+    @property
+    def distance_km(self):
+        return (self.distance_m or 0) / 1000
+
+    @property
+    def duration_min(self):
+        return (self.duration_s or 0) / 60
+
+class SessionCheckIn(models.Model):
+    """A member's attendance at a session. See session_planner.checkins."""
+    session = models.ForeignKey(Session, related_name='check_ins', on_delete=models.CASCADE)
+    user = models.ForeignKey(User, related_name='session_check_ins', on_delete=models.CASCADE)
+    checked_in_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['checked_in_at']
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'user'], name='unique_session_check_in'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} at {self.session}"
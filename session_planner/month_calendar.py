@@ -0,0 +1,78 @@
+import calendar
+from datetime import date
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from communities.models import ArchivedCalendarEvent, CalendarEvent
+from communities.recurrence import events_between
+from .models import ArchivedSession, Session
+from .schedule_cache import get_schedule_version
+
+MONTH_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def shift_month(year, month, offset):
+    index = year * 12 + (month - 1) + offset
+    return index // 12, index % 12 + 1
+
+
+def _month_items(community, year, month, is_manager):
+    """The month's sessions and events, reduced to what a calendar cell shows."""
+    first = date(year, month, 1)
+    last = date(year, month, calendar.monthrange(year, month)[1])
+
+    sessions = Session.objects.filter(community=community, date__range=(first, last)).values_list('id', 'title', 'date')
+    # Archived rows keep their original ids, which session-detail redirects
+    archived_sessions = ArchivedSession.objects.filter(community=community, date__range=(first, last)).values_list(
+        'original_id', 'title', 'date',
+    )
+    events = CalendarEvent.objects.filter(community=community).only(
+        'id', 'title', 'date', 'is_public', 'recurrence', 'recurrence_until', 'community_id',
+    )
+    archived_events = ArchivedCalendarEvent.objects.filter(community=community, date__range=(first, last))
+    if not is_manager:
+        events = events.filter(is_public=True)
+        archived_events = archived_events.filter(is_public=True)
+
+    items = {}
+    for pk, title, day in sorted([*sessions, *archived_sessions], key=lambda row: (row[2], row[0])):
+        items.setdefault(day, []).append({'type': 'session', 'id': pk, 'title': title})
+    all_events = [
+        *((event.id, event.title, event.date, event.is_public) for event in events_between(events, first, last)),
+        *archived_events.values_list('original_id', 'title', 'date', 'is_public'),
+    ]
+    for pk, title, day, is_public in sorted(all_events, key=lambda row: (row[2], row[0])):
+        items.setdefault(day, []).append({'type': 'event', 'id': pk, 'title': title, 'is_public': is_public})
+    return items
+
+
+def render_month(community, year, month, is_manager):
+    """
+    Renders one month's grid. Cached per community, role and month against the
+    schedule version, so it is only rebuilt after the schedule changes.
+    """
+    today = timezone.now().date()
+    key = (
+        f"month-calendar:{community.id}:{'manager' if is_manager else 'member'}:{year}-{month:02d}:"
+        f"{get_schedule_version(community.id)}:{today}"
+    )
+    html = cache.get(key)
+    if html is None:
+        items = _month_items(community, year, month, is_manager)
+        weeks = [
+            [{'date': day, 'in_month': day.month == month, 'items': items.get(day, [])} for day in week]
+            for week in calendar.Calendar(firstweekday=0).monthdatescalendar(year, month)
+        ]
+        prev_year, prev_month = shift_month(year, month, -1)
+        next_year, next_month = shift_month(year, month, 1)
+        html = render_to_string('session_planner/partials/_month_grid.html', {
+            'month_start': date(year, month, 1),
+            'weeks': weeks,
+            'today': today,
+            'prev': {'year': prev_year, 'month': prev_month},
+            'next': {'year': next_year, 'month': next_month},
+        })
+        cache.set(key, html, MONTH_CACHE_TIMEOUT)
+    return html
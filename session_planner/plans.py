@@ -0,0 +1,141 @@
+import hashlib
+
+from django.core.cache import cache
+
+from workouts.utils import calculate_pace_from_vdot, calculate_tss, TRAINING_ZONES
+from .structure import structure_cache_key
+
+PLAN_CACHE_TIMEOUT = 60 * 60
+
+
+def _process_and_calculate_group_plan(group_name, group_vdot, structure, prefix=None):
+    """
+    Helper function to process a workout structure for a single group.
+    """
+    final_flat_segments = []  # Used for TSS and Totals
+    display_structure = []  # Used for rendering the Canvas card
+
+    total_active_dist_m = 0
+    total_active_time_s = 0
+    total_rest_time_s = 0
+    zone_time_s = {}
+
+    def process_segment(seg, block_multiplier=1):
+        nonlocal total_active_dist_m, total_active_time_s
+
+        if seg['intensity'] not in TRAINING_ZONES:
+             return None
+             
+        pace_data = calculate_pace_from_vdot(group_vdot, TRAINING_ZONES[seg['intensity']]['max'], seg['distance'])
+        if not pace_data:
+            return None
+
+        # Calculate 400m lap time
+        pace_per_km_s = pace_data['pace_per_km']['minutes'] * 60 + pace_data['pace_per_km']['seconds']
+        lap_time_s = pace_per_km_s * 0.4
+        lap_fmt = f"{int(lap_time_s // 60)}:{lap_time_s % 60:05.2f}"
+        split_100m_s = pace_per_km_s * 0.1
+        split_100m_fmt = f"{int(split_100m_s // 60)}:{split_100m_s % 60:05.2f}"
+
+        target_pace_fmt = f"{pace_data['target_pace']['minutes']}:{pace_data['target_pace']['seconds']:05.2f}"
+
+        # Totals calculation
+        pace_s = pace_data['target_pace']['minutes'] * 60 + pace_data['target_pace']['seconds']
+        effective_reps = seg['reps'] * block_multiplier
+        total_active_dist_m += seg['distance'] * effective_reps
+        total_active_time_s += pace_s * effective_reps
+        zone_time_s[seg['intensity']] = zone_time_s.get(seg['intensity'], 0) + pace_s * effective_reps
+
+        segment_data = {
+            **seg,
+            'target_pace': target_pace_fmt,
+            'lap_time': lap_fmt,
+            'split_100m': split_100m_fmt,
+        }
+
+        # Flatten for TSS (TSS needs total reps across all sets)
+        final_flat_segments.append({**segment_data, 'reps': effective_reps})
+        return segment_data
+
+    # Process structured workout into calc data
+    if not isinstance(structure, list):
+        structure = []
+    for item in structure:
+        if item['type'] == 'single':
+            calc_seg = process_segment(item['segment'])
+            if calc_seg:
+                display_structure.append({'type': 'single', 'segment': calc_seg})
+        elif item['type'] == 'block':
+            calc_block_segs = []
+            for s in item['segments']:
+                calc_seg = process_segment(s, block_multiplier=item['multiplier'])
+                if calc_seg:
+                    calc_block_segs.append(calc_seg)
+            display_structure.append({
+                'type': 'block',
+                'multiplier': item['multiplier'],
+                'segments': calc_block_segs
+            })
+
+    # 3. RE-CALCULATE REST TIME
+    for seg in final_flat_segments:
+        reps = int(seg['reps'])
+        rest = int(seg['rest'])
+        if reps > 1:
+            total_rest_time_s += (reps - 1) * rest
+            
+    if len(final_flat_segments) > 1:
+        for i in range(len(final_flat_segments) - 1):
+            total_rest_time_s += int(final_flat_segments[i]['rest'])
+
+    total_time_s = total_active_time_s + total_rest_time_s
+
+    # 4. PREPARE RESULTS
+    return {
+        'name': group_name,
+        'vdot': round(group_vdot, 2),
+        'prefix': prefix,
+        'workout_structure': display_structure,
+        'summary': {
+            'distance': f"{total_active_dist_m / 1000:.2f} km",
+            'active_time': f"{int(total_active_time_s // 60)}:{int(total_active_time_s % 60):02d}",
+            'total_time': f"{int(total_time_s // 60)}:{int(total_time_s % 60):02d}",
+            'tss': round(calculate_tss(group_vdot, final_flat_segments)) if group_vdot > 0 else 0,
+            "raw_distance_km": float(total_active_dist_m / 1000),
+            "raw_total_time_min": float(total_time_s / 60),
+            "zone_time_s": zone_time_s,
+        }
+    }
+
+
+def format_segment_text(seg):
+    """Formats a calculated segment as a single line, e.g. for WhatsApp or calendar descriptions."""
+    return (
+        f"{seg['reps']}x{seg['distance']}m @ {seg['intensity']} "
+        f"({seg['target_pace']} - Lap: {seg['lap_time']} - 100m: {seg['split_100m']}) [{seg['rest']}s rest]"
+    )
+
+
+def group_for_training_group(groups, training_group):
+    """
+    Picks the session group a member's training group ('a', 'b' or 'c') refers to.
+    Groups are matched by position, the same way the planner assigns its group prefixes.
+    """
+    groups = sorted(groups, key=lambda g: g.id)
+    index = 'abc'.find(training_group) if training_group else -1
+    if 0 <= index < len(groups):
+        return groups[index]
+    return None
+
+
+def get_group_plan(group_name, group_vdot, structure, prefix=None):
+    """
+    Cached _process_and_calculate_group_plan. A validated structure serializes
+    canonically, so its hash together with the group identifies the plan.
+    """
+    key = f"group-plan:{structure_cache_key(structure)}:{group_vdot}:{group_name}:{prefix or ''}"
+    return cache.get_or_set(
+        hashlib.sha256(key.encode()).hexdigest(),
+        lambda: _process_and_calculate_group_plan(group_name, group_vdot, structure, prefix=prefix),
+        PLAN_CACHE_TIMEOUT,
+    )
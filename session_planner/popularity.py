@@ -0,0 +1,63 @@
+"""
+Block popularity. Copies and applications are counted with in-place F()
+increments, on the block for lifetime totals and in a per-day bucket for
+recency; the trending list is recomputed from the buckets periodically and
+stored in TrendingBlock.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import BlockUsageDay, TrainingBlock, TrendingBlock
+
+COPY = 'copy'
+APPLY = 'apply'
+# Copying a block into another club says more about it than re-scheduling it
+WEIGHTS = {COPY: 3.0, APPLY: 1.0}
+HALF_LIFE_DAYS = 14
+WINDOW_DAYS = 90
+TRENDING_SIZE = 20
+
+_TOTAL_FIELDS = {COPY: 'copy_count', APPLY: 'apply_count'}
+_DAY_FIELDS = {COPY: 'copies', APPLY: 'applies'}
+
+
+def record_block_use(block_id, kind):
+    """Counts a copy or an application of a block. Never reads the counters it increments."""
+    total_field, day_field = _TOTAL_FIELDS[kind], _DAY_FIELDS[kind]
+    today = timezone.now().date()
+    TrainingBlock.objects.filter(pk=block_id).update(**{total_field: F(total_field) + 1})
+    # The bucket is created at zero if it's the day's first use, then incremented
+    # like the total, so concurrent first uses can't lose a count
+    BlockUsageDay.objects.bulk_create([BlockUsageDay(block_id=block_id, day=today)], ignore_conflicts=True)
+    BlockUsageDay.objects.filter(block_id=block_id, day=today).update(**{day_field: F(day_field) + 1})
+
+
+def trending_scores(today=None):
+    """Decay-weighted usage per tradeable block over the last WINDOW_DAYS."""
+    today = today or timezone.now().date()
+    scores = {}
+    usage = BlockUsageDay.objects.filter(
+        day__gt=today - timedelta(days=WINDOW_DAYS), block__is_tradeable=True,
+    ).values_list('block_id', 'day', 'copies', 'applies')
+    for block_id, day, copies, applies in usage.iterator():
+        decay = 0.5 ** ((today - day).days / HALF_LIFE_DAYS)
+        weighted = copies * WEIGHTS[COPY] + applies * WEIGHTS[APPLY]
+        scores[block_id] = scores.get(block_id, 0.0) + weighted * decay
+    return scores
+
+
+def refresh_trending_blocks():
+    """Rebuilds the trending list. Returns the number of blocks on it."""
+    now = timezone.now()
+    scores = trending_scores(now.date())
+    top = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:TRENDING_SIZE]
+    with transaction.atomic():
+        TrendingBlock.objects.all().delete()
+        TrendingBlock.objects.bulk_create([
+            TrendingBlock(block_id=block_id, rank=rank, score=round(score, 3), refreshed_at=now)
+            for rank, (block_id, score) in enumerate(top, start=1)
+        ])
+    return len(top)
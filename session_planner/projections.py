@@ -0,0 +1,103 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+
+from workouts.utils import TRAINING_ZONES
+from .plans import _process_and_calculate_group_plan
+
+# Projections are keyed on their inputs, so a long timeout is safe: any edit to a
+# template or to the group VDOTs produces a new key.
+PROJECTION_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def community_group_vdots(community):
+    """Returns the (name, vdot) pairs for a community's default groups that have a VDOT set."""
+    if not community:
+        return []
+    groups = [
+        ('Group A', community.vdot_group_a),
+        ('Group B', community.vdot_group_b),
+        ('Group C', community.vdot_group_c),
+    ]
+    return [(name, float(vdot)) for name, vdot in groups if vdot]
+
+
+def _format_minutes(total_seconds):
+    return f"{int(total_seconds // 60)}:{int(total_seconds % 60):02d}"
+
+
+def _projection_cache_key(block, templates, group_vdots):
+    payload = json.dumps({
+        'templates': [[t.id, t.week_number, t.title, t.get_structure()] for t in templates],
+        'groups': group_vdots,
+    }, sort_keys=True, separators=(',', ':'))
+    digest = hashlib.sha256(payload.encode()).hexdigest()
+    return f'block-projection:{block.id}:{digest}'
+
+
+def _build_block_projection(templates, group_vdots):
+    weeks = {}
+    for template in templates:
+        structure = template.get_structure()
+        week = weeks.setdefault(template.week_number, {
+            'week_number': template.week_number,
+            'titles': [],
+            'cells': [{'tss': 0, 'distance_m': 0.0, 'zone_time_s': {}} for _ in group_vdots],
+        })
+        week['titles'].append(template.title)
+
+        for cell, (name, vdot) in zip(week['cells'], group_vdots):
+            plan = _process_and_calculate_group_plan(name, vdot, structure)
+            cell['tss'] += plan['summary']['tss']
+            cell['distance_m'] += plan['summary']['raw_distance_km'] * 1000
+            for zone, seconds in plan['summary']['zone_time_s'].items():
+                cell['zone_time_s'][zone] = cell['zone_time_s'].get(zone, 0) + seconds
+
+    rows = [weeks[week_number] for week_number in sorted(weeks)]
+    totals = [{'tss': 0, 'distance_m': 0.0} for _ in group_vdots]
+    for row in rows:
+        for total, cell in zip(totals, row['cells']):
+            total['tss'] += cell['tss']
+            total['distance_m'] += cell['distance_m']
+            cell['distance'] = f"{cell['distance_m'] / 1000:.2f} km"
+            # Keep the zones in the same easy -> hard order as TRAINING_ZONES
+            cell['zones'] = [
+                {'zone': zone, 'time': _format_minutes(cell['zone_time_s'][zone])}
+                for zone in TRAINING_ZONES if cell['zone_time_s'].get(zone)
+            ]
+
+    for total in totals:
+        total['distance'] = f"{total['distance_m'] / 1000:.2f} km"
+
+    peak = max((cell['tss'] for row in rows for cell in row['cells']), default=0)
+
+    return {
+        'groups': [{'name': name, 'vdot': round(vdot, 2)} for name, vdot in group_vdots],
+        'weeks': rows,
+        'totals': totals,
+        'week_count': len(rows),
+        'peak_tss': peak,
+    }
+
+
+def get_block_projection(block, group_vdots, templates=None):
+    """
+    Evaluates every template of a block against every group VDOT and returns a
+    week-by-group matrix of TSS, distance and time in each training zone.
+
+    Results are cached per (block, template contents, group VDOTs), so callers can
+    pass prefetched templates and pay only for building the key on a hit.
+    """
+    if not group_vdots:
+        return None
+    if templates is None:
+        templates = block.templates.all()
+    templates = sorted(templates, key=lambda t: (t.week_number, t.id))
+
+    key = _projection_cache_key(block, templates, group_vdots)
+    projection = cache.get(key)
+    if projection is None:
+        projection = _build_block_projection(templates, group_vdots)
+        cache.set(key, projection, PROJECTION_CACHE_TIMEOUT)
+    return projection
@@ -0,0 +1,137 @@
+"""
+The evening-before reminder digest. Every member of a community with a session
+or public event the next day gets one email listing them, with their own
+group's paces first. Digests are rendered once per community and training
+group, not per member, and each goes out as one message per batch of members
+who get it: anymail turns its merge_data into a batch send, so every member
+still receives their own copy. Calls are made over a single mail connection at
+no more than settings.REMINDER_CALLS_PER_SECOND, and each member's delivery is
+recorded so a rerun after a failure only sends what is missing.
+"""
+import logging
+import time
+from itertools import batched, groupby
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, mailers
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+from communities.models import CalendarEvent, Community, UserProfile
+from communities.recurrence import events_between
+from .models import ReminderDelivery, Session
+from .plans import get_group_plan, group_for_training_group
+
+logger = logging.getLogger(__name__)
+
+
+def _community_plans(day):
+    """{community_id: (sessions with their group plans, public events)} for the day."""
+    plans = {}
+    sessions = Session.objects.filter(date=day).exclude(community=None).prefetch_related('groups').order_by('id')
+    for session in sessions:
+        groups = sorted(session.groups.all(), key=lambda group: group.id)
+        session.group_plans = [(group, get_group_plan(group.name, group.vdot, group.get_structure())) for group in groups]
+        plans.setdefault(session.community_id, ([], []))[0].append(session)
+    for event in events_between(CalendarEvent.objects.filter(is_public=True), day, day):
+        plans.setdefault(event.community_id, ([], []))[1].append(event)
+    return plans
+
+
+def _render_digest(community, day, sessions, events, training_group, base_url):
+    """(subject, text, html) of a community's digest as seen by one training group."""
+    items = []
+    for session in sessions:
+        own_group = group_for_training_group([group for group, _ in session.group_plans], training_group)
+        plans = sorted(session.group_plans, key=lambda pair: pair[0] != own_group)
+        items.append({
+            'session': session,
+            'url': base_url + reverse('session-detail', kwargs={'pk': session.id}),
+            'plans': [plan for _, plan in plans],
+            'own_group': own_group.name if own_group else None,
+        })
+    context = {
+        'community': community,
+        'community_url': base_url + reverse('community-detail', kwargs={'slug': community.slug}),
+        'day': day,
+        'sessions': items,
+        'events': events,
+        'profile_url': base_url + reverse('profile'),
+    }
+    subject = f"Tomorrow at {community.name}: " + ", ".join([s.title for s in sessions] + [e.title for e in events])
+    return (
+        subject[:150],
+        render_to_string('session_planner/email/reminder_digest.txt', context),
+        render_to_string('session_planner/email/reminder_digest.html', context),
+    )
+
+
+def reminder_batches(day, batch_size):
+    """
+    Yields (user_ids, message) for the day's digests: one message per batch of
+    up to batch_size members who get the same digest and haven't been sent it.
+    """
+    plans = _community_plans(day)
+    if not plans:
+        return
+    base_url = settings.SITE_URL
+    communities = Community.objects.in_bulk(list(plans))
+
+    members = (
+        UserProfile.objects.filter(community_id__in=list(plans), session_reminders=True, user__is_active=True)
+        .exclude(user__email='')
+        .exclude(user_id__in=ReminderDelivery.objects.filter(day=day).values('user_id'))
+        .values_list('community_id', 'training_group', 'user_id', 'user__email')
+        .order_by('community_id', 'training_group', 'user_id')
+    )
+    rows = members.iterator(chunk_size=1000)
+    for (community_id, training_group), digest_rows in groupby(rows, key=lambda row: row[:2]):
+        sessions, events = plans[community_id]
+        subject, text, html = _render_digest(communities[community_id], day, sessions, events, training_group, base_url)
+        for batch in batched(digest_rows, batch_size):
+            emails = [email for _, _, _, email in batch]
+            message = EmailMultiAlternatives(subject, text, settings.DEFAULT_FROM_EMAIL, emails)
+            message.attach_alternative(html, 'text/html')
+            # Sent to each recipient separately, none of them sees the others
+            message.merge_data = {email: {} for email in emails}
+            yield [user_id for _, _, user_id, _ in batch], message
+
+
+def _one_per_recipient(message):
+    """Splits a batch message for backends that would send it as one email to everyone."""
+    for email in message.to:
+        single = EmailMultiAlternatives(message.subject, message.body, message.from_email, [email])
+        single.alternatives = message.alternatives
+        yield single
+
+
+def send_reminders(day, batch_size=None, per_second=None):
+    """
+    Sends the day's digests over one connection, one call per batch of
+    batch_size, sleeping between calls to stay under per_second. A batch that
+    fails is logged and left unrecorded for the next run. Returns the number of
+    members sent a digest.
+    """
+    batch_size = batch_size or settings.REMINDER_BATCH_SIZE
+    per_second = per_second or settings.REMINDER_CALLS_PER_SECOND
+    sent = 0
+    next_call_at = time.monotonic()
+    with mailers.default as connection:
+        # anymail backends (Resend) batch-send a message with merge_data
+        batch_sending = hasattr(connection, 'esp_name')
+        for user_ids, message in reminder_batches(day, batch_size):
+            messages = [message] if batch_sending else list(_one_per_recipient(message))
+            wait = next_call_at - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            next_call_at = time.monotonic() + len(messages) / per_second
+            try:
+                connection.send_messages(messages)
+            except Exception:
+                logger.exception("Sending %d reminders for %s failed", len(user_ids), day)
+                continue
+            ReminderDelivery.objects.bulk_create(
+                [ReminderDelivery(user_id=user_id, day=day) for user_id in user_ids], ignore_conflicts=True,
+            )
+            sent += len(user_ids)
+    return sent
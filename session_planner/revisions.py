@@ -0,0 +1,110 @@
+from django.db import transaction
+
+from .concurrency import claim_version
+from .jsonpatch import apply_patch, make_patch
+from .models import SessionGroup, SessionRevision
+from .structure import CURRENT_STRUCTURE_VERSION
+
+# Every Nth revision stores a full snapshot, so rebuilding one applies at most N - 1 patches
+SNAPSHOT_INTERVAL = 10
+
+
+def session_document(session):
+    """Everything a revision captures about a session, as plain JSON."""
+    return {
+        'title': session.title,
+        'date': str(session.date),
+        'description': session.description,
+        'structure': session.get_structure(),
+        'groups': [
+            {
+                'name': group.name,
+                'vdot': group.vdot,
+                # None means the group follows the session's structure
+                'structure': group.get_structure() if group.structure_json else None,
+            }
+            for group in session.groups.all().order_by('id')
+        ],
+    }
+
+
+def revision_document(session, number):
+    """Rebuilds the session document as of a revision: nearest snapshot, then patches."""
+    base = session.revisions.filter(number__lte=number, snapshot__isnull=False).order_by('-number').first()
+    if base is None:
+        raise SessionRevision.DoesNotExist(f"No snapshot at or before revision {number}")
+    document = base.snapshot
+    for revision in session.revisions.filter(number__gt=base.number, number__lte=number).order_by('number'):
+        document = apply_patch(document, revision.patch)
+    return document
+
+
+def record_revision(session, author=None):
+    """
+    Stores the session's current state as a new revision, unless nothing changed
+    since the last one. Returns the latest revision.
+    """
+    latest = session.revisions.order_by('-number').first()
+    document = session_document(session)
+    if latest is None:
+        return SessionRevision.objects.create(session=session, number=1, author=author, snapshot=document)
+
+    previous = revision_document(session, latest.number)
+    if previous == document:
+        return latest
+    number = latest.number + 1
+    if (number - 1) % SNAPSHOT_INTERVAL == 0:
+        return SessionRevision.objects.create(session=session, number=number, author=author, snapshot=document)
+    return SessionRevision.objects.create(
+        session=session, number=number, author=author, patch=make_patch(previous, document),
+    )
+
+
+def ensure_baseline_revision(session):
+    """Records the pre-edit state of sessions created before revisions existed."""
+    if not session.revisions.exists():
+        record_revision(session, author=session.creator)
+
+
+def changed_fields(revision):
+    """Top-level fields a revision touched, for the history list."""
+    if revision.patch is None:
+        return []
+    fields = []
+    for op in revision.patch:
+        field = op['path'].split('/')[1] if op['path'] else ''
+        if field not in fields:
+            fields.append(field)
+    return fields
+
+
+def restore_revision(session, number, author=None, expected_version=None):
+    """
+    Puts a session back to a past revision, recorded as a new revision. Returns
+    None, changing nothing, if the session was saved since expected_version.
+    """
+    document = revision_document(session, number)
+    with transaction.atomic():
+        if not claim_version(session, session.version if expected_version is None else expected_version):
+            return None
+        session.title = document['title']
+        session.date = document['date']
+        session.description = document['description']
+        session.structure_json = document['structure']
+        session.structure_version = CURRENT_STRUCTURE_VERSION
+        session.save()
+
+        # Matched by name and updated in place, as when the session is edited
+        existing = {}
+        for group in session.groups.all().order_by('id'):
+            existing.setdefault(group.name, group)
+        kept = []
+        for restored in document['groups']:
+            group = existing.pop(restored['name'], None) or SessionGroup(session=session, name=restored['name'])
+            group.vdot = restored['vdot']
+            group.structure_json = restored['structure']
+            group.structure_version = CURRENT_STRUCTURE_VERSION
+            group.save()
+            kept.append(group.id)
+        session.groups.exclude(id__in=kept).delete()
+        return record_revision(session, author=author)
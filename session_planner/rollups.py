@@ -0,0 +1,92 @@
+"""
+Weekly per-group rollups of planned volume and load. A change to a session
+only marks its week (and, when it moved, its previous week) dirty; dirty weeks
+are recomputed once when the transaction commits, from that week's sessions
+alone, live and archived.
+"""
+import threading
+from datetime import date, timedelta
+from functools import partial
+
+from django.db import transaction
+
+from .models import ArchivedSession, Session, WeeklyGroupRollup
+from .plans import get_group_plan
+
+_pending = threading.local()
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def _week_groups(community_id, monday):
+    """(name, vdot, structure) of every group of every session in the week."""
+    sunday = monday + timedelta(days=6)
+    sessions = Session.objects.filter(community_id=community_id, date__range=(monday, sunday)).prefetch_related('groups')
+    for session in sessions:
+        for group in session.groups.all():
+            yield group.name, group.vdot, group.get_structure()
+    for archived in ArchivedSession.objects.filter(community_id=community_id, date__range=(monday, sunday)):
+        for group in archived.groups:
+            yield group['name'], group['vdot'], archived.get_group_structure(group)
+
+
+def recompute_week(community_id, monday):
+    totals = {}
+    for name, vdot, structure in _week_groups(community_id, monday):
+        summary = get_group_plan(name, vdot, structure)['summary']
+        row = totals.setdefault(name, WeeklyGroupRollup(community_id=community_id, week_start=monday, group_name=name))
+        row.sessions += 1
+        row.distance_km += summary['raw_distance_km']
+        row.time_min += summary['raw_total_time_min']
+        row.tss += summary['tss']
+    with transaction.atomic():
+        WeeklyGroupRollup.objects.filter(community_id=community_id, week_start=monday).delete()
+        WeeklyGroupRollup.objects.bulk_create(totals.values())
+
+
+def _flush_week(key):
+    getattr(_pending, 'weeks', {}).pop(key, None)
+    recompute_week(*key)
+
+
+def mark_week_dirty(community_id, day):
+    """
+    Schedules the week containing `day` to be recomputed on commit. Repeated
+    marks in one transaction (a session and each of its groups being saved)
+    only recompute the week once.
+    """
+    if community_id is None or day is None:
+        return
+    if isinstance(day, str):
+        # Sessions saved straight from a form still hold the posted date string
+        day = date.fromisoformat(day)
+    key = (community_id, week_start(day))
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        recompute_week(*key)
+        return
+    # Pending marks belong to the outermost transaction that made them; one
+    # left over from a transaction that rolled back doesn't count
+    outer = connection.atomic_blocks[0]
+    pending = _pending.__dict__.setdefault('weeks', {})
+    if pending.get(key) is outer:
+        return
+    pending[key] = outer
+    transaction.on_commit(partial(_flush_week, key))
+
+
+def rebuild_rollups(community_id=None):
+    """Recomputes every week that has sessions. Returns the number of weeks."""
+    weeks = set()
+    for model in (Session, ArchivedSession):
+        rows = model.objects.exclude(community=None)
+        if community_id is not None:
+            rows = rows.filter(community_id=community_id)
+        weeks.update((cid, week_start(day)) for cid, day in rows.values_list('community_id', 'date').iterator())
+    for cid in {cid for cid, _ in weeks}:
+        WeeklyGroupRollup.objects.filter(community_id=cid).exclude(week_start__in=[m for c, m in weeks if c == cid]).delete()
+    for key in sorted(weeks):
+        recompute_week(*key)
+    return len(weeks)
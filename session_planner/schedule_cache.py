@@ -0,0 +1,22 @@
+import uuid
+
+from django.core.cache import cache
+
+
+def _version_key(community_id):
+    return f'schedule-version:{community_id}'
+
+
+def get_schedule_version(community_id):
+    """
+    Returns the current cache version for a community's schedule.
+    Anything rendered from a community's sessions or events should include this
+    in its cache key so it is rebuilt once the schedule changes.
+    """
+    return cache.get_or_set(_version_key(community_id), lambda: uuid.uuid4().hex, None)
+
+
+def bump_schedule_version(community_id):
+    """Invalidates everything cached against the community's schedule."""
+    if community_id:
+        cache.set(_version_key(community_id), uuid.uuid4().hex, None)
@@ -0,0 +1,116 @@
+"""
+Full-text search over tradeable training blocks for the marketplace.
+
+BlockSearchDocument holds each tradeable block's title, target distance,
+template titles and description. On Postgres it carries a generated, weighted
+tsvector column with a GIN index; on SQLite an external-content FTS5 table is
+kept in step with it by triggers. Both are created by migration 0013. Other
+databases fall back to unranked substring matching.
+"""
+import re
+
+from django.db import connection
+
+from .models import BlockSearchDocument, TrainingBlock
+
+FTS_TABLE = 'session_planner_blocksearch_fts'
+DOCUMENT_TABLE = 'session_planner_blocksearchdocument'
+# Title matches count most, then distance and week titles, then the description
+WEIGHTS = (10.0, 5.0, 5.0, 1.0)
+MAX_QUERY_TERMS = 12
+
+
+def index_block(block):
+    """Writes a block's search document, or removes it if the block isn't tradeable."""
+    if not block.is_tradeable:
+        BlockSearchDocument.objects.filter(block_id=block.pk).delete()
+        return
+    titles = block.templates.order_by('week_number').values_list('title', flat=True)
+    BlockSearchDocument.objects.update_or_create(block_id=block.pk, defaults={
+        'title': block.title,
+        'target_distance': block.target_distance,
+        'template_titles': ' '.join(titles),
+        'description': block.description,
+    })
+
+
+def _terms(query):
+    return re.findall(r'\w+', query.lower())[:MAX_QUERY_TERMS]
+
+
+class BlockSearchResults:
+    """
+    Ranked matches for a query, sliceable and countable so it can be handed to
+    a Paginator: only the requested page of blocks is ever fetched.
+    """
+
+    def __init__(self, query):
+        self.terms = _terms(query)
+        self.vendor = connection.vendor
+
+    def _sql(self, select, order_and_limit=''):
+        if self.vendor == 'postgresql':
+            return (
+                f"SELECT {select} FROM {DOCUMENT_TABLE}, websearch_to_tsquery('english', %s) query "
+                f"WHERE search_vector @@ query {order_and_limit}",
+                [' '.join(self.terms)],
+            )
+        # Each term is quoted so user input can't use FTS5 query syntax; the last
+        # one matches as a prefix while it's still being typed
+        match = ' '.join(f'"{term}"' for term in self.terms) + '*'
+        return f"SELECT {select} FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s {order_and_limit}", [match]
+
+    def count(self):
+        if not self.terms:
+            return 0
+        if self.vendor not in ('postgresql', 'sqlite'):
+            return self._fallback().count()
+        sql, params = self._sql('COUNT(*)')
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        if not self.terms:
+            return []
+        start = index.start or 0
+        limit = (index.stop - start) if index.stop is not None else -1
+        if self.vendor not in ('postgresql', 'sqlite'):
+            return list(self._fallback()[index])
+
+        if self.vendor == 'postgresql':
+            sql, params = self._sql(
+                "block_id", "ORDER BY ts_rank_cd(search_vector, query) DESC, block_id LIMIT %s OFFSET %s",
+            )
+        else:
+            weights = ', '.join(str(weight) for weight in WEIGHTS)
+            sql, params = self._sql(
+                "rowid", f"ORDER BY bm25({FTS_TABLE}, {weights}), rowid LIMIT %s OFFSET %s",
+            )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + [limit if limit >= 0 else 10 ** 9, start])
+            ids = [row[0] for row in cursor.fetchall()]
+        blocks = TrainingBlock.objects.select_related('community').prefetch_related('templates').in_bulk(ids)
+        return [blocks[pk] for pk in ids if pk in blocks]
+
+    def _fallback(self):
+        from django.db.models import Q
+        condition = Q()
+        for term in self.terms:
+            condition &= (
+                Q(search_document__title__icontains=term) | Q(search_document__target_distance__icontains=term)
+                | Q(search_document__template_titles__icontains=term) | Q(search_document__description__icontains=term)
+            )
+        return (
+            TrainingBlock.objects.filter(condition, is_tradeable=True)
+            .select_related('community').prefetch_related('templates').order_by('-created_at')
+        )
+
+
+def search_blocks(query):
+    return BlockSearchResults(query)
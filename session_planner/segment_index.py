@@ -0,0 +1,160 @@
+import threading
+from functools import partial
+
+from django.db import transaction
+
+from .models import ArchivedSession, BlockSessionTemplate, IndexedSegment, Session
+
+_pending = threading.local()
+
+# Rep distances offered by the planner, used for the library and history filters
+TRACK_DISTANCES = (200, 400, 600, 800, 1000, 1200, 1600)
+
+def structure_segments(structure):
+    """Flattens a structure into IndexedSegment field dicts, in workout order."""
+    rows = []
+    if not isinstance(structure, list):
+        return rows
+    for item in structure:
+        if not isinstance(item, dict):
+            continue
+        if item.get('type') == 'block':
+            multiplier = item.get('multiplier') or 1
+            segments = item.get('segments') or []
+        elif item.get('type') == 'single':
+            multiplier = 1
+            segments = [item.get('segment')]
+        else:
+            continue
+        for segment in segments:
+            if not isinstance(segment, dict):
+                continue
+            try:
+                rows.append({
+                    'position': len(rows),
+                    'distance': int(segment.get('distance', 0)),
+                    'intensity': segment.get('intensity', ''),
+                    'reps': int(segment.get('reps', 1)),
+                    'rest': int(segment.get('rest', 0)),
+                    'multiplier': int(multiplier),
+                })
+            except (TypeError, ValueError):
+                continue
+    return rows
+
+
+def _session_rows(session):
+    """
+    Rows for the session's structure and for any group that runs a different
+    one, so a filter finds a session by what any of its groups does.
+    """
+    structure = session.get_structure()
+    structures = [structure]
+    for group in session.groups.all():
+        if group.structure_json:
+            group_structure = group.get_structure()
+            if group_structure not in structures:
+                structures.append(group_structure)
+    return [
+        IndexedSegment(session=session, community_id=session.community_id, date=session.date, **row)
+        for structure in structures
+        for row in structure_segments(structure)
+    ]
+
+
+def _archived_rows(archived):
+    """_session_rows for an archived session, whose groups are kept inline."""
+    structures = [archived.get_structure()]
+    for group in archived.groups:
+        group_structure = archived.get_group_structure(group)
+        if group_structure not in structures:
+            structures.append(group_structure)
+    return [
+        IndexedSegment(archived_session=archived, community_id=archived.community_id, date=archived.date, **row)
+        for structure in structures
+        for row in structure_segments(structure)
+    ]
+
+
+def _template_rows(template):
+    return [IndexedSegment(template=template, **row) for row in structure_segments(template.get_structure())]
+
+
+def index_session(session):
+    with transaction.atomic():
+        IndexedSegment.objects.filter(session=session).delete()
+        IndexedSegment.objects.bulk_create(_session_rows(session))
+
+
+def _flush_session(session_id):
+    getattr(_pending, 'sessions', {}).pop(session_id, None)
+    # Gone if the session was deleted or archived in the same transaction
+    session = Session.objects.filter(pk=session_id).prefetch_related('groups').first()
+    if session is not None:
+        index_session(session)
+
+
+def mark_session_dirty(session_id):
+    """
+    Schedules the session to be re-indexed on commit. Saving a session and
+    each of its groups in one transaction only indexes it once.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        _flush_session(session_id)
+        return
+    # A callback discarded by a rollback no longer counts as scheduled
+    pending = _pending.__dict__.setdefault('sessions', {})
+    scheduled = pending.get(session_id)
+    if scheduled is not None and any(func is scheduled for _, func, _ in connection.run_on_commit):
+        return
+    pending[session_id] = partial(_flush_session, session_id)
+    transaction.on_commit(pending[session_id])
+
+
+def index_template(template):
+    with transaction.atomic():
+        IndexedSegment.objects.filter(template=template).delete()
+        IndexedSegment.objects.bulk_create(_template_rows(template))
+
+
+def _bulk_index(objects, build_rows, batch_size):
+    count, batch = 0, []
+    for obj in objects.iterator(chunk_size=batch_size):
+        batch.extend(build_rows(obj))
+        count += 1
+        if len(batch) >= batch_size:
+            IndexedSegment.objects.bulk_create(batch)
+            batch = []
+    IndexedSegment.objects.bulk_create(batch)
+    return count
+
+
+def rebuild_index(batch_size=500):
+    """Re-indexes every session (live or archived) and template. Returns the (sessions, templates) counts."""
+    with transaction.atomic():
+        IndexedSegment.objects.all().delete()
+        sessions = _bulk_index(
+            Session.objects.only('id', 'community_id', 'date', 'structure_json', 'structure_version').prefetch_related('groups'),
+            _session_rows, batch_size,
+        )
+        sessions += _bulk_index(ArchivedSession.objects.all(), _archived_rows, batch_size)
+        templates = _bulk_index(BlockSessionTemplate.objects.only('id', 'structure_json', 'structure_version'), _template_rows, batch_size)
+    return sessions, templates
+
+
+def filter_by_segment(queryset, distance=None, intensity=None):
+    """
+    Narrows a Session, ArchivedSession or TrainingBlock queryset to those
+    containing a segment of the given distance and/or intensity, matched within
+    the same indexed row.
+    """
+    lookup = 'indexed_segments' if queryset.model in (Session, ArchivedSession) else 'templates__indexed_segments'
+    conditions = {}
+    if distance:
+        conditions[f'{lookup}__distance'] = distance
+    if intensity:
+        conditions[f'{lookup}__intensity'] = intensity
+    if not conditions:
+        return queryset
+    return queryset.filter(**conditions).distinct()
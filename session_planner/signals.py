@@ -0,0 +1,111 @@
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from communities.models import CalendarEvent, CalendarEventException, UserProfile
+from .fitness import update_daily_load
+from .models import BlockSessionTemplate, CompletedSession, RunnerFitness, Session, SessionGroup, TrainingBlock
+from .rollups import mark_week_dirty
+from .schedule_cache import bump_schedule_version
+from .search import index_block
+from .segment_index import index_template, mark_session_dirty
+from .similarity import store_features
+
+
+@receiver(post_save, sender=Session)
+@receiver(post_delete, sender=Session)
+def session_changed(sender, instance, **kwargs):
+    bump_schedule_version(instance.community_id)
+
+
+@receiver(post_save, sender=Session)
+def reindex_session(sender, instance, **kwargs):
+    mark_session_dirty(instance.pk)
+    store_features('session', instance)
+
+
+@receiver(post_save, sender=BlockSessionTemplate)
+def reindex_template(sender, instance, **kwargs):
+    index_template(instance)
+    store_features('template', instance)
+
+
+@receiver(post_save, sender=SessionGroup)
+@receiver(post_delete, sender=SessionGroup)
+def reindex_session_group(sender, instance, origin=None, **kwargs):
+    # A group can run its own structure, which is indexed with the session's.
+    # Groups removed as part of deleting their session leave nothing to index.
+    if getattr(origin, 'model', type(origin)) is Session:
+        return
+    mark_session_dirty(instance.session_id)
+
+
+@receiver(post_save, sender=SessionGroup)
+@receiver(post_delete, sender=SessionGroup)
+def session_group_changed(sender, instance, **kwargs):
+    # Looked up rather than read from instance.session, which may already be gone
+    # when the group is removed as part of deleting its session.
+    community_id = Session.objects.filter(id=instance.session_id).values_list('community_id', flat=True).first()
+    bump_schedule_version(community_id)
+
+
+@receiver(post_save, sender=CalendarEvent)
+@receiver(post_delete, sender=CalendarEvent)
+def calendar_event_changed(sender, instance, **kwargs):
+    bump_schedule_version(instance.community_id)
+
+
+@receiver(post_save, sender=CalendarEventException)
+@receiver(post_delete, sender=CalendarEventException)
+def calendar_event_exception_changed(sender, instance, **kwargs):
+    community_id = CalendarEvent.objects.filter(id=instance.event_id).values_list('community_id', flat=True).first()
+    bump_schedule_version(community_id)
+
+
+@receiver(post_save, sender=TrainingBlock)
+def reindex_block_search(sender, instance, **kwargs):
+    index_block(instance)
+
+
+@receiver(post_save, sender=BlockSessionTemplate)
+@receiver(post_delete, sender=BlockSessionTemplate)
+def reindex_template_block_search(sender, instance, **kwargs):
+    # The block is gone too when its templates are deleted along with it
+    block = TrainingBlock.objects.filter(pk=instance.block_id).first()
+    if block is not None:
+        index_block(block)
+
+
+@receiver(pre_save, sender=Session)
+def remember_session_week(sender, instance, **kwargs):
+    # A shifted or moved session also changes the totals of the week it left
+    instance._previous_week = None
+    if instance.pk:
+        instance._previous_week = Session.objects.filter(pk=instance.pk).values_list('community_id', 'date').first()
+
+
+@receiver(post_save, sender=Session)
+@receiver(post_delete, sender=Session)
+def session_rollup_changed(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_week', None)
+    if previous:
+        mark_week_dirty(*previous)
+    mark_week_dirty(instance.community_id, instance.date)
+
+
+@receiver(post_save, sender=SessionGroup)
+@receiver(post_delete, sender=SessionGroup)
+def session_group_rollup_changed(sender, instance, **kwargs):
+    row = Session.objects.filter(id=instance.session_id).values_list('community_id', 'date').first()
+    if row:
+        mark_week_dirty(*row)
+
+
+@receiver(post_save, sender=CompletedSession)
+@receiver(post_delete, sender=CompletedSession)
+def completion_changed(sender, instance, **kwargs):
+    update_daily_load(instance.user_id, instance.date)
+
+
+@receiver(post_save, sender=UserProfile)
+def follow_member_community(sender, instance, **kwargs):
+    RunnerFitness.objects.filter(user_id=instance.user_id).exclude(community_id=instance.community_id).update(community_id=instance.community_id)
@@ -0,0 +1,105 @@
+"""
+Similar-workout lookup. Each session and block template structure is reduced to a
+fixed-length, L2-normalized feature vector when it is saved (WorkoutFeatures),
+so a cosine nearest-neighbour query is one read of the candidates' vectors and
+a pass of dot products.
+"""
+import heapq
+import math
+
+from django.db import transaction
+from django.db.models import Q
+
+from workouts.utils import TRAINING_ZONES
+from .models import BlockSessionTemplate, Session, WorkoutFeatures
+from .plans import _process_and_calculate_group_plan
+from .segment_index import structure_segments
+from .structure import upgrade_structure
+
+# Every workout is scored as if run by the same athlete, so TSS is comparable
+REFERENCE_VDOT = 50
+# Upper bounds of the rep-distance buckets; anything longer lands in a final bucket
+DISTANCE_BUCKETS = (200, 400, 800, 1200)
+ZONES = tuple(TRAINING_ZONES)
+
+
+def _bucket(distance):
+    for index, bound in enumerate(DISTANCE_BUCKETS):
+        if distance <= bound:
+            return index
+    return len(DISTANCE_BUCKETS)
+
+
+def feature_vector(structure):
+    """
+    Returns the unit-length feature vector for a structure, or None if it has no
+    volume. Features: share of total volume in each zone x distance bucket, total
+    volume (per 10 km), TSS at the reference VDOT (per 100) and rest ratio.
+    """
+    buckets = len(DISTANCE_BUCKETS) + 1
+    volume = [0.0] * (len(ZONES) * buckets)
+    for row in structure_segments(structure):
+        if row['intensity'] not in TRAINING_ZONES:
+            continue
+        meters = row['reps'] * row['distance'] * row['multiplier']
+        volume[ZONES.index(row['intensity']) * buckets + _bucket(row['distance'])] += meters
+    total = sum(volume)
+    if not total:
+        return None
+
+    try:
+        summary = _process_and_calculate_group_plan('', REFERENCE_VDOT, structure)['summary']
+    except (KeyError, TypeError, ValueError):
+        # Old rows that predate structure validation
+        return None
+    total_time_s = summary['raw_total_time_min'] * 60
+    active_time_s = sum(summary['zone_time_s'].values())
+    rest_ratio = 1 - active_time_s / total_time_s if total_time_s else 0.0
+
+    vector = [v / total for v in volume] + [total / 10000, summary['tss'] / 100, rest_ratio]
+    norm = math.sqrt(sum(v * v for v in vector))
+    return tuple(v / norm for v in vector)
+
+
+def store_features(kind, obj):
+    """Stores the feature vector of a saved session or template ('session' / 'template')."""
+    vector = feature_vector(obj.get_structure())
+    if vector:
+        WorkoutFeatures.objects.update_or_create(**{kind: obj}, defaults={'vector': list(vector)})
+    else:
+        WorkoutFeatures.objects.filter(**{kind: obj}).delete()
+
+
+def rebuild_features(batch_size=500):
+    """Recomputes every stored vector. Returns the number stored."""
+    count = 0
+    with transaction.atomic():
+        WorkoutFeatures.objects.all().delete()
+        for kind, model in (('session', Session), ('template', BlockSessionTemplate)):
+            rows = model.objects.values_list('id', 'structure_json', 'structure_version')
+            batch = []
+            for pk, structure, version in rows.iterator(chunk_size=batch_size):
+                vector = feature_vector(upgrade_structure(structure, version))
+                if vector:
+                    batch.append(WorkoutFeatures(**{f'{kind}_id': pk}, vector=list(vector)))
+            WorkoutFeatures.objects.bulk_create(batch, batch_size=batch_size)
+            count += len(batch)
+    return count
+
+
+def similar_workouts(structure, sessions, templates, k=5):
+    """
+    Top-k (score, kind, id) most similar to a structure among the given session
+    and template querysets, by cosine similarity of the stored vectors.
+    """
+    target = feature_vector(structure)
+    if not target:
+        return []
+    rows = WorkoutFeatures.objects.filter(
+        Q(session__in=sessions.values('id')) | Q(template__in=templates.values('id'))
+    ).values_list('session_id', 'template_id', 'vector')
+    scored = (
+        (sum(a * b for a, b in zip(target, vector)), 'session' if session_id else 'template', session_id or template_id)
+        for session_id, template_id, vector in rows.iterator()
+    )
+    return heapq.nlargest(k, scored)
@@ -0,0 +1,169 @@
+import hashlib
+import json
+from functools import lru_cache
+
+from workouts.utils import TRAINING_ZONES
+
+# Limits on a submitted workout structure. They bound the work done per request in
+# _process_and_calculate_group_plan, however large a form someone posts.
+MAX_STRUCTURE_BYTES = 20000
+MAX_STRUCTURE_ITEMS = 30
+MAX_BLOCK_SEGMENTS = 10
+MAX_REPS = 50
+MAX_BLOCK_MULTIPLIER = 10
+MAX_DISTANCE_M = 10000
+MAX_REST_S = 900
+
+
+# Shape of structure_json written by this code. Rows carry the version they were
+# written at (structure_version) and are upgraded on read, see upgrade_structure.
+CURRENT_STRUCTURE_VERSION = 2
+
+
+class StructureError(ValueError):
+    """Raised when a submitted workout structure is malformed or exceeds the limits."""
+
+
+def _bounded_int(value, name, minimum, maximum):
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise StructureError(f"{name} must be a number")
+    try:
+        number = int(float(value))
+    except ValueError:
+        raise StructureError(f"{name} must be a number")
+    if not minimum <= number <= maximum:
+        raise StructureError(f"{name} must be between {minimum} and {maximum}")
+    return number
+
+
+def _validate_segment(segment):
+    if not isinstance(segment, dict):
+        raise StructureError("Each segment must be an object")
+    intensity = segment.get('intensity', 'Threshold')
+    if intensity not in TRAINING_ZONES:
+        raise StructureError(f"Unknown intensity: {intensity}")
+    return {
+        'reps': _bounded_int(segment.get('reps', 1), 'Reps', 1, MAX_REPS),
+        'distance': _bounded_int(segment.get('distance', 400), 'Distance', 1, MAX_DISTANCE_M),
+        'intensity': intensity,
+        'rest': _bounded_int(segment.get('rest', 0), 'Rest', 0, MAX_REST_S),
+    }
+
+
+def validate_structure(data):
+    """
+    Checks a workout structure against the schema and limits and returns it in
+    canonical form:
+
+        [{'type': 'single', 'segment': {reps, distance, intensity, rest}},
+         {'type': 'block', 'multiplier': n, 'segments': [segment, ...]}]
+    """
+    if not isinstance(data, list):
+        raise StructureError("Workout structure must be a list")
+    if len(data) > MAX_STRUCTURE_ITEMS:
+        raise StructureError(f"A workout can have at most {MAX_STRUCTURE_ITEMS} items")
+
+    structure = []
+    for item in data:
+        if not isinstance(item, dict):
+            raise StructureError("Each workout item must be an object")
+        if item.get('type') == 'single':
+            structure.append({'type': 'single', 'segment': _validate_segment(item.get('segment'))})
+        elif item.get('type') == 'block':
+            segments = item.get('segments')
+            if not isinstance(segments, list):
+                raise StructureError("Repeat block segments must be a list")
+            if len(segments) > MAX_BLOCK_SEGMENTS:
+                raise StructureError(f"A repeat block can have at most {MAX_BLOCK_SEGMENTS} segments")
+            structure.append({
+                'type': 'block',
+                'multiplier': _bounded_int(item.get('multiplier', 1), 'Sets', 1, MAX_BLOCK_MULTIPLIER),
+                'segments': [_validate_segment(segment) for segment in segments],
+            })
+        else:
+            raise StructureError(f"Unknown workout item type: {item.get('type')}")
+    return structure
+
+
+def parse_structure(raw):
+    """Parses and validates the JSON structure field posted by the planner."""
+    if len(raw) > MAX_STRUCTURE_BYTES:
+        raise StructureError("Workout structure is too large")
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        raise StructureError("Workout structure is not valid JSON")
+    return validate_structure(data)
+
+
+def dump_structure(structure):
+    """Canonical JSON for a structure: equal workouts always serialize identically."""
+    return json.dumps(structure, sort_keys=True, separators=(',', ':'))
+
+
+def structure_cache_key(structure):
+    return hashlib.sha256(dump_structure(structure).encode()).hexdigest()
+
+
+def _lenient_int(value, default):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return default
+
+
+def _lenient_segment(segment):
+    return {
+        'reps': _lenient_int(segment.get('reps'), 1),
+        'distance': _lenient_int(segment.get('distance'), 400),
+        'intensity': segment.get('intensity') or 'Threshold',
+        'rest': _lenient_int(segment.get('rest'), 0),
+    }
+
+
+def _upgrade_v1(structure):
+    """
+    v1 is whatever was stored before validation existed: placeholders like {},
+    numbers as strings, missing keys. v2 is the canonical validate_structure shape.
+    Unlike validation this never rejects a stored row, it only normalizes it.
+    """
+    if not isinstance(structure, list):
+        return []
+    upgraded = []
+    for item in structure:
+        if not isinstance(item, dict):
+            continue
+        if item.get('type') == 'single' and isinstance(item.get('segment'), dict):
+            upgraded.append({'type': 'single', 'segment': _lenient_segment(item['segment'])})
+        elif item.get('type') == 'block' and isinstance(item.get('segments'), list):
+            upgraded.append({
+                'type': 'block',
+                'multiplier': _lenient_int(item.get('multiplier'), 1),
+                'segments': [_lenient_segment(seg) for seg in item['segments'] if isinstance(seg, dict)],
+            })
+    return upgraded
+
+
+# Each function takes a structure at the keyed version to the next one
+STRUCTURE_UPGRADES = {
+    1: _upgrade_v1,
+}
+
+
+@lru_cache(maxsize=2048)
+def _upgrade_dumped(dumped, version):
+    structure = json.loads(dumped)
+    for from_version in range(version, CURRENT_STRUCTURE_VERSION):
+        structure = STRUCTURE_UPGRADES[from_version](structure)
+    return structure
+
+
+def upgrade_structure(structure, version):
+    """
+    Brings a stored structure up to CURRENT_STRUCTURE_VERSION. Results are
+    memoized on the structure's canonical JSON, so the returned value is shared
+    and must not be mutated.
+    """
+    if version >= CURRENT_STRUCTURE_VERSION:
+        return structure
+    return _upgrade_dumped(dump_structure(structure), version)
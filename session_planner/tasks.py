@@ -0,0 +1,81 @@
+from django.tasks import task
+from .models import Session
+
+@task
+def render_session_share_cards(session_id):
+    """Renders a session's shareable group cards and WhatsApp text after it is saved."""
+    from .cards import build_share_cards
+
+    try:
+        session = Session.objects.get(id=session_id)
+    except Session.DoesNotExist:
+        return
+
+    share_cards = build_share_cards(session)
+    # Only touch share_cards so a concurrent edit to the session isn't overwritten
+    Session.objects.filter(id=session.id).update(share_cards=share_cards)
+
+
+def upgrade_structure_batch(model, batch_size=500):
+    """
+    Rewrites up to batch_size rows of a model whose structure_json is older than
+    CURRENT_STRUCTURE_VERSION. Returns the number of rows upgraded.
+    """
+    from django.db import transaction
+    from .structure import CURRENT_STRUCTURE_VERSION, upgrade_structure
+
+    with transaction.atomic():
+        rows = list(
+            model.objects.select_for_update()
+            .filter(structure_version__lt=CURRENT_STRUCTURE_VERSION)
+            .only('id', 'structure_json', 'structure_version')
+            .order_by('id')[:batch_size]
+        )
+        for row in rows:
+            if row.structure_json is not None:
+                row.structure_json = upgrade_structure(row.structure_json, row.structure_version)
+            row.structure_version = CURRENT_STRUCTURE_VERSION
+        # bulk_update skips save signals: the upgraded structure reads the same as before
+        model.objects.bulk_update(rows, ['structure_json', 'structure_version'])
+    return len(rows)
+
+
+@task
+def upgrade_structures(batch_size=500):
+    """Upgrades one batch per model, then re-enqueues itself until nothing is left."""
+    from .models import BlockSessionTemplate, SessionGroup
+
+    upgraded = sum(
+        upgrade_structure_batch(model, batch_size) for model in (Session, SessionGroup, BlockSessionTemplate)
+    )
+    if upgraded:
+        upgrade_structures.enqueue(batch_size=batch_size)
+
+
+@task
+def refresh_trending_blocks():
+    """Rebuilds the materialized trending-blocks list."""
+    from .popularity import refresh_trending_blocks as refresh
+
+    refresh()
+
+
+@task
+def process_activity_uploads(upload_ids):
+    """Parses uploaded activity files, e.g. a whole group's after a session."""
+    from .activity import process_upload
+    from .models import ActivityUpload
+
+    for upload in ActivityUpload.objects.filter(id__in=upload_ids, status=ActivityUpload.PENDING).select_related('group', 'session', 'user'):
+        process_upload(upload)
+
+
+@task
+def send_session_reminders(day=None):
+    """Emails members a digest of the given day's sessions, tomorrow's by default. `day` is an ISO date."""
+    from datetime import date, timedelta
+    from django.utils import timezone
+    from .reminders import send_reminders
+
+    day = date.fromisoformat(day) if day else timezone.localdate() + timedelta(days=1)
+    return send_reminders(day)
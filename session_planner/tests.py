@@ -1,8 +1,12 @@
+import io
+import json
+from unittest.mock import patch
 from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth.models import User
 from communities.models import Community
 from session_planner.models import Session, SessionGroup
+from session_planner.structure import MAX_STRUCTURE_BYTES, MAX_STRUCTURE_ITEMS
 
 class SessionPlannerViewTest(TestCase):
     def setUp(self):
@@ -63,6 +67,79 @@ class SessionPlannerViewTest(TestCase):
         self.assertContains(response, '1:25.76')
         self.assertContains(response, '100m:')
 
+    def test_planner_page_embeds_segment_templates(self):
+        response = self.client.get(reverse('planner-page'))
+
+        self.assertContains(response, '<template id="segment-template">')
+        self.assertContains(response, '<template id="repeat-block-template">')
+        self.assertNotContains(response, reverse('add-workout-segment'))
+
+    def test_segment_partials_are_cacheable(self):
+        for name in ('add-workout-segment', 'add-repeat-block'):
+            response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('max-age=86400', response['Cache-Control'])
+
+    def test_generate_plan_view_accepts_json_structure(self):
+        structure = [
+            {'type': 'single', 'segment': {'reps': 10, 'distance': 400, 'intensity': 'Interval', 'rest': 60}},
+            {'type': 'block', 'multiplier': 2, 'segments': [
+                {'reps': 1, 'distance': 200, 'intensity': 'Repetition', 'rest': 90},
+            ]},
+        ]
+        response = self.client.post(reverse('generate-plan'), {
+            'group_a_name': 'A',
+            'group_a_metric': 'vdot',
+            'group_a_value': '54.55',
+            'structure': json.dumps(structure),
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '1:25.76')
+        self.assertContains(response, 'name="group_a_block_multiplier" value="2"')
+
+    def test_structure_over_limits_is_rejected(self):
+        too_many = [{'type': 'single', 'segment': {'reps': 1, 'distance': 400}}] * (MAX_STRUCTURE_ITEMS + 1)
+        too_big = 'x' * (MAX_STRUCTURE_BYTES + 1)
+        bad_reps = [{'type': 'single', 'segment': {'reps': 5000, 'distance': 400}}]
+        for payload in (json.dumps(too_many), too_big, json.dumps(bad_reps), 'not json'):
+            response = self.client.post(reverse('recalculate-plan'), {
+                'group_name': 'Group A', 'group_vdot': '50', 'structure': payload,
+            })
+            self.assertEqual(response.status_code, 400)
+
+    def test_save_workout_rejects_invalid_group_structure(self):
+        response = self.client.post(reverse('save-workout'), {
+            'title': 'Bad', 'date': '2026-05-01',
+            'structure': json.dumps([{'type': 'single', 'segment': {'reps': 2, 'distance': 400}}]),
+            'group_a_name': 'A', 'group_a_metric': 'vdot', 'group_a_value': '50',
+            'group_a_structure': json.dumps([{'type': 'mystery'}]),
+        })
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Session.objects.filter(title='Bad').exists())
+
+    def test_save_workout_with_repeated_idempotency_key_saves_once(self):
+        data = {
+            'title': 'Double Tap', 'date': '2026-05-01',
+            'structure': json.dumps([{"type": "single", "segment": {"reps": 6, "distance": 400, "intensity": "Interval", "rest": 60}}]),
+            'group_a_name': 'A', 'group_a_metric': 'vdot', 'group_a_value': '50',
+            'idempotency_key': 'save-once',
+        }
+        first = self.client.post(reverse('save-workout'), data)
+        second = self.client.post(reverse('save-workout'), data)
+        self.assertEqual(second['HX-Redirect'], first['HX-Redirect'])
+        self.assertEqual(Session.objects.filter(title='Double Tap').count(), 1)
+
+    def test_failed_submission_can_be_retried_with_the_same_key(self):
+        data = {'title': 'Retry', 'date': '2026-05-01', 'structure': '{', 'idempotency_key': 'retry'}
+        self.assertEqual(self.client.post(reverse('save-workout'), data).status_code, 400)
+        data['structure'] = json.dumps([])
+        response = self.client.post(reverse('save-workout'), data)
+        self.assertIn('HX-Redirect', response)
+        self.assertNotIn('Idempotent-Replay', response)
+
+
 class TrainingBlockViewTest(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(username='testuser_block', password='password123')
@@ -81,6 +158,40 @@ class TrainingBlockViewTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, "My Block")
 
+    def test_edit_training_block_shows_load_projection(self):
+        from session_planner.models import TrainingBlock, BlockSessionTemplate
+        from session_planner.projections import community_group_vdots, get_block_projection
+        self.community.vdot_group_a = 50
+        self.community.vdot_group_b = 40
+        self.community.save()
+        block = TrainingBlock.objects.create(title="My Block", target_distance="5k", created_by=self.user, community=self.community)
+        structure = [{"type": "single", "segment": {"reps": 10, "distance": 400, "intensity": "Interval", "rest": 60}}]
+        BlockSessionTemplate.objects.create(block=block, week_number=1, title="T1", structure_json=structure)
+        BlockSessionTemplate.objects.create(block=block, week_number=1, title="T2", structure_json=structure)
+
+        response = self.client.get(reverse('edit-block', args=[block.id]))
+        self.assertContains(response, "Load Projection")
+        self.assertContains(response, "Interval:")
+
+        projection = response.context['projection']
+        self.assertEqual([g['name'] for g in projection['groups']], ['Group A', 'Group B'])
+        self.assertEqual(projection['week_count'], 1)
+        # Two identical templates in the same week double the weekly load
+        single = get_block_projection(block, [('Group A', 50.0)], templates=block.templates.filter(title="T1"))
+        self.assertEqual(projection['weeks'][0]['cells'][0]['tss'], 2 * single['weeks'][0]['cells'][0]['tss'])
+        self.assertEqual(projection['weeks'][0]['cells'][0]['distance'], "8.00 km")
+
+        # A second call with the same inputs is served from the cache
+        templates = list(block.templates.all())
+        with patch('session_planner.projections._build_block_projection') as build:
+            cached = get_block_projection(block, community_group_vdots(self.community), templates=templates)
+        build.assert_not_called()
+        self.assertEqual(cached, projection)
+
+        # Renaming a template shows the new title even though its load is unchanged
+        templates[0].title = "Renamed"
+        self.assertIn("Renamed", get_block_projection(block, community_group_vdots(self.community), templates=templates)['weeks'][0]['titles'])
+
     def test_reorder_training_block_templates(self):
         from session_planner.models import TrainingBlock, BlockSessionTemplate
         block = TrainingBlock.objects.create(title="My Block", target_distance="5k", created_by=self.user)
@@ -147,6 +258,51 @@ class TrainingBlockViewTest(TestCase):
         self.assertIsNotNone(template)
         self.assertEqual(template.title, "New Title")
 
+    def test_stale_session_save_is_rejected(self):
+        structure = [{"type": "single", "segment": {"reps": 1, "distance": 400, "intensity": "Threshold", "rest": 60}}]
+        session = Session.objects.create(
+            title="Original", date="2026-04-11", structure_json=structure,
+            community=self.community, creator=self.user
+        )
+        data = {
+            'session_id': session.id,
+            'title': "First Edit",
+            'date': "2026-04-11",
+            'structure': json.dumps(structure),
+            'version': '1',
+        }
+
+        response = self.client.post(reverse('save-workout'), data)
+        self.assertIn('HX-Redirect', response.headers)
+        session.refresh_from_db()
+        self.assertEqual(session.version, 2)
+
+        # A second manager still holding version 1
+        data['title'] = "Second Edit"
+        response = self.client.post(reverse('save-workout'), data)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['HX-Retarget'], '#save-conflict')
+        self.assertContains(response, "First Edit", status_code=409)
+        self.assertContains(response, "Second Edit", status_code=409)
+        session.refresh_from_db()
+        self.assertEqual(session.title, "First Edit")
+        self.assertEqual(session.version, 2)
+
+    def test_stale_block_edit_is_rejected(self):
+        from session_planner.models import TrainingBlock
+        block = TrainingBlock.objects.create(title="My Block", target_distance="5k", created_by=self.user)
+        url = reverse('edit-block', args=[block.id])
+
+        response = self.client.post(url, {'update_details': 'true', 'is_tradeable': 'on', 'version': '1'})
+        self.assertRedirects(response, url)
+
+        response = self.client.post(url, {'update_details': 'true', 'version': '1'})
+        self.assertEqual(response.status_code, 409)
+        self.assertTrue(response.context['conflict'])
+        block.refresh_from_db()
+        self.assertTrue(block.is_tradeable)
+        self.assertEqual(block.version, 2)
+
     def test_copy_training_block(self):
         from session_planner.models import TrainingBlock, BlockSessionTemplate
 
@@ -176,3 +332,1479 @@ class TrainingBlockViewTest(TestCase):
         self.assertEqual(copied_block.community, self.community)
         self.assertFalse(copied_block.is_tradeable)
         self.assertEqual(copied_block.templates.count(), 1)
+
+class CalendarFeedTest(TestCase):
+    def setUp(self):
+        from communities.models import CalendarEvent
+        from django.utils import timezone
+        self.user = User.objects.create_user(username='feeduser', password='password123')
+        self.community = Community.objects.create(name='Feed Community', slug='feed-community')
+        self.user.profile.community = self.community
+        self.user.profile.training_group = 'b'
+        self.user.profile.save()
+
+        structure = [{"type": "single", "segment": {"reps": 10, "distance": 400, "intensity": "Interval", "rest": 60}}]
+        self.session = Session.objects.create(
+            title="Track Night", date=timezone.now().date(), community=self.community,
+            creator=self.user, structure_json=structure
+        )
+        SessionGroup.objects.create(session=self.session, name="Group A", vdot=54.55)
+        SessionGroup.objects.create(session=self.session, name="Group B", vdot=45)
+        CalendarEvent.objects.create(community=self.community, title="Club Social", date=timezone.now().date(), is_public=True)
+        CalendarEvent.objects.create(community=self.community, title="Managers Meeting", date=timezone.now().date(), is_public=False)
+
+    def test_community_feed_lists_sessions_with_group_paces_and_public_events(self):
+        from session_planner.ics import make_feed_token
+        response = self.client.get(reverse('calendar-feed', args=[make_feed_token(self.community)]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = response.content.decode()
+        self.assertIn("SUMMARY:Track Night", body)
+        self.assertIn("Group A (VDOT 54.55)", body)
+        self.assertIn("1:25.76", body)
+        self.assertIn("SUMMARY:Club Social", body)
+        self.assertNotIn("Managers Meeting", body)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in body.split('\r\n')))
+
+    def test_member_feed_only_shows_their_group(self):
+        from session_planner.ics import make_feed_token
+        response = self.client.get(reverse('calendar-feed', args=[make_feed_token(self.community, self.user)]))
+        body = response.content.decode().replace('\r\n ', '')
+        self.assertIn("Group B (VDOT 45", body)
+        self.assertNotIn("Group A", body)
+
+    def test_feed_is_cached_with_etag_until_schedule_changes(self):
+        from session_planner.ics import make_feed_token
+        url = reverse('calendar-feed', args=[make_feed_token(self.community)])
+        etag = self.client.get(url)['ETag']
+
+        with patch('session_planner.ics.render_feed') as render_feed:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        render_feed.assert_not_called()
+        self.assertEqual(response.status_code, 304)
+
+        self.session.title = "Track Night (moved)"
+        self.session.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, "Track Night (moved)")
+
+    def test_feed_links_come_from_site_url(self):
+        from session_planner.ics import make_feed_token
+        url = reverse('calendar-feed', args=[make_feed_token(self.community)])
+        # The cached body mustn't carry whichever host the first request came in on
+        with self.settings(SITE_URL='https://club.example'):
+            body = self.client.get(url).content.decode().replace('\r\n ', '')
+        self.assertIn(f"URL:https://club.example{reverse('session-detail', args=[self.session.id])}", body)
+        self.assertNotIn("testserver", body)
+
+    def test_invalid_feed_token(self):
+        response = self.client.get(reverse('calendar-feed', args=['not-a-token']))
+        self.assertEqual(response.status_code, 404)
+
+class SessionShareCardTest(TestCase):
+    def setUp(self):
+        import tempfile
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = self.settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username='carduser', password='password123')
+        self.community = Community.objects.create(name='Card Community', slug='card-community')
+        self.community.managers.add(self.user)
+        self.user.profile.community = self.community
+        self.user.profile.save()
+        self.client.force_login(self.user)
+
+    def _save_workout(self, **extra):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('save-workout'), {
+                'title': 'Card Session',
+                'date': '2026-04-12',
+                'item_type': ['block_start', 'segment', 'block_end'],
+                'reps': ['4'],
+                'distance': ['400'],
+                'intensity': ['Interval'],
+                'rest': ['60'],
+                'block_multiplier': ['2'],
+                'group_a_name': 'Group A',
+                'group_a_metric': 'vdot',
+                'group_a_value': '54.55',
+                **extra,
+            })
+        return Session.objects.get(title='Card Session')
+
+    def test_saving_a_session_renders_share_cards(self):
+        from django.core.files.storage import default_storage
+        session = self._save_workout()
+
+        self.assertIsNotNone(session.share_cards)
+        self.assertTrue(default_storage.exists(session.share_cards['image']))
+        group_card = session.share_cards['groups'][0]
+        self.assertTrue(default_storage.exists(group_card['image']))
+        self.assertIn('*Group A Session*', group_card['text'])
+        self.assertIn('*2 sets of:*', group_card['text'])
+        self.assertIn(' - 4x400m @ Interval (1:25.76', group_card['text'])
+
+        response = self.client.get(reverse('session-detail', args=[session.id]))
+        self.assertContains(response, default_storage.url(session.share_cards['image']))
+        self.assertNotContains(response, 'html-to-image')
+
+    def test_cards_render_off_the_request_with_a_worker_backend(self):
+        from django_tasks_db.models import DBTaskResult
+
+        with self.settings(TASKS={'default': {'BACKEND': 'django_tasks_db.DatabaseBackend'}}):
+            session = self._save_workout()
+        self.assertIsNone(session.share_cards)
+        self.assertEqual(
+            list(DBTaskResult.objects.values_list('task_path', 'args_kwargs')),
+            [('session_planner.tasks.render_session_share_cards', {'args': [session.id], 'kwargs': {}})],
+        )
+
+    def test_cards_are_content_addressed(self):
+        from session_planner.cards import build_share_cards
+        session = self._save_workout()
+        with patch('session_planner.cards.render_group_card') as render_group_card:
+            rebuilt = build_share_cards(session)
+        render_group_card.assert_not_called()
+        self.assertEqual(rebuilt, session.share_cards)
+
+    def test_stale_cards_are_not_offered(self):
+        session = self._save_workout()
+        Session.objects.filter(id=session.id).update(title='Renamed')
+        response = self.client.get(reverse('session-detail', args=[session.id]))
+        self.assertContains(response, 'Preparing Images')
+        self.assertContains(response, '*Renamed*')
+
+    def test_detail_page_loads_other_groups_lazily(self):
+        self.user.profile.training_group = 'b'
+        self.user.profile.save()
+        session = self._save_workout(group_b_name='Group B', group_b_metric='vdot', group_b_value='45')
+        group_a, group_b = session.groups.order_by('id')
+
+        response = self.client.get(reverse('session-detail', args=[session.id]))
+        cards = response.context['group_cards']
+        self.assertEqual([c['name'] for c in cards], ['Group B', 'Group A'])
+        self.assertIsNotNone(cards[0]['plan'])
+        self.assertIsNone(cards[1]['plan'])
+        card_url = reverse('session-group-card', args=[session.id, group_a.id])
+        self.assertContains(response, f'hx-get="{card_url}"')
+
+        response = self.client.get(card_url)
+        self.assertContains(response, 'id="group-card-%d"' % group_a.id)
+        self.assertContains(response, '1:25.76')
+        self.assertContains(response, session.share_cards['groups'][0]['image'])
+
+        other = Session.objects.create(title='Elsewhere', date='2026-04-12', structure_json=[],
+                                       community=Community.objects.create(name='Other', slug='other'))
+        response = self.client.get(reverse('session-group-card', args=[other.id, group_a.id]))
+        self.assertEqual(response.status_code, 404)
+
+class SegmentIndexTest(TestCase):
+    def setUp(self):
+        from django.utils import timezone
+        from datetime import timedelta
+        self.user = User.objects.create_user(username='indexuser', password='password123')
+        self.community = Community.objects.create(name='Index Community', slug='index-community')
+        self.user.profile.community = self.community
+        self.user.profile.save()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+        today = timezone.now().date()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.intervals = Session.objects.create(
+                title="400s", date=today - timedelta(days=10), community=self.community, creator=self.user,
+                structure_json=[{"type": "block", "multiplier": 2, "segments": [
+                    {"reps": 4, "distance": 400, "intensity": "Interval", "rest": 60},
+                    {"reps": 1, "distance": 200, "intensity": "Repetition", "rest": 120},
+                ]}],
+            )
+            self.tempo = Session.objects.create(
+                title="Tempo", date=today - timedelta(days=20), community=self.community, creator=self.user,
+                structure_json=[
+                    {"type": "single", "segment": {"reps": 4, "distance": 400, "intensity": "Threshold", "rest": 30}},
+                    {"type": "single", "segment": {"reps": 2, "distance": 1600, "intensity": "Interval", "rest": 90}},
+                ],
+            )
+
+    def test_segments_are_indexed_on_save(self):
+        from session_planner.models import IndexedSegment
+        rows = IndexedSegment.objects.filter(session=self.intervals).order_by('position')
+        self.assertEqual(
+            [(r.distance, r.intensity, r.reps, r.rest, r.multiplier) for r in rows],
+            [(400, 'Interval', 4, 60, 2), (200, 'Repetition', 1, 120, 2)],
+        )
+        self.assertEqual(rows[0].community_id, self.community.id)
+
+        self.intervals.structure_json = [{"type": "single", "segment": {"reps": 6, "distance": 800, "intensity": "Interval", "rest": 90}}]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.intervals.save()
+        self.assertEqual(list(IndexedSegment.objects.filter(session=self.intervals).values_list('distance', flat=True)), [800])
+
+    def test_a_session_and_its_groups_are_indexed_once(self):
+        self.client.force_login(self.user)
+        with patch('session_planner.segment_index.index_session') as index_session, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('save-workout'), {
+                'title': 'Grouped', 'date': '2026-07-01',
+                'structure': json.dumps([{"type": "single", "segment": {"reps": 5, "distance": 400, "intensity": "Interval", "rest": 60}}]),
+                'group_a_name': 'A', 'group_a_metric': 'vdot', 'group_a_value': '50',
+                'group_b_name': 'B', 'group_b_metric': 'vdot', 'group_b_value': '45',
+                'group_c_name': 'C', 'group_c_metric': 'vdot', 'group_c_value': '40',
+            })
+        index_session.assert_called_once()
+
+    def test_group_structures_are_indexed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            group = SessionGroup.objects.create(session=self.tempo, name="A", vdot=50, structure_json=[
+                {"type": "single", "segment": {"reps": 5, "distance": 1000, "intensity": "Threshold", "rest": 60}},
+            ])
+        response = self.client.get(reverse('session-history'), {'distance': 1000})
+        self.assertEqual(list(response.context['sessions']), [self.tempo])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            group.delete()
+        response = self.client.get(reverse('session-history'), {'distance': 1000})
+        self.assertEqual(list(response.context['sessions']), [])
+
+    def test_history_filters_match_within_one_segment(self):
+        response = self.client.get(reverse('session-history'), {'distance': 400, 'zone': 'Interval'})
+        self.assertEqual(list(response.context['sessions']), [self.intervals])
+
+        # The tempo session has 400s and Interval work, but not 400s at Interval
+        response = self.client.get(reverse('session-history'), {'distance': 1600})
+        self.assertEqual(list(response.context['sessions']), [self.tempo])
+
+        response = self.client.get(reverse('session-history'), {'zone': 'bogus'})
+        self.assertEqual(len(response.context['sessions']), 2)
+
+    def test_block_list_filter(self):
+        from session_planner.models import TrainingBlock, BlockSessionTemplate
+        with_800s = TrainingBlock.objects.create(title="800s Block", target_distance="5k", created_by=self.user, community=self.community)
+        BlockSessionTemplate.objects.create(block=with_800s, week_number=1, title="T1", structure_json=[
+            {"type": "single", "segment": {"reps": 5, "distance": 800, "intensity": "Interval", "rest": 120}},
+        ])
+        TrainingBlock.objects.create(title="Empty Block", target_distance="5k", created_by=self.user, community=self.community)
+
+        response = self.client.get(reverse('block-list'), {'distance': 800, 'zone': 'Interval'})
+        self.assertEqual(list(response.context['blocks']), [with_800s])
+
+    def test_rebuild_command_backfills_index(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from session_planner.models import IndexedSegment
+        IndexedSegment.objects.all().delete()
+
+        out = StringIO()
+        call_command('rebuild_segment_index', stdout=out)
+        self.assertIn("Indexed 2 sessions", out.getvalue())
+        self.assertEqual(IndexedSegment.objects.filter(session=self.tempo).count(), 2)
+
+class SimilarWorkoutsTest(TestCase):
+    def setUp(self):
+        from session_planner.models import TrainingBlock, BlockSessionTemplate
+
+        self.user = User.objects.create_user(username='similaruser', password='password123')
+        self.community = Community.objects.create(name='Similar Community', slug='similar-community')
+        self.user.profile.community = self.community
+        self.user.profile.save()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+        def single(reps, distance, intensity, rest):
+            return {"type": "single", "segment": {"reps": reps, "distance": distance, "intensity": intensity, "rest": rest}}
+
+        self.intervals = Session.objects.create(
+            title="12x400", date="2026-03-01", community=self.community, creator=self.user,
+            structure_json=[single(12, 400, "Interval", 60)],
+        )
+        self.tempo = Session.objects.create(
+            title="Tempo", date="2026-03-08", community=self.community, creator=self.user,
+            structure_json=[single(3, 1600, "Threshold", 60)],
+        )
+        other = Community.objects.create(name='Elsewhere', slug='elsewhere')
+        self.hidden = Session.objects.create(
+            title="Hidden 400s", date="2026-03-01", community=other, structure_json=[single(12, 400, "Interval", 60)],
+        )
+        other_user = User.objects.create_user(username='seller', password='password123')
+        block = TrainingBlock.objects.create(title="Shop Block", target_distance="5k", created_by=other_user, is_tradeable=True)
+        self.template = BlockSessionTemplate.objects.create(
+            block=block, week_number=3, title="10x400", structure_json=[single(10, 400, "Interval", 75)],
+        )
+
+    def test_feature_vector_is_unit_length(self):
+        from session_planner.similarity import feature_vector
+        vector = feature_vector(self.intervals.structure_json)
+        self.assertAlmostEqual(sum(v * v for v in vector), 1.0)
+        self.assertIsNone(feature_vector([]))
+
+    def test_similar_workouts_ranks_visible_matches(self):
+        structure = [{"type": "single", "segment": {"reps": 12, "distance": 400, "intensity": "Interval", "rest": 60}}]
+        response = self.client.post(reverse('similar-workouts'), {'structure': json.dumps(structure)})
+
+        titles = [r['object'].title for r in response.context['results']]
+        self.assertEqual(titles[:2], ["12x400", "10x400"])
+        self.assertEqual(response.context['results'][0]['similarity'], 100)
+        self.assertIn("Tempo", titles)
+        self.assertNotIn("Hidden 400s", titles)
+
+    def test_stored_vectors_follow_structure_changes(self):
+        from session_planner.models import BlockSessionTemplate, WorkoutFeatures
+        from session_planner.similarity import similar_workouts
+        structure = [{"type": "single", "segment": {"reps": 3, "distance": 1600, "intensity": "Threshold", "rest": 60}}]
+        sessions = Session.objects.filter(community=self.community)
+        templates = BlockSessionTemplate.objects.none()
+        self.assertEqual(similar_workouts(structure, sessions, templates, k=1)[0][2], self.tempo.id)
+
+        self.intervals.structure_json = structure
+        self.intervals.save()
+        self.tempo.delete()
+        self.assertEqual([pk for _, _, pk in similar_workouts(structure, sessions, templates)], [self.intervals.id])
+        self.assertEqual(WorkoutFeatures.objects.filter(session__community=self.community).count(), 1)
+
+    def test_rebuild_restores_stored_vectors(self):
+        from session_planner.models import BlockSessionTemplate, WorkoutFeatures
+        from session_planner.similarity import rebuild_features, similar_workouts
+        WorkoutFeatures.objects.all().delete()
+        self.assertEqual(rebuild_features(), 4)
+        matches = similar_workouts(self.template.structure_json, Session.objects.none(), BlockSessionTemplate.objects.all())
+        self.assertEqual(matches[0][1:], ('template', self.template.id))
+
+class MonthCalendarTest(TestCase):
+    def setUp(self):
+        from communities.models import CalendarEvent
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(username='monthuser', password='password123')
+        self.community = Community.objects.create(name='Month Community', slug='month-community')
+        self.user.profile.community = self.community
+        self.user.profile.save()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+        Session.objects.create(title="March Hills", date="2026-03-10", community=self.community, structure_json=[])
+        Session.objects.create(title="April Track", date="2026-04-02", community=self.community, structure_json=[])
+        CalendarEvent.objects.create(community=self.community, title="Club Social", date="2026-03-20", is_public=True)
+        CalendarEvent.objects.create(community=self.community, title="Coaches Meeting", date="2026-03-21", is_public=False)
+
+    def test_month_shows_only_that_month(self):
+        response = self.client.get(reverse('month-calendar', args=[2026, 3]))
+        self.assertContains(response, "March Hills")
+        self.assertContains(response, "Club Social")
+        self.assertNotContains(response, "April Track")
+        self.assertNotContains(response, "Coaches Meeting")
+        self.assertContains(response, 'hx-get="%s"' % reverse('month-calendar', args=[2026, 4]))
+
+    def test_managers_see_private_events(self):
+        self.community.managers.add(self.user)
+        response = self.client.get(reverse('month-calendar', args=[2026, 3]))
+        self.assertContains(response, "Coaches Meeting")
+
+    def test_htmx_requests_get_the_cached_grid(self):
+        url = reverse('month-calendar', args=[2026, 3])
+        self.client.get(url, headers={'HX-Request': 'true'})
+        with patch('session_planner.month_calendar._month_items') as month_items:
+            response = self.client.get(url, headers={'HX-Request': 'true'})
+        month_items.assert_not_called()
+        self.assertNotContains(response, "<html")
+        self.assertContains(response, 'id="month-grid"')
+        self.assertIn('HX-Request', response['Vary'])
+
+        Session.objects.create(title="Added Later", date="2026-03-28", community=self.community, structure_json=[])
+        response = self.client.get(url, headers={'HX-Request': 'true'})
+        self.assertContains(response, "Added Later")
+
+    def test_month_items_read_only_what_a_cell_shows(self):
+        from communities.models import CalendarEvent, CalendarEventException
+        from session_planner.month_calendar import _month_items
+        weekly = CalendarEvent.objects.create(
+            community=self.community, title="Club Run", date="2026-03-03", is_public=True,
+            description="Meet at the gate", recurrence=CalendarEvent.WEEKLY,
+        )
+        CalendarEventException.objects.create(event=weekly, date="2026-03-10", cancelled=False, title="Club Run (Track)")
+
+        # Sessions, archived sessions, single events, rules, their exceptions, archived events
+        with self.assertNumQueries(6):
+            items = _month_items(self.community, 2026, 3, is_manager=False)
+        runs = [item['title'] for day in sorted(items) for item in items[day] if item['title'].startswith('Club Run')]
+        self.assertEqual(runs, ["Club Run", "Club Run (Track)", "Club Run", "Club Run", "Club Run"])
+
+    def test_grid_follows_edits_made_through_the_shared_cache(self):
+        from django.test import override_settings
+        from session_planner.month_calendar import render_month
+        # What two workers see: nothing process-local between the edit and the read
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'django_cache',
+        }}):
+            self.assertIn("March Hills", render_month(self.community, 2026, 3, False))
+            session = Session.objects.get(title="March Hills")
+            session.title = "March Hill Repeats"
+            session.save()
+            self.assertIn("March Hill Repeats", render_month(self.community, 2026, 3, False))
+
+class StructureVersionTest(TestCase):
+    LEGACY = [
+        {"type": "single", "segment": {"reps": "6", "distance": "800", "intensity": "Interval"}},
+        {"type": "block", "multiplier": "", "segments": [{"reps": 2, "distance": 200.0, "intensity": "Repetition", "rest": "90"}]},
+        {"type": "mystery"},
+    ]
+    UPGRADED = [
+        {"type": "single", "segment": {"reps": 6, "distance": 800, "intensity": "Interval", "rest": 0}},
+        {"type": "block", "multiplier": 1, "segments": [{"reps": 2, "distance": 200, "intensity": "Repetition", "rest": 90}]},
+    ]
+
+    def setUp(self):
+        self.community = Community.objects.create(name='Version Community', slug='version-community')
+        self.session = Session.objects.create(title="Old", date="2025-01-01", community=self.community, structure_json=self.LEGACY)
+
+    def test_legacy_rows_are_upgraded_on_read(self):
+        from session_planner.structure import STRUCTURE_UPGRADES
+        self.assertEqual(self.session.structure_version, 1)
+        self.assertEqual(self.session.get_structure(), self.UPGRADED)
+
+        group = SessionGroup.objects.create(session=self.session, name="A", vdot=50, structure_json={})
+        self.assertEqual(group.get_structure(), self.UPGRADED)
+
+        # Memoized on the structure's content
+        with patch.dict(STRUCTURE_UPGRADES, {1: lambda structure: self.fail("upgrade re-ran")}):
+            self.assertEqual(Session.objects.get(id=self.session.id).get_structure(), self.UPGRADED)
+
+    def test_upgrade_command_rewrites_rows(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from session_planner.structure import CURRENT_STRUCTURE_VERSION
+
+        out = StringIO()
+        call_command('upgrade_structures', batch_size=1, stdout=out)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.structure_version, CURRENT_STRUCTURE_VERSION)
+        self.assertEqual(self.session.structure_json, self.UPGRADED)
+        self.assertIn("Upgraded 1 sessions", out.getvalue())
+
+    def test_saved_workouts_are_written_at_the_current_version(self):
+        from session_planner.structure import CURRENT_STRUCTURE_VERSION
+        user = User.objects.create_user(username='versionuser', password='password123')
+        user.profile.community = self.community
+        user.profile.save()
+        self.client.force_login(user)
+        self.client.post(reverse('save-workout'), {
+            'title': 'Fresh', 'date': '2026-05-01',
+            'structure': json.dumps(self.UPGRADED),
+            'group_a_name': 'A', 'group_a_metric': 'vdot', 'group_a_value': '50',
+        })
+        session = Session.objects.get(title='Fresh')
+        self.assertEqual(session.structure_version, CURRENT_STRUCTURE_VERSION)
+        self.assertEqual(session.groups.get().structure_version, CURRENT_STRUCTURE_VERSION)
+
+class SessionRevisionTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='revisionuser', password='password123')
+        self.community = Community.objects.create(name='Revision Community', slug='revision-community')
+        self.community.managers.add(self.user)
+        self.user.profile.community = self.community
+        self.user.profile.save()
+        self.client.force_login(self.user)
+
+    def _save(self, reps, session=None, title='Revised'):
+        data = {
+            'title': title, 'date': '2026-06-01',
+            'structure': json.dumps([{"type": "single", "segment": {"reps": reps, "distance": 400, "intensity": "Interval", "rest": 60}}]),
+            'group_a_name': 'A', 'group_a_metric': 'vdot', 'group_a_value': '50',
+        }
+        if session:
+            data['session_id'] = session.id
+        self.client.post(reverse('save-workout'), data)
+        return Session.objects.get(title=title)
+
+    def test_json_patch_round_trip(self):
+        from session_planner.jsonpatch import apply_patch, make_patch
+        src = {'title': 'A', 'groups': [{'name': 'x/y', 'vdot': 50}, {'name': 'b', 'vdot': 40}], 'gone': 1}
+        dst = {'title': 'B', 'groups': [{'name': 'x/y', 'vdot': 51}], 'new': [1, 2]}
+        patch = make_patch(src, dst)
+        self.assertIn({'op': 'replace', 'path': '/groups/0/vdot', 'value': 51}, patch)
+        self.assertEqual(apply_patch(src, patch), dst)
+        self.assertEqual(src['title'], 'A')
+
+    def test_json_patch_inserts_and_removes_list_items(self):
+        from session_planner.jsonpatch import apply_patch, make_patch
+        src = [{'reps': n} for n in range(10)]
+        dst = [{'reps': 99}, *src[:4], *src[5:]]
+        patch = make_patch(src, dst)
+        self.assertEqual(patch, [
+            {'op': 'remove', 'path': '/4'},
+            {'op': 'add', 'path': '/0', 'value': {'reps': 99}},
+        ])
+        self.assertEqual(apply_patch(src, patch), dst)
+
+    def test_edits_are_stored_as_patches_with_periodic_snapshots(self):
+        from session_planner.revisions import SNAPSHOT_INTERVAL, revision_document
+        session = self._save(1)
+        for reps in range(2, SNAPSHOT_INTERVAL + 3):
+            self._save(reps, session=session)
+
+        revisions = {r.number: r for r in session.revisions.all()}
+        self.assertEqual(len(revisions), SNAPSHOT_INTERVAL + 2)
+        self.assertIsNotNone(revisions[1].snapshot)
+        self.assertIsNotNone(revisions[SNAPSHOT_INTERVAL + 1].snapshot)
+        self.assertEqual(revisions[2].patch, [{'op': 'replace', 'path': '/structure/0/segment/reps', 'value': 2}])
+
+        document = revision_document(session, 5)
+        self.assertEqual(document['structure'][0]['segment']['reps'], 5)
+        self.assertEqual(document['groups'][0]['name'], 'A')
+
+        # Saving without changes doesn't add a revision
+        self._save(SNAPSHOT_INTERVAL + 2, session=session)
+        self.assertEqual(session.revisions.count(), SNAPSHOT_INTERVAL + 2)
+
+    def test_restore_revision(self):
+        session = self._save(4)
+        self._save(8, session=session)
+        response = self.client.get(reverse('session-revisions', args=[session.id]))
+        self.assertContains(response, 'Changed: structure')
+
+        response = self.client.post(reverse('session-revision', args=[session.id, 1]))
+        self.assertRedirects(response, reverse('session-detail', args=[session.id]))
+        session.refresh_from_db()
+        self.assertEqual(session.get_structure()[0]['segment']['reps'], 4)
+        self.assertEqual(session.groups.get().name, 'A')
+        self.assertEqual(session.revisions.count(), 3)
+
+    def test_restore_refuses_a_stale_version(self):
+        session = self._save(4)
+        self._save(8, session=session)
+        stale = Session.objects.get(pk=session.pk).version
+        self._save(12, session=session)
+
+        response = self.client.post(reverse('session-revision', args=[session.id, 1]), {'version': stale})
+        self.assertEqual(response.status_code, 409)
+        session.refresh_from_db()
+        self.assertEqual(session.get_structure()[0]['segment']['reps'], 12)
+        self.assertEqual(session.revisions.count(), 3)
+
+    def test_shift_and_restore_leave_an_integer_version(self):
+        with patch('session_planner.segment_index.index_session') as index_session, \
+                self.captureOnCommitCallbacks(execute=True):
+            session = self._save(4)
+            self._save(8, session=session)
+            version = Session.objects.get(pk=session.pk).version
+            self.client.post(reverse('session-revision', args=[session.id, 1]))
+        self.assertIsInstance(index_session.call_args.args[0].version, int)
+        self.client.post(reverse('shift-schedule'), {'start_date': '2026-05-01', 'shift_days': '7'})
+        self.assertEqual(Session.objects.get(pk=session.pk).version, version + 2)
+
+    def test_pre_existing_sessions_get_a_baseline(self):
+        session = Session.objects.create(
+            title="Legacy", date="2026-06-01", community=self.community, creator=self.user,
+            structure_json=[{"type": "single", "segment": {"reps": 3, "distance": 800, "intensity": "Threshold", "rest": 90}}],
+        )
+        self._save(6, session=session, title='Legacy')
+        response = self.client.get(reverse('session-revision', args=[session.id, 1]))
+        self.assertEqual(response.context['document']['structure'][0]['segment']['distance'], 800)
+
+
+class TrackSimulatorTest(TestCase):
+    STRUCTURE = [
+        {'type': 'single', 'segment': {'reps': 8, 'distance': 400, 'intensity': 'Interval', 'rest': 60}},
+        {'type': 'block', 'multiplier': 2, 'segments': [
+            {'reps': 3, 'distance': 200, 'intensity': 'Repetition', 'rest': 90},
+        ]},
+    ]
+
+    def _plans(self, *vdots):
+        from session_planner.plans import _process_and_calculate_group_plan
+        return [_process_and_calculate_group_plan(f'G{vdot}', vdot, self.STRUCTURE) for vdot in vdots]
+
+    def test_groups_starting_together_collide(self):
+        from session_planner.track import simulate_track
+        track = simulate_track(self._plans(55, 45))
+        self.assertEqual(track['conflicts'][0]['groups'], ['G55', 'G45'])
+        self.assertEqual(track['conflicts'][0]['first_at'], '0:00')
+
+    def test_offsets_reduce_shared_track(self):
+        from session_planner.track import simulate_track
+        track = simulate_track(self._plans(58, 50, 42))
+
+        together = sum(c['seconds'] for c in track['conflicts'])
+        staggered = sum(c['seconds'] for c in track['remaining'])
+        self.assertLess(staggered, together)
+        self.assertEqual(track['groups'][0]['offset_s'], 0)
+        # Groups still meeting after staggering are never given the same lane
+        lanes = {g['name']: g['lane'] for g in track['groups']}
+        for conflict in track['remaining']:
+            self.assertNotEqual(lanes[conflict['groups'][0]], lanes[conflict['groups'][1]])
+
+    def test_largest_allowed_session_fits_the_request_budget(self):
+        import time
+        from session_planner.plans import _process_and_calculate_group_plan
+        from session_planner.structure import (
+            MAX_BLOCK_MULTIPLIER, MAX_BLOCK_SEGMENTS, MAX_DISTANCE_M, MAX_REPS, MAX_REST_S, MAX_STRUCTURE_ITEMS,
+        )
+        from session_planner.track import simulate_track
+        segment = {'reps': MAX_REPS, 'distance': MAX_DISTANCE_M, 'intensity': 'Interval', 'rest': MAX_REST_S}
+        structure = [
+            {'type': 'block', 'multiplier': MAX_BLOCK_MULTIPLIER, 'segments': [dict(segment)] * MAX_BLOCK_SEGMENTS}
+        ] * MAX_STRUCTURE_ITEMS
+        plans = [_process_and_calculate_group_plan(name, 50, structure) for name in 'ABC']
+
+        started = time.perf_counter()
+        track = simulate_track(plans)
+        elapsed = time.perf_counter() - started
+
+        self.assertTrue(track['truncated'])
+        self.assertLess(elapsed, 0.05)
+
+    def test_single_group_has_no_track_plan(self):
+        from session_planner.track import simulate_track
+        self.assertIsNone(simulate_track(self._plans(50)))
+
+
+class LiveSessionUpdatesTest(TestCase):
+    def setUp(self):
+        import tempfile
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = self.settings(MEDIA_ROOT=media_root.name, LIVE_SESSION_UPDATES=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username='live', password='password123')
+        self.community = Community.objects.create(name='Live Community', slug='live-community')
+        self.community.managers.add(self.user)
+        self.user.profile.community = self.community
+        self.user.profile.save()
+        self.client.force_login(self.user)
+
+    def test_saving_publishes_rendered_group_cards(self):
+        with patch('session_planner.live.subscriber_count', return_value=1), \
+                patch('session_planner.live.publish') as publish, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('save-workout'), {
+                'title': 'Live', 'date': '2026-07-01',
+                'structure': json.dumps([{"type": "single", "segment": {"reps": 5, "distance": 400, "intensity": "Interval", "rest": 60}}]),
+                'group_a_name': 'A', 'group_a_metric': 'vdot', 'group_a_value': '50',
+            })
+
+        session = Session.objects.get(title='Live')
+        channel, event, data = publish.call_args.args
+        self.assertEqual((channel, event), (f'session:{session.id}', 'session-changed'))
+        group = session.groups.get()
+        self.assertEqual(data['groups'][0]['id'], group.id)
+        self.assertIn(f'id="group-card-{group.id}"', data['groups'][0]['html'])
+
+    def test_edits_keep_the_group_cards_ids(self):
+        data = {
+            'title': 'Kept', 'date': '2026-07-01',
+            'structure': json.dumps([{"type": "single", "segment": {"reps": 5, "distance": 400, "intensity": "Interval", "rest": 60}}]),
+            'group_a_name': 'A', 'group_a_metric': 'vdot', 'group_a_value': '50',
+            'group_b_name': 'B', 'group_b_metric': 'vdot', 'group_b_value': '45',
+        }
+        self.client.post(reverse('save-workout'), data)
+        session = Session.objects.get(title='Kept')
+        ids = dict(session.groups.values_list('name', 'id'))
+
+        self.client.post(reverse('save-workout'), {
+            **data, 'session_id': session.id, 'version': session.version, 'group_a_value': '52',
+            'group_b_name': '', 'group_c_name': 'C', 'group_c_metric': 'vdot', 'group_c_value': '40',
+        })
+        groups = {group.name: group for group in session.groups.all()}
+        self.assertEqual(set(groups), {'A', 'C'})
+        self.assertEqual((groups['A'].id, groups['A'].vdot), (ids['A'], 52))
+
+    def test_nothing_is_rendered_without_viewers(self):
+        from session_planner.views import publish_session_change
+        session = Session.objects.create(
+            title='Quiet', date='2026-07-02', community=self.community, creator=self.user, structure_json=[],
+        )
+        with patch('session_planner.live.publish') as publish:
+            publish_session_change(session.id)
+        publish.assert_not_called()
+
+    async def test_event_stream_delivers_published_events(self):
+        import asyncio
+        from asgiref.sync import sync_to_async
+        from session_planner.live import publish, subscriber_count
+
+        session = await sync_to_async(Session.objects.create)(
+            title='Streamed', date='2026-07-03', community=self.community, creator=self.user, structure_json=[],
+        )
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('session-events', args=[session.id]))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+        channel = f'session:{session.id}'
+        self.assertEqual(subscriber_count(channel), 1)
+
+        publish(channel, 'session-changed', {'version': 2})
+        message = await asyncio.wait_for(anext(stream), 1)
+        self.assertEqual(message, b'event: session-changed\ndata: {"version": 2}\n\n')
+
+        response.close()
+        self.assertEqual(subscriber_count(channel), 0)
+
+    async def test_event_stream_polls_for_changes_saved_by_other_workers(self):
+        from asgiref.sync import sync_to_async
+        session = await sync_to_async(Session.objects.create)(
+            title='Elsewhere', date='2026-07-03', community=self.community, creator=self.user, structure_json=[],
+        )
+        await self.async_client.aforce_login(self.user)
+        with patch('session_planner.live.POLL_S', 0.01):
+            response = await self.async_client.get(reverse('session-events', args=[session.id]))
+            stream = aiter(response.streaming_content)
+            await anext(stream)
+            self.assertEqual(await anext(stream), b': keepalive\n\n')
+
+            # Nothing is published in this process, as when another worker saved it
+            await Session.objects.filter(pk=session.pk).aupdate(version=session.version + 1)
+            message = await anext(stream)
+        response.close()
+        self.assertTrue(message.startswith(b'event: session-changed\n'))
+        self.assertIn(f'"version": {session.version + 1}'.encode(), message)
+
+    def test_wsgi_requests_are_told_not_to_reconnect(self):
+        session = Session.objects.create(
+            title='Blocking', date='2026-07-05', community=self.community, creator=self.user, structure_json=[],
+        )
+        response = self.client.get(reverse('session-events', args=[session.id]))
+        self.assertEqual(response.status_code, 204)
+
+    def test_detail_page_only_streams_when_enabled(self):
+        session = Session.objects.create(
+            title='Static', date='2026-07-05', community=self.community, creator=self.user, structure_json=[],
+        )
+        self.assertContains(self.client.get(reverse('session-detail', args=[session.id])), 'new EventSource')
+        with self.settings(LIVE_SESSION_UPDATES=False):
+            response = self.client.get(reverse('session-detail', args=[session.id]))
+        self.assertNotContains(response, 'new EventSource')
+
+    async def test_event_stream_is_limited_to_the_community(self):
+        from asgiref.sync import sync_to_async
+        other = await sync_to_async(Community.objects.create)(name='Other', slug='other-live')
+        session = await sync_to_async(Session.objects.create)(
+            title='Elsewhere', date='2026-07-04', community=other, creator=self.user, structure_json=[],
+        )
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('session-events', args=[session.id]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ArchiveTest(TestCase):
+    def setUp(self):
+        from datetime import date, timedelta
+        from communities.models import CalendarEvent
+        self.user = User.objects.create_user(username='archivist', password='password123')
+        self.community = Community.objects.create(name='Archive Community', slug='archive-community')
+        self.user.profile.community = self.community
+        self.user.profile.save()
+        self.client.force_login(self.user)
+
+        self.old_date = date.today() - timedelta(days=400)
+        structure = [{"type": "single", "segment": {"reps": 6, "distance": 800, "intensity": "Threshold", "rest": 90}}]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.old = Session.objects.create(
+                title='Old Hills', date=self.old_date, community=self.community, creator=self.user,
+                structure_json=structure, structure_version=2,
+            )
+            SessionGroup.objects.create(session=self.old, name='Fast', vdot=55, structure_json=structure, structure_version=2)
+            self.recent = Session.objects.create(
+                title='Recent Reps', date=date.today() - timedelta(days=10), community=self.community,
+                creator=self.user, structure_json=structure, structure_version=2,
+            )
+        CalendarEvent.objects.create(community=self.community, title='Old Social', date=self.old_date, is_public=True)
+
+    def test_archive_moves_old_sessions_and_events_in_batches(self):
+        from django.core.management import call_command
+        from communities.models import ArchivedCalendarEvent, CalendarEvent
+        from session_planner.models import ArchivedSession
+
+        call_command('archive_schedule', batch_size=1, stdout=io.StringIO())
+
+        self.assertEqual(list(Session.objects.values_list('title', flat=True)), ['Recent Reps'])
+        archived = ArchivedSession.objects.get()
+        self.assertEqual((archived.original_id, archived.title), (self.old.id, 'Old Hills'))
+        self.assertEqual(archived.groups[0]['name'], 'Fast')
+        self.assertFalse(CalendarEvent.objects.exists())
+        self.assertEqual(ArchivedCalendarEvent.objects.get().title, 'Old Social')
+
+    def test_archive_keeps_check_ins_revisions_and_index_rows(self):
+        from django.core.management import call_command
+        from session_planner.models import ArchivedSession, IndexedSegment, SessionCheckIn, SessionRevision
+        from session_planner.revisions import record_revision
+        SessionGroup.objects.create(session=self.old, name='Steady', vdot=45, structure_json=[])
+        SessionCheckIn.objects.create(session=self.old, user=self.user)
+        record_revision(self.old, author=self.user)
+        segments = IndexedSegment.objects.filter(session=self.old).count()
+
+        call_command('archive_schedule', stdout=io.StringIO())
+
+        archived = ArchivedSession.objects.get()
+        self.assertEqual([c['user_id'] for c in archived.check_ins], [self.user.id])
+        self.assertEqual([r['number'] for r in archived.revisions], [1])
+        self.assertIsNotNone(archived.revisions[0]['snapshot'])
+        # A group that ran the session's structure keeps it once the session is gone
+        steady = next(group for group in archived.groups if group['name'] == 'Steady')
+        self.assertEqual(steady['structure_json'], self.old.get_structure())
+        self.assertEqual(archived.indexed_segments.count(), segments)
+        self.assertFalse(SessionRevision.objects.exists())
+
+    def test_history_reads_live_and_archived_sessions(self):
+        from django.core.management import call_command
+        call_command('archive_schedule', stdout=io.StringIO())
+
+        response = self.client.get(reverse('session-history'), {'months': 24, 'distance': 800})
+        self.assertEqual([s.title for s in response.context['sessions']], ['Recent Reps', 'Old Hills'])
+        self.assertContains(response, reverse('archived-session', args=[self.old.id]))
+        response = self.client.get(reverse('session-history'), {'months': 24, 'distance': 400})
+        self.assertEqual(response.context['sessions'], [])
+
+        # Old links to the session still lead to it
+        response = self.client.get(reverse('session-detail', args=[self.old.id]))
+        self.assertRedirects(response, reverse('archived-session', args=[self.old.id]))
+        response = self.client.get(reverse('archived-session', args=[self.old.id]))
+        self.assertContains(response, 'Old Hills')
+        self.assertContains(response, 'Fast')
+
+    def test_month_view_includes_archived_items(self):
+        from django.core.management import call_command
+        from session_planner.month_calendar import _month_items
+        call_command('archive_schedule', stdout=io.StringIO())
+
+        items = _month_items(self.community, self.old_date.year, self.old_date.month, is_manager=False)
+        titles = [item['title'] for item in items[self.old_date]]
+        self.assertEqual(titles, ['Old Hills', 'Old Social'])
+        self.assertEqual(items[self.old_date][0]['id'], self.old.id)
+
+
+class MarketplaceSearchTest(TestCase):
+    def setUp(self):
+        from session_planner.models import BlockSessionTemplate, TrainingBlock
+        self.user = User.objects.create_user(username='shopper', password='password123')
+        self.seller = User.objects.create_user(username='seller', password='password123')
+        self.other_community = Community.objects.create(name='Hill Harriers', slug='hill-harriers')
+        self.client.force_login(self.user)
+
+        self.hills = TrainingBlock.objects.create(
+            title="Hill Strength", target_distance="10k", created_by=self.seller,
+            community=self.other_community, is_tradeable=True,
+        )
+        self.mention = TrainingBlock.objects.create(
+            title="Marathon Base", description="Finishes with a few hills", target_distance="Marathon",
+            created_by=self.seller, community=self.other_community, is_tradeable=True,
+        )
+        self.speed = TrainingBlock.objects.create(
+            title="Track Speed", target_distance="5k", created_by=self.seller, is_tradeable=True,
+        )
+        BlockSessionTemplate.objects.create(block=self.speed, week_number=1, title="Threshold ladders", structure_json=[])
+        self.private = TrainingBlock.objects.create(
+            title="Secret Hills", target_distance="10k", created_by=self.seller, is_tradeable=False,
+        )
+
+    def _titles(self, query, page=1):
+        response = self.client.get(reverse('marketplace'), {'q': query, 'page': page})
+        return [block.title for block in response.context['page'].object_list]
+
+    def test_search_is_ranked_and_skips_untradeable_blocks(self):
+        self.assertEqual(self._titles('hill'), ['Hill Strength', 'Marathon Base'])
+
+    def test_template_titles_are_searchable_and_kept_current(self):
+        from session_planner.models import BlockSessionTemplate
+        self.assertEqual(self._titles('ladders'), ['Track Speed'])
+        BlockSessionTemplate.objects.filter(block=self.speed).delete()
+        self.assertEqual(self._titles('ladders'), [])
+
+        self.speed.is_tradeable = False
+        self.speed.save()
+        self.assertEqual(self._titles('track'), [])
+        self.private.is_tradeable = True
+        self.private.save()
+        self.assertEqual(self._titles('secret'), ['Secret Hills'])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self._titles('hill*) ^'), ['Hill Strength', 'Marathon Base'])
+        self.assertEqual(self._titles('***'), [])
+
+    def test_results_are_paginated(self):
+        from session_planner.models import TrainingBlock
+        from session_planner.views import MARKETPLACE_PAGE_SIZE
+        for number in range(MARKETPLACE_PAGE_SIZE + 1):
+            TrainingBlock.objects.create(title=f"Tempo {number}", target_distance="Half", created_by=self.seller, is_tradeable=True)
+        self.assertEqual(len(self._titles('tempo')), MARKETPLACE_PAGE_SIZE)
+        self.assertEqual(len(self._titles('tempo half', page=2)), 1)
+        self.assertEqual(len(self._titles('', page=2)), 4)
+
+
+class BlockPopularityTest(TestCase):
+    def setUp(self):
+        from session_planner.models import BlockSessionTemplate, TrainingBlock
+        self.user = User.objects.create_user(username='coach', password='password123')
+        self.community = Community.objects.create(name='Popular Community', slug='popular-community')
+        self.user.profile.community = self.community
+        self.user.profile.save()
+        self.client.force_login(self.user)
+        self.fresh = TrainingBlock.objects.create(title="Fresh", target_distance="5k", created_by=self.user, is_tradeable=True)
+        self.faded = TrainingBlock.objects.create(title="Faded", target_distance="10k", created_by=self.user, is_tradeable=True)
+        BlockSessionTemplate.objects.create(block=self.fresh, week_number=1, title="Week 1", structure_json=[])
+
+    def test_copies_and_applications_are_counted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('copy-block', args=[self.fresh.id]))
+        self.client.post(reverse('apply-block-to-calendar'), {'block_id': self.fresh.id, 'start_date': '2026-09-07'})
+        self.client.post(reverse('apply-block-to-calendar'), {'block_id': self.fresh.id, 'start_date': '2026-10-05'})
+
+        self.fresh.refresh_from_db()
+        self.assertEqual((self.fresh.copy_count, self.fresh.apply_count), (1, 2))
+        day = self.fresh.usage_days.get()
+        self.assertEqual((day.copies, day.applies), (1, 2))
+
+    def test_trending_favours_recent_use(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from session_planner.models import BlockUsageDay, TrendingBlock
+        from session_planner.popularity import refresh_trending_blocks
+
+        today = timezone.now().date()
+        BlockUsageDay.objects.create(block=self.fresh, day=today, copies=1)
+        BlockUsageDay.objects.create(block=self.faded, day=today - timedelta(days=60), copies=3, applies=5)
+        private = self.fresh.__class__.objects.create(title="Private", target_distance="Mile", created_by=self.user)
+        BlockUsageDay.objects.create(block=private, day=today, copies=50)
+
+        self.assertEqual(refresh_trending_blocks(), 2)
+        self.assertEqual([t.block.title for t in TrendingBlock.objects.all()], ['Fresh', 'Faded'])
+
+        response = self.client.get(reverse('marketplace'))
+        self.assertEqual([t.block.title for t in response.context['trending']], ['Fresh', 'Faded'])
+
+
+class SeasonRollupTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='coach', password='password123')
+        self.community = Community.objects.create(name='Season Community', slug='season-community')
+        self.community.managers.add(self.user)
+        self.user.profile.community = self.community
+        self.user.profile.save()
+        self.client.force_login(self.user)
+        self.structure = [{'type': 'single', 'segment': {'reps': 5, 'distance': 1000, 'intensity': 'Threshold', 'rest': 60}}]
+
+    def _create_session(self, day):
+        with self.captureOnCommitCallbacks(execute=True):
+            session = Session.objects.create(title="Tempo", date=day, community=self.community, structure_json=[])
+            SessionGroup.objects.create(session=session, name='Group A', vdot=50, structure_json=self.structure)
+            SessionGroup.objects.create(session=session, name='Group B', vdot=45, structure_json=self.structure)
+        return session
+
+    def test_rollups_follow_session_changes(self):
+        from datetime import date
+        from session_planner.models import WeeklyGroupRollup
+
+        session = self._create_session(date(2026, 9, 9))
+        rows = WeeklyGroupRollup.objects.filter(community=self.community)
+        self.assertEqual([(r.week_start, r.group_name, r.sessions) for r in rows],
+                         [(date(2026, 9, 7), 'Group A', 1), (date(2026, 9, 7), 'Group B', 1)])
+        self.assertGreater(rows[0].tss, 0)
+        self.assertEqual(rows[0].distance_km, 5.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('shift-schedule'), {'start_date': '2026-09-01', 'shift_days': '7'})
+        self.assertEqual({r.week_start for r in rows.all()}, {date(2026, 9, 14)})
+
+        session.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            session.delete()
+        self.assertFalse(rows.all().exists())
+
+    def test_dashboard_reads_only_rollups(self):
+        from django.utils import timezone
+
+        self._create_session(timezone.now().date())
+        with patch('session_planner.rollups.get_group_plan') as get_plan, \
+                patch('session_planner.views._process_and_calculate_group_plan') as calculate:
+            response = self.client.get(reverse('season-dashboard'), {'weeks': 12})
+        get_plan.assert_not_called()
+        calculate.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['group_names'], ['Group A', 'Group B'])
+        self.assertEqual(len(response.context['season']), 12)
+        self.assertEqual([g['bar'] for g in response.context['season'][-1]['groups']], [90, 100])
+
+    def test_dashboard_is_for_managers(self):
+        self.community.managers.remove(self.user)
+        self.assertEqual(self.client.get(reverse('season-dashboard')).status_code, 403)
+
+
+class RunnerFitnessTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='runner', password='password123')
+        self.coach = User.objects.create_user(username='coach', password='password123')
+        self.community = Community.objects.create(name='Fitness Community', slug='fitness-community')
+        self.community.managers.add(self.coach)
+        for user in (self.user, self.coach):
+            user.profile.community = self.community
+            user.profile.save()
+
+    def _complete(self, day, tss):
+        from session_planner.models import CompletedSession
+        return CompletedSession.objects.create(user=self.user, date=day, group_name='Group A', tss=tss)
+
+    def test_loads_are_incremental_averages(self):
+        from datetime import date
+        from session_planner.fitness import ATL_DAYS, CTL_DAYS
+        from session_planner.models import DailyLoad
+
+        self._complete(date(2026, 9, 1), 100)
+        self._complete(date(2026, 9, 3), 70)
+        first, second = DailyLoad.objects.filter(user=self.user)
+        self.assertAlmostEqual(first.ctl, 100 / CTL_DAYS)
+        self.assertAlmostEqual(first.atl, 100 / ATL_DAYS)
+        # One rest day of decay, then the day's own TSS
+        atl = first.atl * (1 - 1 / ATL_DAYS)
+        self.assertAlmostEqual(second.atl, atl + (70 - atl) / ATL_DAYS)
+        self.assertAlmostEqual(second.tsb, second.ctl - second.atl)
+
+        # A late entry for an earlier day is carried forward through the later ones
+        earlier = self._complete(date(2026, 8, 31), 50)
+        self.assertEqual(DailyLoad.objects.filter(user=self.user).count(), 3)
+        self.assertGreater(DailyLoad.objects.get(user=self.user, day=date(2026, 9, 3)).ctl, second.ctl)
+        self.assertEqual(self.user.fitness.day, date(2026, 9, 3))
+
+        earlier.delete()
+        self.assertAlmostEqual(DailyLoad.objects.get(user=self.user, day=date(2026, 9, 3)).ctl, second.ctl)
+
+    def test_member_marks_session_completed(self):
+        session = Session.objects.create(title="Tempo", date='2026-09-09', community=self.community, structure_json=[])
+        group = SessionGroup.objects.create(session=session, name='Group B', vdot=45, structure_json=[
+            {'type': 'single', 'segment': {'reps': 5, 'distance': 1000, 'intensity': 'Threshold', 'rest': 60}},
+        ])
+        self.client.force_login(self.user)
+
+        self.client.post(reverse('complete-session', args=[session.id]), {'group_id': group.id})
+        completion = self.user.completed_sessions.get()
+        self.assertEqual(completion.group_name, 'Group B')
+        self.assertGreater(completion.tss, 0)
+        self.assertContains(self.client.get(reverse('session-detail', args=[session.id])), 'Completed with Group B')
+
+        # Completing again keeps the record; undoing is its own action
+        self.client.post(reverse('complete-session', args=[session.id]))
+        self.assertTrue(self.user.completed_sessions.exists())
+        self.client.post(reverse('uncomplete-session', args=[session.id]))
+        self.assertFalse(self.user.completed_sessions.exists())
+        self.assertFalse(self.user.daily_loads.exists())
+
+    def test_future_sessions_cant_be_completed(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from session_planner.fitness import decayed
+        from session_planner.models import DailyLoad
+        tomorrow = timezone.now().date() + timedelta(days=1)
+        session = Session.objects.create(title="Next", date=tomorrow, community=self.community, structure_json=[])
+        SessionGroup.objects.create(session=session, name='Group B', vdot=45, structure_json=[
+            {'type': 'single', 'segment': {'reps': 5, 'distance': 1000, 'intensity': 'Threshold', 'rest': 60}},
+        ])
+        self.client.force_login(self.user)
+
+        self.assertNotContains(self.client.get(reverse('session-detail', args=[session.id])), 'Mark Completed')
+        response = self.client.post(reverse('complete-session', args=[session.id]))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.user.completed_sessions.exists())
+
+        # A load is never decayed backwards into a bigger one
+        load = DailyLoad(day=tomorrow, ctl=50, atl=60, tsb=-10)
+        self.assertEqual(decayed(load, tomorrow - timedelta(days=3)), (50, 60, -10))
+
+    def test_overreaching_list(self):
+        from datetime import timedelta
+        from django.utils import timezone
+
+        today = timezone.now().date()
+        for offset in range(5):
+            self._complete(today - timedelta(days=offset), 150)
+        self.client.force_login(self.coach)
+        self.client.get(reverse('club-fitness'))
+        # Session, user and community (the role is kept in the session), then the one fitness query
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('club-fitness'))
+        self.assertEqual([r['fitness'].user for r in response.context['runners']], [self.user])
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('club-fitness')).status_code, 403)
+
+    def test_recovered_runners_are_not_overreaching(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from session_planner.fitness import overreaching_runners
+        from session_planner.models import RunnerFitness
+
+        # Overreaching on the last training day, but six rest days bring TSB to about +5
+        RunnerFitness.objects.create(
+            user=self.user, community=self.community, day=timezone.now().date() - timedelta(days=6),
+            ctl=40, atl=75, tsb=-35,
+        )
+        self.assertEqual(overreaching_runners(self.community), [])
+
+
+def _activity_track(rep_speed=4.0, reps=5, rep_m=1000, rest_s=60):
+    """(elapsed seconds, metres covered) at 1 Hz: jog, reps with standing-ish rests, jog."""
+    samples, t, covered = [(0, 0.0)], 0, 0.0
+
+    def run(seconds, speed):
+        nonlocal t, covered
+        for _ in range(int(seconds)):
+            t += 1
+            covered += speed
+            samples.append((t, covered))
+
+    run(120, 2.5)
+    for _ in range(reps):
+        run(rep_m / rep_speed, rep_speed)
+        run(rest_s, 1.0)
+    run(120, 2.5)
+    return samples
+
+
+def _gpx(samples):
+    # Along the equator a degree of longitude is a fixed distance
+    points = ''.join(
+        f'<trkpt lat="0" lon="{covered / 111194.9266:.8f}"><time>2026-09-09T18:{t // 60:02d}:{t % 60:02d}Z</time></trkpt>'
+        for t, covered in samples
+    )
+    return f'<gpx xmlns="http://www.topografix.com/GPX/1/1"><trk><trkseg>{points}</trkseg></trk></gpx>'.encode()
+
+
+def _tcx(samples):
+    points = ''.join(
+        f'<Trackpoint><Time>2026-09-09T18:{t // 60:02d}:{t % 60:02d}Z</Time><DistanceMeters>{covered}</DistanceMeters></Trackpoint>'
+        for t, covered in samples
+    )
+    return (
+        '<TrainingCenterDatabase xmlns="http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2">'
+        f'<Activities><Activity><Lap><Track>{points}</Track></Lap></Activity></Activities></TrainingCenterDatabase>'
+    ).encode()
+
+
+def _fit(samples):
+    import struct
+    start = 1_100_000_000
+    # Local message 0 defines record messages with a timestamp and distance (cm)
+    data = bytes([0x40, 0, 0]) + struct.pack('<HB', 20, 2) + bytes([253, 4, 0x86, 5, 4, 0x86])
+    for index, (t, covered) in enumerate(samples):
+        if index % 2:
+            # Every other record uses a compressed timestamp header
+            data += bytes([0x80 | ((start + t) & 0x1F)]) + struct.pack('<I', 0xFFFFFFFF) + struct.pack('<I', round(covered * 100))
+        else:
+            data += bytes([0x00]) + struct.pack('<II', start + t, round(covered * 100))
+    header = struct.pack('<BBHI4sH', 14, 0x20, 2100, len(data), b'.FIT', 0)
+    return header + data + b'\x00\x00'
+
+
+class ActivityIngestionTest(TestCase):
+    structure = [{'type': 'single', 'segment': {'reps': 5, 'distance': 1000, 'intensity': 'Threshold', 'rest': 60}}]
+
+    def setUp(self):
+        import tempfile
+        from django.test import override_settings
+
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username='runner', password='password123')
+        self.coach = User.objects.create_user(username='coach', password='password123')
+        self.community = Community.objects.create(name='Track Community', slug='track-community')
+        self.community.managers.add(self.coach)
+        for user in (self.user, self.coach):
+            user.profile.community = self.community
+            user.profile.save()
+        self.session = Session.objects.create(title="Cruise km", date='2026-09-09', community=self.community, structure_json=[])
+        self.group = SessionGroup.objects.create(session=self.session, name='Group A', vdot=50, structure_json=self.structure)
+
+    def test_reps_are_found_in_every_format(self):
+        from session_planner.activity import analyse_activity
+
+        samples = _activity_track()
+        for fmt, content in (('gpx', _gpx(samples)), ('tcx', _tcx(samples)), ('fit', _fit(samples))):
+            with self.subTest(fmt=fmt):
+                summary = analyse_activity(io.BytesIO(content), fmt, 50, self.structure)
+                self.assertEqual(len(summary['reps']), 5)
+                for rep in summary['reps']:
+                    self.assertAlmostEqual(rep['distance'], 1000, delta=2)
+                    self.assertEqual(rep['time_s'], 250)
+                    self.assertEqual(rep['intensity'], 'Threshold')
+                self.assertEqual(summary['duration_s'], samples[-1][0])
+                self.assertGreater(summary['actual_tss'], 0)
+
+    def test_faster_reps_show_against_the_plan(self):
+        from session_planner.activity import analyse_activity
+
+        easy = analyse_activity(io.BytesIO(_gpx(_activity_track(rep_speed=3.8))), 'gpx', 50, self.structure)
+        hard = analyse_activity(io.BytesIO(_gpx(_activity_track(rep_speed=4.4))), 'gpx', 50, self.structure)
+        self.assertGreater(easy['reps'][0]['delta_s'], 0)
+        self.assertLess(hard['reps'][0]['delta_s'], 0)
+        self.assertGreater(hard['actual_tss'], easy['actual_tss'])
+
+    def test_unknown_zones_are_skipped(self):
+        from session_planner.activity import analyse_activity
+
+        structure = self.structure + [{'type': 'single', 'segment': {'reps': 2, 'distance': 200, 'intensity': 'Retired', 'rest': 60}}]
+        summary = analyse_activity(io.BytesIO(_gpx(_activity_track())), 'gpx', 50, structure)
+        self.assertEqual([rep['intensity'] for rep in summary['reps']], ['Threshold'] * 5)
+
+    def test_read_points_are_detached(self):
+        from xml.etree.ElementTree import iterparse
+        from session_planner.activity import iter_gpx_points
+
+        parsed = []
+
+        def tracking_iterparse(*args, **kwargs):
+            for event, element in iterparse(*args, **kwargs):
+                parsed.append(element)
+                yield event, element
+
+        with patch('session_planner.activity.iterparse', tracking_iterparse):
+            points = list(iter_gpx_points(io.BytesIO(_gpx(_activity_track()))))
+        self.assertGreater(len(points), 1000)
+        segment = next(element for element in parsed if element.tag.endswith('trkseg'))
+        self.assertEqual(len(segment), 0)
+
+    def test_member_upload_records_completion(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from session_planner.models import ActivityUpload
+
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('upload-activity', args=[self.session.id]), {
+            'group_id': self.group.id, 'activity': SimpleUploadedFile('run.gpx', _gpx(_activity_track())),
+        })
+        upload = ActivityUpload.objects.get()
+        self.assertRedirects(response, reverse('activity-detail', args=[upload.id]))
+        self.assertEqual(upload.status, ActivityUpload.PROCESSED)
+        self.assertFalse(upload.file)
+        self.assertEqual(len(upload.reps), 5)
+        self.assertEqual(self.user.completed_sessions.get().tss, upload.actual_tss)
+        self.assertContains(self.client.get(reverse('activity-detail', args=[upload.id])), '1000m Threshold')
+
+        bad = self.client.post(reverse('upload-activity', args=[self.session.id]), {
+            'group_id': self.group.id, 'activity': SimpleUploadedFile('run.csv', b'time,distance'),
+        })
+        self.assertEqual(bad.status_code, 400)
+
+    def test_manager_bulk_upload(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from session_planner.models import ActivityUpload
+
+        self.client.force_login(self.coach)
+        self.client.post(reverse('bulk-upload-activities', args=[self.session.id]), {
+            'group_id': self.group.id,
+            'activities': [
+                SimpleUploadedFile('Runner.tcx', _tcx(_activity_track())),
+                SimpleUploadedFile('stranger.gpx', _gpx(_activity_track())),
+            ],
+        })
+        upload = ActivityUpload.objects.get()
+        self.assertEqual((upload.user, upload.status), (self.user, ActivityUpload.PROCESSED))
+        self.assertEqual(self.client.get(reverse('activity-detail', args=[upload.id])).status_code, 200)
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.post(reverse('bulk-upload-activities', args=[self.session.id])).status_code, 403)
+
+    def test_pending_uploads_survive_the_group_being_removed(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from session_planner.models import ActivityUpload
+        from session_planner.tasks import process_activity_uploads
+
+        self.client.force_login(self.user)
+        with patch('session_planner.tasks.process_activity_uploads'):
+            self.client.post(reverse('upload-activity', args=[self.session.id]), {
+                'group_id': self.group.id, 'activity': SimpleUploadedFile('run.gpx', _gpx(_activity_track())),
+            })
+        # The manager edits the session before the worker gets to the file
+        self.group.delete()
+        upload = ActivityUpload.objects.get()
+        process_activity_uploads.call([upload.id])
+
+        upload.refresh_from_db()
+        self.assertEqual((upload.status, len(upload.reps)), (ActivityUpload.PROCESSED, 5))
+        self.assertEqual(self.user.completed_sessions.get().group_name, 'Group A')
+
+    def test_bulk_uploads_are_capped(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from session_planner.activity import MAX_BULK_ACTIVITIES
+        from session_planner.models import ActivityUpload
+
+        self.client.force_login(self.coach)
+        response = self.client.post(reverse('bulk-upload-activities', args=[self.session.id]), {
+            'group_id': self.group.id,
+            'activities': [SimpleUploadedFile(f'runner{i}.gpx', b'') for i in range(MAX_BULK_ACTIVITIES + 1)],
+        })
+        self.assertRedirects(response, reverse('session-detail', args=[self.session.id]), fetch_redirect_response=False)
+        self.assertFalse(ActivityUpload.objects.exists())
+
+
+class SessionCheckInTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from django.utils import timezone
+
+        cache.clear()
+        self.coach = User.objects.create_user(username='coach', password='password123')
+        self.community = Community.objects.create(name='Track Night', slug='track-night', join_code='TRACK7')
+        self.community.managers.add(self.coach)
+        self.members = [User.objects.create_user(username=f'runner{i}', password='password123') for i in range(3)]
+        for user in [self.coach, *self.members]:
+            user.profile.community = self.community
+            user.profile.save()
+        self.session = Session.objects.create(title="Track Night", date=timezone.now().date(), community=self.community, structure_json=[])
+
+    def _board(self):
+        self.client.force_login(self.coach)
+        return self.client.get(reverse('check-in-board', args=[self.session.id]))
+
+    def test_qr_check_in_is_idempotent_and_counted_from_cache(self):
+        from session_planner.checkins import make_checkin_token
+        from session_planner.models import SessionCheckIn
+
+        self.assertEqual(self._board().context['count'], 0)
+        url = reverse('check-in', args=[make_checkin_token(self.session)])
+        for member in self.members[:2]:
+            self.client.force_login(member)
+            self.assertEqual(self.client.get(url).status_code, 200)
+            self.client.post(url)
+        # Checking in twice neither adds a row nor counts twice
+        response = self.client.post(url)
+        self.assertEqual(response.context['count'], 2)
+        self.assertEqual(SessionCheckIn.objects.filter(session=self.session).count(), 2)
+
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self.client.force_login(self.coach)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('attendance-count', args=[self.session.id]))
+        self.assertEqual(response.content, b'2')
+        self.assertFalse([q for q in queries.captured_queries if 'sessioncheckin' in q['sql']])
+
+    def test_join_code_checks_in_to_todays_session(self):
+        self.client.force_login(self.members[0])
+        response = self.client.post(reverse('join-code-check-in'), {'join_code': 'track7'})
+        self.assertTrue(response.context['done'])
+        self.assertTrue(self.session.check_ins.filter(user=self.members[0]).exists())
+
+        self.assertEqual(self.client.post(reverse('join-code-check-in'), {'join_code': 'WRONG'}).status_code, 400)
+
+    def test_tokens_are_checked(self):
+        from session_planner.checkins import make_checkin_token
+
+        outsider = User.objects.create_user(username='outsider', password='password123')
+        self.client.force_login(outsider)
+        self.assertEqual(self.client.post(reverse('check-in', args=[make_checkin_token(self.session)])).status_code, 403)
+        self.client.force_login(self.members[0])
+        self.assertEqual(self.client.post(reverse('check-in', args=['forged:token:value'])).status_code, 404)
+        self.assertFalse(self.session.check_ins.exists())
+        self.assertContains(self._board(), '<svg')
+
+
+class SessionReminderTest(TestCase):
+    def setUp(self):
+        from datetime import date
+        from communities.models import CalendarEvent
+
+        self.day = date(2026, 5, 6)
+        self.community = Community.objects.create(name='Reminder Club', slug='reminder-club')
+        self.members = []
+        for i, training_group in enumerate(['a', 'b', 'b', 'a']):
+            user = User.objects.create_user(username=f'runner{i}', email=f'runner{i}@example.com', password='password123')
+            user.profile.community = self.community
+            user.profile.training_group = training_group
+            user.profile.save()
+            self.members.append(user)
+        self.members[3].profile.session_reminders = False
+        self.members[3].profile.save()
+
+        other = Community.objects.create(name='Other Club', slug='other-club')
+        outsider = User.objects.create_user(username='outsider', email='outsider@example.com', password='password123')
+        outsider.profile.community = other
+        outsider.profile.save()
+        Session.objects.create(title="Other Track", date=self.day, community=other, structure_json=[])
+
+        structure = [{"type": "single", "segment": {"reps": 6, "distance": 800, "intensity": "Interval", "rest": 90}}]
+        self.session = Session.objects.create(title="Wednesday Track", date=self.day, community=self.community, structure_json=structure)
+        SessionGroup.objects.create(session=self.session, name="Group A", vdot=54.55)
+        SessionGroup.objects.create(session=self.session, name="Group B", vdot=45)
+        # A weekly event that started weeks ago still falls on the day
+        CalendarEvent.objects.create(community=self.community, title="Pub Run", date=date(2026, 4, 8), is_public=True, recurrence=CalendarEvent.WEEKLY)
+
+    def test_one_digest_per_opted_in_member_with_own_group_first(self):
+        from django.core import mail
+        from session_planner.reminders import send_reminders
+
+        self.assertEqual(send_reminders(self.day, per_second=1000), 4)
+        by_recipient = {m.to[0]: m for m in mail.outbox}
+        # The opted-out member gets nothing, other clubs only their own sessions
+        self.assertEqual(sorted(by_recipient), ['outsider@example.com', 'runner0@example.com', 'runner1@example.com', 'runner2@example.com'])
+        self.assertNotIn("Wednesday Track", by_recipient['outsider@example.com'].body)
+        self.assertIn("Wednesday Track", by_recipient['runner0@example.com'].subject)
+        self.assertIn("Pub Run", by_recipient['runner0@example.com'].body)
+        for email, first, second in [('runner0@example.com', 'Group A', 'Group B'), ('runner1@example.com', 'Group B', 'Group A')]:
+            body = by_recipient[email].body
+            self.assertLess(body.index(f"{first} (your group)"), body.index(second))
+        html, mimetype = by_recipient['runner1@example.com'].alternatives[0]
+        self.assertEqual(mimetype, 'text/html')
+        self.assertIn(reverse('session-detail', args=[self.session.id]), html)
+
+    def test_batches_share_one_connection_and_respect_the_rate(self):
+        from session_planner import reminders
+
+        backend = reminders.mailers.default.__class__
+        # As an anymail backend, which sends a message with merge_data to each recipient separately
+        with patch.object(backend, 'esp_name', 'Resend', create=True), \
+                patch.object(backend, 'send_messages', autospec=True, side_effect=lambda self, batch: len(batch)) as send, \
+                patch.object(backend, 'open', autospec=True) as open_connection, \
+                patch.object(reminders.time, 'sleep') as sleep:
+            self.assertEqual(reminders.send_reminders(self.day, batch_size=1, per_second=1), 4)
+        # One call per digest batch: group a, group b's two members split by batch_size, the outsider
+        messages = [call.args[1] for call in send.call_args_list]
+        self.assertEqual([len(batch) for batch in messages], [1, 1, 1, 1])
+        self.assertEqual(messages[1][0].to, ['runner1@example.com'])
+        self.assertEqual(messages[1][0].merge_data, {'runner1@example.com': {}})
+        self.assertEqual(open_connection.call_count, 1)
+        # Waits about a second before every call after the first
+        self.assertEqual(sleep.call_count, 3)
+        self.assertAlmostEqual(sleep.call_args.args[0], 1, delta=0.5)
+
+    def test_members_share_a_message_per_digest(self):
+        from session_planner.reminders import reminder_batches
+        batches = [(user_ids, message.to) for user_ids, message in reminder_batches(self.day, batch_size=100)]
+        self.assertIn(([self.members[1].id, self.members[2].id], ['runner1@example.com', 'runner2@example.com']), batches)
+        self.assertEqual(len(batches), 3)
+
+    def test_reruns_only_send_what_failed(self):
+        from django.core import mail
+        from session_planner import reminders
+
+        backend = reminders.mailers.default.__class__
+        original = backend.send_messages
+
+        def flaky(self, messages):
+            if messages[0].to == ['runner1@example.com']:
+                raise ConnectionError("provider unavailable")
+            return original(self, messages)
+
+        with patch.object(backend, 'send_messages', autospec=True, side_effect=flaky):
+            self.assertEqual(reminders.send_reminders(self.day, per_second=1000), 2)
+        self.assertEqual(reminders.send_reminders(self.day, per_second=1000), 2)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), [
+            'outsider@example.com', 'runner0@example.com', 'runner1@example.com', 'runner2@example.com',
+        ])
+        self.assertEqual(reminders.send_reminders(self.day, per_second=1000), 0)
+
+    def test_nothing_is_sent_on_a_quiet_day(self):
+        from datetime import timedelta
+        from django.core import mail
+        from session_planner.reminders import send_reminders
+
+        self.assertEqual(send_reminders(self.day + timedelta(days=1)), 0)
+        self.assertEqual(mail.outbox, [])
@@ -0,0 +1,203 @@
+"""
+Track occupancy simulation. Given the calculated plans of the groups sharing a
+session, models where each group is on the 400 m loop over time, flags where
+groups meet or lap each other, and suggests start offsets and lanes that keep
+them apart.
+"""
+import math
+
+TRACK_LENGTH_M = 400
+STEP_S = 2
+# Bounds on the work per request: only this much of a session is simulated, and
+# long sessions are sampled less often so no group's trace exceeds MAX_TRACE_STEPS
+MAX_SIMULATED_S = 2 * 60 * 60
+MAX_TRACE_STEPS = 600
+# Groups closer than this on the loop are sharing the same stretch of track
+CONFLICT_GAP_M = 15
+MAX_OFFSET_S = 240
+OFFSET_STEP_S = 20
+
+
+def _parse_time(text):
+    """Seconds in a "m:ss.xx" time as formatted by the plans."""
+    try:
+        minutes, seconds = str(text).split(':')
+        return int(minutes) * 60 + float(seconds)
+    except ValueError:
+        return 0.0
+
+
+def _format_time(seconds):
+    return f"{int(seconds // 60)}:{int(seconds % 60):02d}"
+
+
+def _reps(plan):
+    for item in plan['workout_structure']:
+        if item['type'] == 'block':
+            for _ in range(item['multiplier']):
+                for seg in item['segments']:
+                    for _ in range(seg['reps']):
+                        yield seg
+        else:
+            for _ in range(item['segment']['reps']):
+                yield item['segment']
+
+
+def _duration(plan):
+    """Seconds from the first rep to the end of the last, without expanding the reps."""
+    total, last = 0.0, None
+    for item in plan['workout_structure']:
+        count = item['multiplier'] if item['type'] == 'block' else 1
+        for seg in item['segments'] if item['type'] == 'block' else [item['segment']]:
+            total += count * seg['reps'] * (_parse_time(seg['target_pace']) + seg['rest'])
+            last = seg
+    return total - last['rest'] if last else 0.0
+
+
+def _phases(plan, limit_s=MAX_SIMULATED_S):
+    """(duration_s, speed_m_s) of each rep and rest, in the order they are run, up to limit_s."""
+    phases, elapsed, previous = [], 0.0, None
+    for seg in _reps(plan):
+        # Recoveries are taken standing where the rep finished
+        if previous is not None and previous['rest']:
+            phases.append((previous['rest'], 0.0))
+            elapsed += previous['rest']
+        if elapsed >= limit_s:
+            break
+        rep_time = _parse_time(seg['target_pace'])
+        if rep_time > 0:
+            phases.append((rep_time, seg['distance'] / rep_time))
+            elapsed += rep_time
+        previous = seg
+    return phases
+
+
+def _trace(phases, step_s=STEP_S, limit_s=MAX_SIMULATED_S):
+    """Distance covered (not wrapped to the loop) and whether moving, every step_s."""
+    distances, moving = [], []
+    start, covered, t = 0.0, 0.0, 0.0
+    for duration, speed in phases:
+        end = min(start + duration, limit_s)
+        while t < end:
+            distances.append(covered + speed * (t - start))
+            moving.append(speed > 0)
+            t += step_s
+        covered += speed * duration
+        start += duration
+    return distances, moving
+
+
+def _conflicts(a, b, shift):
+    """
+    Steps where two groups share track when b starts `shift` steps after a.
+    Groups that haven't started or have finished are off the track. Returns
+    (steps, incidents, first_step) with first_step counted on a's clock.
+    """
+    da, ma = a
+    db, mb = b
+    steps, incidents, first, previous = 0, 0, None, False
+    for i in range(max(0, shift), min(len(da), len(db) + shift)):
+        j = i - shift
+        gap = (da[i] - db[j]) % TRACK_LENGTH_M
+        hit = (ma[i] or mb[j]) and (gap < CONFLICT_GAP_M or gap > TRACK_LENGTH_M - CONFLICT_GAP_M)
+        if hit:
+            steps += 1
+            if not previous:
+                incidents += 1
+                if first is None:
+                    first = i
+        previous = hit
+    return steps, incidents, first
+
+
+def _pair_report(names, traces, offsets, step_s):
+    report = []
+    for x in range(len(traces)):
+        for y in range(x + 1, len(traces)):
+            shift = offsets[y] - offsets[x]
+            if shift >= 0:
+                steps, incidents, first = _conflicts(traces[x], traces[y], shift)
+                first_s = None if first is None else (first + offsets[x]) * step_s
+            else:
+                steps, incidents, first = _conflicts(traces[y], traces[x], -shift)
+                first_s = None if first is None else (first + offsets[y]) * step_s
+            if steps:
+                report.append({
+                    'groups': [names[x], names[y]],
+                    'pair': (x, y),
+                    'seconds': steps * step_s,
+                    'incidents': incidents,
+                    'first_at': _format_time(first_s),
+                })
+    return report
+
+
+def simulate_track(plans):
+    """
+    Simulates the groups on one track and suggests how to stagger them.
+
+    Each group is given a start offset (the first keeps 0) chosen greedily to
+    minimise time spent sharing track with the groups already placed; groups
+    that still meet are then put in different lanes. Returns None for fewer
+    than two groups. Only the first MAX_SIMULATED_S of a session is simulated
+    (`truncated` says whether anything was left out), at a step coarse enough to
+    keep each trace within MAX_TRACE_STEPS.
+    """
+    plans = [plan for plan in plans if plan['workout_structure']]
+    if len(plans) < 2:
+        return None
+    names = [plan['name'] for plan in plans]
+    durations = [_duration(plan) for plan in plans]
+    simulated_s = min(max(durations), MAX_SIMULATED_S)
+    step_s = max(STEP_S, math.ceil(simulated_s / MAX_TRACE_STEPS))
+    traces = [_trace(_phases(plan), step_s) for plan in plans]
+
+    together = _pair_report(names, traces, [0] * len(plans), step_s)
+
+    candidates = sorted({round(offset / step_s) for offset in range(0, MAX_OFFSET_S + 1, OFFSET_STEP_S)})
+    offsets = [0]
+    for index in range(1, len(traces)):
+        best_offset, best_cost = 0, None
+        for offset in candidates:
+            cost = 0
+            for placed, placed_offset in enumerate(offsets):
+                shift = offset - placed_offset
+                if shift >= 0:
+                    cost += _conflicts(traces[placed], traces[index], shift)[0]
+                else:
+                    cost += _conflicts(traces[index], traces[placed], -shift)[0]
+                if best_cost is not None and cost >= best_cost:
+                    break
+            if best_cost is None or cost < best_cost:
+                best_offset, best_cost = offset, cost
+        offsets.append(best_offset)
+
+    remaining = _pair_report(names, traces, offsets, step_s)
+
+    # Groups that still meet run in different lanes, inside lane first
+    clashes = {index: set() for index in range(len(plans))}
+    for conflict in remaining:
+        x, y = conflict['pair']
+        clashes[x].add(y)
+        clashes[y].add(x)
+    lanes = {}
+    for index in range(len(plans)):
+        taken = {lanes[other] for other in clashes[index] if other in lanes}
+        lanes[index] = next(lane for lane in range(1, len(plans) + 1) if lane not in taken)
+
+    return {
+        'groups': [
+            {
+                'name': names[index],
+                'offset_s': offsets[index] * step_s,
+                'offset': _format_time(offsets[index] * step_s),
+                'lane': lanes[index],
+                'finish': _format_time(offsets[index] * step_s + durations[index]),
+            }
+            for index in range(len(plans))
+        ],
+        'conflicts': together,
+        'remaining': remaining,
+        'truncated': max(durations) > MAX_SIMULATED_S,
+        'simulated': _format_time(simulated_s),
+    }
@@ -15,7 +15,28 @@ from .views import (
     create_training_block_view,
     get_schedule_form_view,
     apply_block_to_calendar_view,
-    copy_training_block_view
+    copy_training_block_view,
+    marketplace_view,
+    calendar_feed_view,
+    session_history_view,
+    similar_workouts_view,
+    session_group_card_view,
+    session_events_view,
+    archived_session_view,
+    month_calendar_view,
+    season_dashboard_view,
+    complete_session_view,
+    uncomplete_session_view,
+    upload_activity_view,
+    bulk_upload_activities_view,
+    activity_detail_view,
+    check_in_view,
+    join_code_check_in_view,
+    check_in_board_view,
+    attendance_count_view,
+    club_fitness_view,
+    session_revisions_view,
+    session_revision_view
 )
 
 
@@ -26,10 +47,31 @@ urlpatterns = [
     path('recalculate-plan/', recalculate_group_plan_view, name='recalculate-plan'),
     path('add-repeat-block/', add_repeat_block, name='add-repeat-block'),
     path('save-workout/', save_workout_view, name='save-workout'),
+    path('similar-workouts/', similar_workouts_view, name='similar-workouts'),
     path('sessions/', session_list_view, name='session-list'),
+    path('sessions/season/', season_dashboard_view, name='season-dashboard'),
+    path('sessions/fitness/', club_fitness_view, name='club-fitness'),
+    path('sessions/calendar/', month_calendar_view, name='month-calendar'),
+    path('sessions/calendar/<int:year>/<int:month>/', month_calendar_view, name='month-calendar'),
+    path('sessions/history/', session_history_view, name='session-history'),
     path('sessions/<int:pk>/', session_detail_view, name='session-detail'),
+    path('sessions/<int:pk>/groups/<int:group_id>/', session_group_card_view, name='session-group-card'),
+    path('sessions/<int:pk>/events/', session_events_view, name='session-events'),
+    path('sessions/<int:pk>/complete/', complete_session_view, name='complete-session'),
+    path('sessions/<int:pk>/uncomplete/', uncomplete_session_view, name='uncomplete-session'),
+    path('sessions/<int:pk>/activities/', upload_activity_view, name='upload-activity'),
+    path('sessions/<int:pk>/activities/bulk/', bulk_upload_activities_view, name='bulk-upload-activities'),
+    path('activities/<int:pk>/', activity_detail_view, name='activity-detail'),
+    path('sessions/<int:pk>/check-in/', check_in_board_view, name='check-in-board'),
+    path('sessions/<int:pk>/attendance/', attendance_count_view, name='attendance-count'),
+    path('check-in/', join_code_check_in_view, name='join-code-check-in'),
+    path('check-in/<str:token>/', check_in_view, name='check-in'),
+    path('sessions/archive/<int:pk>/', archived_session_view, name='archived-session'),
+    path('sessions/<int:pk>/revisions/', session_revisions_view, name='session-revisions'),
+    path('sessions/<int:pk>/revisions/<int:number>/', session_revision_view, name='session-revision'),
     path('sessions/<int:pk>/edit/', session_edit_view, name='edit-session'),
     path('sessions/shift/', shift_schedule_view, name='shift-schedule'),
+    path('feeds/<str:token>.ics', calendar_feed_view, name='calendar-feed'),
     
     # Training Blocks
     path('blocks/', block_list_view, name='block-list'),
@@ -38,4 +80,5 @@ urlpatterns = [
     path('blocks/<int:block_id>/schedule/', get_schedule_form_view, name='get-schedule-form'),
     path('blocks/apply/', apply_block_to_calendar_view, name='apply-block-to-calendar'),
     path('blocks/<int:block_id>/copy/', copy_training_block_view, name='copy-block'),
+    path('blocks/marketplace/', marketplace_view, name='marketplace'),
 ]
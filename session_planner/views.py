@@ -2,14 +2,28 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
 from django.http import QueryDict, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.cache import cache_control
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
-from workouts.utils import calculate_vdot, calculate_pace_from_vdot, calculate_tss, TRAINING_ZONES
+from workouts.idempotency import idempotent
+from workouts.utils import calculate_vdot, TRAINING_ZONES
 import logging
 import json
 import calendar
 from datetime import datetime, timedelta
-from .models import Session, SessionGroup, TrainingBlock
+from functools import partial
+from .models import ArchivedSession, Session, SessionGroup, TrainingBlock, TrendingBlock
+from .plans import _process_and_calculate_group_plan, get_group_plan
+from .popularity import APPLY, COPY, record_block_use
+from .projections import community_group_vdots, get_block_projection
+from .tasks import render_session_share_cards
+from .concurrency import bump_version, claim_version, posted_version
+from .segment_index import TRACK_DISTANCES, filter_by_segment
+from .revisions import ensure_baseline_revision, record_revision
+from .structure import (
+    CURRENT_STRUCTURE_VERSION, MAX_BLOCK_SEGMENTS, MAX_STRUCTURE_ITEMS, StructureError, parse_structure,
+    validate_structure
+)
 
 logger = logging.getLogger(__name__)
 
@@ -19,17 +33,14 @@ def shift_schedule_view(request):
     """View to shift all sessions and events from a specific date forward or backward."""
     from communities.models import CalendarEvent
     from datetime import datetime, timedelta
+    from .concurrency import bump_version
 
     if request.method != 'POST':
         return HttpResponse("Method not allowed", status=405)
 
-    try:
-        profile = request.user.profile
-        community = profile.community
-    except Exception:
-        return redirect('home')
+    community = request.membership.community
 
-    if not community or request.user not in community.managers.all():
+    if not community or not request.membership.is_manager:
         return HttpResponse("Unauthorized", status=403)
 
     start_date_str = request.POST.get('start_date')
@@ -51,28 +62,81 @@ def shift_schedule_view(request):
         for session in sessions:
             session.date = session.date + timedelta(days=shift_days)
             session.save()
+            bump_version(Session, session.pk)
 
-        # Shift Events
-        events = CalendarEvent.objects.filter(community=community, date__gte=start_date)
+        # Shift Events. A repeating event moves as a whole, exceptions included,
+        # when it starts on or after the shift; one already running keeps its dates.
+        from communities.models import CalendarEventException
+        events = list(CalendarEvent.objects.filter(community=community, date__gte=start_date))
         for event in events:
             event.date = event.date + timedelta(days=shift_days)
+            if event.recurrence_until:
+                event.recurrence_until = event.recurrence_until + timedelta(days=shift_days)
             event.save()
+        # One at a time, furthest first, so no two of an event's exceptions share a date midway
+        exceptions = CalendarEventException.objects.filter(event__in=events).order_by('-date' if shift_days > 0 else 'date')
+        for exception in exceptions:
+            exception.date = exception.date + timedelta(days=shift_days)
+            exception.save(update_fields=['date'])
 
     return redirect('session-list')
 
 @login_required
 def block_list_view(request):
     """View to list all training blocks for the user's community."""
-    community = None
-    if hasattr(request.user, 'profile'):
-        community = request.user.profile.community
+    community = request.membership.community
 
     if community:
         blocks = TrainingBlock.objects.filter(community=community)
     else:
         blocks = TrainingBlock.objects.filter(created_by=request.user)
 
-    return render(request, 'session_planner/block_list.html', {'blocks': blocks})
+    segment_filter = _segment_filter_params(request.GET)
+    blocks = filter_by_segment(blocks, segment_filter['distance'], segment_filter['intensity'])
+
+    return render(request, 'session_planner/block_list.html', {
+        'blocks': blocks,
+        'segment_filter': segment_filter,
+        'distances': TRACK_DISTANCES,
+        'zones': list(TRAINING_ZONES),
+    })
+
+def _segment_filter_params(params):
+    """Reads the distance/zone filter from a query string, dropping invalid values."""
+    try:
+        distance = int(params.get('distance', ''))
+    except ValueError:
+        distance = None
+    intensity = params.get('zone')
+    if intensity not in TRAINING_ZONES:
+        intensity = None
+    return {'distance': distance, 'intensity': intensity}
+
+MARKETPLACE_PAGE_SIZE = 12
+TRENDING_SHOWN = 5
+
+@login_required
+def marketplace_view(request):
+    """Tradeable blocks from every community, ranked by full-text search when there's a query."""
+    from django.core.paginator import Paginator
+    from .search import search_blocks
+
+    query = request.GET.get('q', '').strip()[:200]
+    if query:
+        blocks = search_blocks(query)
+    else:
+        blocks = TrainingBlock.objects.filter(is_tradeable=True).select_related('community').prefetch_related('templates').order_by('-created_at')
+    page = Paginator(blocks, MARKETPLACE_PAGE_SIZE).get_page(request.GET.get('page'))
+
+    trending = []
+    if not query and page.number == 1:
+        trending = TrendingBlock.objects.select_related('block__community')[:TRENDING_SHOWN]
+
+    return render(request, 'session_planner/marketplace.html', {
+        'query': query,
+        'page': page,
+        'trending': trending,
+    })
 
 @require_http_methods(["POST"])
 @login_required
@@ -80,9 +144,7 @@ def copy_training_block_view(request, block_id):
     """View to copy a training block to the user's community instantly."""
     original_block = get_object_or_404(TrainingBlock, id=block_id, is_tradeable=True)
 
-    community = None
-    if hasattr(request.user, 'profile'):
-        community = request.user.profile.community
+    community = request.membership.community
 
     from django.db import transaction
     with transaction.atomic():
@@ -103,8 +165,11 @@ def copy_training_block_view(request, block_id):
                 week_number=template.week_number,
                 title=template.title,
                 description=template.description,
-                structure_json=template.structure_json
+                structure_json=template.get_structure(),
+                structure_version=CURRENT_STRUCTURE_VERSION
             )
+        # Counted after commit so the block's row isn't locked for the whole copy
+        transaction.on_commit(partial(record_block_use, original_block.id, COPY))
 
     return redirect('edit-block', block_id=new_block.id)
 
@@ -117,9 +182,7 @@ def create_training_block_view(request):
         target_distance = request.POST.get('target_distance')
         is_tradeable = request.POST.get('is_tradeable') == 'on'
         
-        community = None
-        if hasattr(request.user, 'profile'):
-            community = request.user.profile.community
+        community = request.membership.community
 
         if title and target_distance:
             TrainingBlock.objects.create(
@@ -143,6 +206,7 @@ def get_schedule_form_view(request, block_id):
 
 @require_http_methods(["POST"])
 @login_required
+@idempotent
 def apply_block_to_calendar_view(request):
     """View to apply a training block to the calendar by creating Session objects."""
     block_id = request.POST.get('block_id')
@@ -157,7 +221,7 @@ def apply_block_to_calendar_view(request):
     except ValueError:
         return HttpResponse("Invalid date format", status=400)
     
-    community = request.user.profile.community
+    community = request.membership.community
     if not community:
         return HttpResponse("User must belong to a community", status=400)
     
@@ -175,18 +239,31 @@ def apply_block_to_calendar_view(request):
             description=template.description,
             community=community,
             creator=request.user,
-            structure_json=template.structure_json
+            structure_json=template.get_structure(),
+            structure_version=CURRENT_STRUCTURE_VERSION
         )
         sessions_created += 1
-    
+
+    record_block_use(block.id, APPLY)
     return HttpResponse(f'<div class="bg-green-900/40 border border-green-500 text-green-400 p-4 rounded-lg font-bold text-center uppercase tracking-widest text-xs">Successfully added {sessions_created} sessions to the calendar!</div>')
 
 def _extract_workout_structure(post_data, prefix=''):
     """
     Helper to extract the raw structure from POST data for saving.
     Supports a prefix to distinguish between base and group-specific structures.
+
+    The planner posts the whole structure as a single JSON field; the older
+    parallel item_type/reps/distance/... lists are still accepted. Either way the
+    result is validated against the structure limits and StructureError is raised
+    if it doesn't fit.
     """
+    raw_structure = post_data.get(f'{prefix}structure')
+    if raw_structure:
+        return parse_structure(raw_structure)
+
     item_types = post_data.getlist(f'{prefix}item_type')
+    if len(item_types) > MAX_STRUCTURE_ITEMS * (MAX_BLOCK_SEGMENTS + 2):
+        raise StructureError("Workout structure is too large")
     reps_list = post_data.getlist(f'{prefix}reps')
     distances_list = post_data.getlist(f'{prefix}distance')
     intensities_list = post_data.getlist(f'{prefix}intensity')
@@ -200,9 +277,13 @@ def _extract_workout_structure(post_data, prefix=''):
 
     for item in item_types:
         if item == 'block_start':
+            try:
+                multiplier = int(block_multipliers[block_idx] if block_idx < len(block_multipliers) and block_multipliers[block_idx] and block_multipliers[block_idx] != '' else 1)
+            except ValueError:
+                multiplier = 1
             current_block = {
                 'type': 'block',
-                'multiplier': int(block_multipliers[block_idx] if block_idx < len(block_multipliers) and block_multipliers[block_idx] and block_multipliers[block_idx] != '' else 1),
+                'multiplier': multiplier,
                 'segments': []
             }
             block_idx += 1
@@ -233,111 +314,13 @@ def _extract_workout_structure(post_data, prefix=''):
             else:
                 structure.append({'type': 'single', 'segment': segment})
             seg_idx += 1
-    return structure
-
-
-def _process_and_calculate_group_plan(group_name, group_vdot, structure, prefix=None):
-    """
-    Helper function to process a workout structure for a single group.
-    """
-    final_flat_segments = []  # Used for TSS and Totals
-    display_structure = []  # Used for rendering the Canvas card
+    return validate_structure(structure)
 
-    total_active_dist_m = 0
-    total_active_time_s = 0
-    total_rest_time_s = 0
-
-    def process_segment(seg, block_multiplier=1):
-        nonlocal total_active_dist_m, total_active_time_s
-
-        if seg['intensity'] not in TRAINING_ZONES:
-             return None
-             
-        pace_data = calculate_pace_from_vdot(group_vdot, TRAINING_ZONES[seg['intensity']]['max'], seg['distance'])
-        if not pace_data:
-            return None
-
-        # Calculate 400m lap time
-        pace_per_km_s = pace_data['pace_per_km']['minutes'] * 60 + pace_data['pace_per_km']['seconds']
-        lap_time_s = pace_per_km_s * 0.4
-        lap_fmt = f"{int(lap_time_s // 60)}:{lap_time_s % 60:05.2f}"
-        split_100m_s = pace_per_km_s * 0.1
-        split_100m_fmt = f"{int(split_100m_s // 60)}:{split_100m_s % 60:05.2f}"
-
-        target_pace_fmt = f"{pace_data['target_pace']['minutes']}:{pace_data['target_pace']['seconds']:05.2f}"
-
-        # Totals calculation
-        pace_s = pace_data['target_pace']['minutes'] * 60 + pace_data['target_pace']['seconds']
-        effective_reps = seg['reps'] * block_multiplier
-        total_active_dist_m += seg['distance'] * effective_reps
-        total_active_time_s += pace_s * effective_reps
-
-        segment_data = {
-            **seg,
-            'target_pace': target_pace_fmt,
-            'lap_time': lap_fmt,
-            'split_100m': split_100m_fmt,
-        }
-
-        # Flatten for TSS (TSS needs total reps across all sets)
-        final_flat_segments.append({**segment_data, 'reps': effective_reps})
-        return segment_data
-
-    # Process structured workout into calc data
-    for item in structure:
-        if item['type'] == 'single':
-            calc_seg = process_segment(item['segment'])
-            if calc_seg:
-                display_structure.append({'type': 'single', 'segment': calc_seg})
-        elif item['type'] == 'block':
-            calc_block_segs = []
-            for s in item['segments']:
-                calc_seg = process_segment(s, block_multiplier=item['multiplier'])
-                if calc_seg:
-                    calc_block_segs.append(calc_seg)
-            display_structure.append({
-                'type': 'block',
-                'multiplier': item['multiplier'],
-                'segments': calc_block_segs
-            })
-
-    # 3. RE-CALCULATE REST TIME
-    for seg in final_flat_segments:
-        reps = int(seg['reps'])
-        rest = int(seg['rest'])
-        if reps > 1:
-            total_rest_time_s += (reps - 1) * rest
-            
-    if len(final_flat_segments) > 1:
-        for i in range(len(final_flat_segments) - 1):
-            total_rest_time_s += int(final_flat_segments[i]['rest'])
-
-    total_time_s = total_active_time_s + total_rest_time_s
-
-    # 4. PREPARE RESULTS
-    return {
-        'name': group_name,
-        'vdot': round(group_vdot, 2),
-        'prefix': prefix,
-        'workout_structure': display_structure,
-        'summary': {
-            'distance': f"{total_active_dist_m / 1000:.2f} km",
-            'active_time': f"{int(total_active_time_s // 60)}:{int(total_active_time_s % 60):02d}",
-            'total_time': f"{int(total_time_s // 60)}:{int(total_time_s % 60):02d}",
-            'tss': round(calculate_tss(group_vdot, final_flat_segments)) if group_vdot > 0 else 0,
-            "raw_distance_km": float(total_active_dist_m / 1000),
-            "raw_total_time_min": float(total_time_s / 60),
-        }
-    }
 
 @login_required
 def planner_page_view(request):
-    try:
-        profile = request.user.profile
-        community = profile.community
-        if not community:
-            return redirect('home')
-    except:
+    community = request.membership.community
+    if not community:
         return redirect('home')
     
     # Default data for a new workout
@@ -360,7 +343,7 @@ def session_edit_view(request, pk):
     session = get_object_or_404(Session, pk=pk)
     
     # Verify user is community manager
-    if not session.community or request.user not in session.community.managers.all():
+    if session.community_id not in request.membership.managed_ids:
         return redirect('session-detail', pk=pk)
     
     # Prepare groups data for the form
@@ -369,8 +352,6 @@ def session_edit_view(request, pk):
     groups_results = []
     chars = ['a', 'b', 'c']
     
-    structure = session.structure_json
-    
     for i, group in enumerate(groups):
         if i < len(chars):
             groups_form_data.append({
@@ -379,8 +360,8 @@ def session_edit_view(request, pk):
                 'vdot': group.vdot
             })
             
-            # Check if group has a specific structure, otherwise use session structure
-            group_structure = group.structure_json if group.structure_json else structure
+            # Group-specific structure if it has one, otherwise the session's
+            group_structure = group.get_structure()
             
             # Calculate the differentiated plan for this group with prefix
             groups_results.append(_process_and_calculate_group_plan(
@@ -403,11 +384,15 @@ def session_edit_view(request, pk):
         'training_blocks': TrainingBlock.objects.filter(created_by=request.user)
     })
 
+# The planner clones these partials from <template> elements; the endpoints stay
+# for older pages and are static, so browsers may keep them for a day.
 @login_required
+@cache_control(private=True, max_age=60 * 60 * 24)
 def add_workout_segment(request):
     return render(request, 'session_planner/partials/_workout_segment.html')
 
 @login_required
+@cache_control(private=True, max_age=60 * 60 * 24)
 def add_repeat_block(request):
     return render(request, 'session_planner/partials/_repeat_block.html')
 
@@ -415,7 +400,10 @@ def add_repeat_block(request):
 @login_required
 def generate_plan_view(request):
     """Initial generation for all groups"""
-    structure = _extract_workout_structure(request.POST)
+    try:
+        structure = _extract_workout_structure(request.POST)
+    except StructureError as e:
+        return HttpResponse(str(e), status=400)
 
     groups_data = []
     for char in ['a', 'b', 'c']:
@@ -439,9 +427,13 @@ def generate_plan_view(request):
                 except:
                     continue
 
-            groups_data.append(_process_and_calculate_group_plan(name, vdot, structure, prefix=f'group_{char}_'))
+            groups_data.append(get_group_plan(name, vdot, structure, prefix=f'group_{char}_'))
 
-    return render(request, 'session_planner/partials/_differentiated_plan_results.html', {'groups': groups_data})
+    from .track import simulate_track
+    return render(request, 'session_planner/partials/_differentiated_plan_results.html', {
+        'groups': groups_data,
+        'track': simulate_track(groups_data),
+    })
 
 @require_http_methods(["POST"])
 @login_required
@@ -455,8 +447,11 @@ def recalculate_group_plan_view(request):
     prefix = request.POST.get('group_prefix')
     
     # Extract structure using prefix if available
-    structure = _extract_workout_structure(request.POST, prefix=prefix if prefix else '')
-    group_data = _process_and_calculate_group_plan(name, vdot, structure, prefix=prefix)
+    try:
+        structure = _extract_workout_structure(request.POST, prefix=prefix if prefix else '')
+    except StructureError as e:
+        return HttpResponse(str(e), status=400)
+    group_data = get_group_plan(name, vdot, structure, prefix=prefix)
 
     return render(request, 'session_planner/partials/_group_card.html', {
         'group': group_data,
@@ -465,53 +460,112 @@ def recalculate_group_plan_view(request):
 
 @require_http_methods(["POST"])
 @login_required
+def similar_workouts_view(request):
+    """Sessions and block templates most similar to the workout being planned."""
+    from django.db.models import Q
+    from .models import BlockSessionTemplate
+    from .similarity import similar_workouts
+
+    community = request.membership.community
+
+    try:
+        structure = _extract_workout_structure(request.POST)
+    except StructureError as e:
+        return HttpResponse(str(e), status=400)
+
+    sessions = Session.objects.filter(community=community) if community else Session.objects.none()
+    session_id = request.POST.get('session_id')
+    if session_id:
+        sessions = sessions.exclude(id=session_id)
+    visible_blocks = Q(block__created_by=request.user) | Q(block__is_tradeable=True)
+    if community:
+        visible_blocks |= Q(block__community=community)
+    templates = BlockSessionTemplate.objects.filter(visible_blocks)
+    matches = similar_workouts(structure, sessions, templates)
+
+    session_objs = Session.objects.in_bulk([pk for _, kind, pk in matches if kind == 'session'])
+    template_objs = BlockSessionTemplate.objects.select_related('block').in_bulk([pk for _, kind, pk in matches if kind == 'template'])
+    results = []
+    for score, kind, pk in matches:
+        obj = session_objs.get(pk) if kind == 'session' else template_objs.get(pk)
+        if obj:
+            results.append({'kind': kind, 'object': obj, 'similarity': round(score * 100)})
+
+    return render(request, 'session_planner/partials/_similar_workouts.html', {'results': results})
+
+@require_http_methods(["POST"])
+@login_required
+@idempotent
 def save_workout_view(request):
     """Save or update the session and its groups"""
-    from django.db import transaction
-    
-    try:
-        community = request.user.profile.community
-        if not community:
-            return redirect('home')
-    except:
+    community = request.membership.community
+    if not community:
         return redirect('home')
 
     session_id = request.POST.get('session_id')
     title = request.POST.get('title')
     date = request.POST.get('date')
     description = request.POST.get('description', '')
-    base_structure = _extract_workout_structure(request.POST)
-    
+    try:
+        base_structure = _extract_workout_structure(request.POST)
+    except StructureError as e:
+        return HttpResponse(str(e), status=400)
+
+    try:
+        session = _save_workout(request, community, session_id, title, date, description, base_structure)
+    except StructureError as e:
+        return HttpResponse(str(e), status=400)
+    if isinstance(session, HttpResponse):
+        return session
+
+    response = HttpResponse()
+    response['HX-Redirect'] = reverse('session-detail', kwargs={'pk': session.id})
+    return response
+
+def _save_workout(request, community, session_id, title, date, description, base_structure):
+    """Writes the session, its groups and the optional block template in one transaction."""
+    from django.db import transaction
+
     with transaction.atomic():
         if session_id:
             # Update existing session
             session = get_object_or_404(Session, id=session_id)
             # Security check
-            if session.community != community or request.user not in session.community.managers.all():
+            if session.community_id != community.id or not request.membership.is_manager:
                 return HttpResponse("Unauthorized", status=403)
+
+            # Someone else saved since this form was loaded: show them what changed
+            # instead of overwriting it
+            expected_version = posted_version(request.POST)
+            if not claim_version(session, session.version if expected_version is None else expected_version):
+                return _save_conflict_response(request, session, title, date, description, base_structure)
+            ensure_baseline_revision(session)
             
             session.title = title
             session.date = date
             session.description = description
             session.structure_json = base_structure
+            session.structure_version = CURRENT_STRUCTURE_VERSION
             session.save()
             
-            # Map existing group structures to preserve them if not provided in POST
-            existing_group_structures = {g.name: g.structure_json for g in session.groups.all()}
-            
-            # Clear existing groups and recreate
-            session.groups.all().delete()
+            # Groups are updated in place by name, so their ids (and anything
+            # pointing at them, like the detail page's cards) survive an edit
+            existing_groups = {}
+            for group in session.groups.all().order_by('id'):
+                existing_groups.setdefault(group.name, group)
         else:
             session = Session.objects.create(
                 title=title,
                 date=date,
                 description=description,
                 structure_json=base_structure,
+                structure_version=CURRENT_STRUCTURE_VERSION,
                 community=community,
                 creator=request.user
             )
-            existing_group_structures = {}
-        
+            existing_groups = {}
+
+        kept_group_ids = []
         for char in ['a', 'b', 'c']:
             name = request.POST.get(f'group_{char}_name')
             metric = request.POST.get(f'group_{char}_metric')
@@ -537,16 +591,23 @@ def save_workout_view(request):
                 group_prefix = f'group_{char}_'
                 group_structure = _extract_workout_structure(request.POST, prefix=group_prefix)
                 
+                group = existing_groups.pop(name, None)
                 # If group structure is empty, try to preserve existing or fallback to base
                 if not group_structure:
-                    group_structure = existing_group_structures.get(name, base_structure)
+                    if group is None:
+                        group_structure = base_structure
+                    else:
+                        group_structure = group.get_structure() if group.structure_json else group.structure_json
 
-                SessionGroup.objects.create(
-                    session=session,
-                    name=name,
-                    vdot=vdot,
-                    structure_json=group_structure 
-                )
+                if group is None:
+                    group = SessionGroup(session=session, name=name)
+                group.vdot = vdot
+                group.structure_json = group_structure
+                group.structure_version = CURRENT_STRUCTURE_VERSION
+                group.save()
+                kept_group_ids.append(group.id)
+
+        session.groups.exclude(id__in=kept_group_ids).delete()
 
         # --- Save as Training Block Template ---
         if request.POST.get('save_as_template') == 'on':
@@ -555,20 +616,62 @@ def save_workout_view(request):
             if block_id and week_num:
                 block = get_object_or_404(TrainingBlock, id=block_id, created_by=request.user)
                 from .models import BlockSessionTemplate
+                bump_version(TrainingBlock, block.id)
                 BlockSessionTemplate.objects.update_or_create(
                     block=block,
                     week_number=int(week_num),
                     defaults={
                         'title': title,
                         'description': description,
-                        'structure_json': base_structure
+                        'structure_json': base_structure,
+                        'structure_version': CURRENT_STRUCTURE_VERSION
                     }
                 )
 
-    response = HttpResponse()
-    response['HX-Redirect'] = reverse('session-detail', kwargs={'pk': session.id})
+        record_revision(session, author=request.user)
+        transaction.on_commit(partial(render_session_share_cards.enqueue, session.id))
+        transaction.on_commit(partial(publish_session_change, session.id))
+
+    return session
+
+def _save_conflict_response(request, session, title, date, description, structure):
+    """409 listing where the stored session differs from the submitted edit."""
+    session.refresh_from_db()
+    changes = []
+    for label, current, submitted in [
+        ('Title', session.title, title),
+        ('Date', str(session.date), date),
+        ('Description', session.description, description),
+    ]:
+        if current != submitted:
+            changes.append({'field': label, 'current': current, 'submitted': submitted})
+    if session.get_structure() != structure:
+        changes.append({'field': 'Workout', 'current': _structure_summary(session.get_structure()), 'submitted': _structure_summary(structure)})
+
+    response = render(request, 'session_planner/partials/_save_conflict.html', {
+        'session': session,
+        'changes': changes,
+        'groups': session.groups.all().order_by('id'),
+    }, status=409)
+    response['HX-Retarget'] = '#save-conflict'
+    response['HX-Reswap'] = 'innerHTML'
     return response
 
+def _structure_summary(structure):
+    lines = []
+    for item in structure if isinstance(structure, list) else []:
+        if item.get('type') == 'block':
+            lines.append(f"{item['multiplier']} sets of: " + ', '.join(
+                f"{seg['reps']}x{seg['distance']}m {seg['intensity']}" for seg in item['segments']
+            ))
+        elif item.get('type') == 'single':
+            seg = item['segment']
+            lines.append(f"{seg['reps']}x{seg['distance']}m {seg['intensity']} [{seg['rest']}s rest]")
+    return '; '.join(lines)
+
+# How far past the last planned session the timeline shows repeating events
+RECURRING_EVENTS_AHEAD = timedelta(weeks=4)
+
 @login_required
 def session_list_view(request):
     """View to list all upcoming sessions and events in an agenda/timeline format."""
@@ -577,26 +680,28 @@ def session_list_view(request):
     from datetime import timedelta
     from collections import defaultdict
 
-    try:
-        profile = request.user.profile
-    except:
-        return redirect('home')
-        
-    community = profile.community
+    community = request.membership.community
     if not community:
         return redirect('home')
 
     today = timezone.now().date()
-    is_manager = request.user in community.managers.all()
+    is_manager = request.membership.is_manager
 
     # 1. Fetch upcoming Sessions
     sessions = Session.objects.filter(community=community, date__gte=today).order_by('date')
     
-    # 2. Fetch upcoming CalendarEvents
-    event_qs = CalendarEvent.objects.filter(community=community, date__gte=today).order_by('date')
+    # 2. Fetch upcoming CalendarEvents. Repeating events are expanded up to a
+    # little past the last planned session.
+    from communities.recurrence import recurring_occurrences
+    event_qs = CalendarEvent.objects.filter(community=community)
     if not is_manager:
         event_qs = event_qs.filter(is_public=True)
-    events = list(event_qs)
+    last_session = sessions.last()
+    recurring_until = max(last_session.date if last_session else today, today) + RECURRING_EVENTS_AHEAD
+    events = [
+        *event_qs.filter(recurrence='', date__gte=today).order_by('date'),
+        *recurring_occurrences(event_qs, today, recurring_until),
+    ]
 
     # 3. Combine and Sort
     timeline_items = []
@@ -614,7 +719,7 @@ def session_list_view(request):
     next_event = next((item for item in timeline_items if item.item_type == 'event'), None)
     
     # 5. Identify Horizon (Workouts only)
-    horizon_date = sessions.last().date if sessions.exists() else None
+    horizon_date = last_session.date if last_session else None
 
     # 6. Group by Week (Monday-indexed)
     grouped_weeks = defaultdict(list)
@@ -626,8 +731,12 @@ def session_list_view(request):
     # Sort weeks chronologically
     sorted_weeks = sorted(grouped_weeks.items())
 
+    from .ics import make_feed_token
+
     return render(request, 'session_planner/session_list.html', {
         'sorted_weeks': sorted_weeks,
+        'community_feed_token': make_feed_token(community),
+        'member_feed_token': make_feed_token(community, request.user),
         'next_session': next_session,
         'next_event': next_event,
         'horizon_date': horizon_date,
@@ -636,54 +745,700 @@ def session_list_view(request):
         'is_manager': is_manager
     })
 
+SEASON_WEEK_OPTIONS = (12, 26, 52)
+
 @login_required
-def session_detail_view(request, pk):
-    """View to show a single session, ensuring it belongs to user's community."""
+def season_dashboard_view(request):
+    """Weekly sessions, volume and TSS per group across the season, read only from the rollups."""
+    from django.utils import timezone
+    from .models import WeeklyGroupRollup
+    from .rollups import week_start
+
+    community = request.membership.community
+    if not community:
+        return redirect('home')
+    if not request.membership.is_manager:
+        return HttpResponse("Unauthorized", status=403)
+
     try:
-        community = request.user.profile.community
-    except:
+        weeks = int(request.GET.get('weeks', 26))
+    except ValueError:
+        weeks = 26
+    if weeks not in SEASON_WEEK_OPTIONS:
+        weeks = 26
+    this_week = week_start(timezone.now().date())
+    start = this_week - timedelta(weeks=weeks - 1)
+
+    rollups = list(WeeklyGroupRollup.objects.filter(community=community, week_start__gte=start))
+    group_names = sorted({row.group_name for row in rollups})
+    by_week = {}
+    for row in rollups:
+        by_week.setdefault(row.week_start, {})[row.group_name] = row
+    max_tss = max((row.tss for row in rollups), default=0) or 1
+
+    # Every week in range is shown, including empty ones and planned weeks ahead
+    last_week = max([this_week, *by_week])
+    season = []
+    monday = start
+    while monday <= last_week:
+        rows = by_week.get(monday, {})
+        season.append({
+            'week_start': monday,
+            'is_future': monday > this_week,
+            'groups': [
+                {'name': name, 'row': rows.get(name), 'bar': round(rows[name].tss / max_tss * 100) if name in rows else 0}
+                for name in group_names
+            ],
+        })
+        monday += timedelta(weeks=1)
+
+    return render(request, 'session_planner/season_dashboard.html', {
+        'community': community,
+        'season': season,
+        'group_names': group_names,
+        'weeks': weeks,
+        'week_options': SEASON_WEEK_OPTIONS,
+    })
+
+@login_required
+def month_calendar_view(request, year=None, month=None):
+    """Month grid of the community's sessions and events, one month per request."""
+    from django.utils import timezone
+    from django.utils.cache import patch_cache_control, patch_vary_headers
+    from django.utils.safestring import mark_safe
+    from .month_calendar import render_month
+
+    community = request.membership.community
+    if not community:
         return redirect('home')
 
+    if year is None:
+        today = timezone.now().date()
+        year, month = today.year, today.month
+    if not 1 <= month <= 12 or not 1 <= year <= 9999:
+        return HttpResponse("Invalid month", status=404)
+
+    is_manager = request.membership.is_manager
+    month_grid = mark_safe(render_month(community, year, month, is_manager))
+
+    if request.headers.get('HX-Request'):
+        response = HttpResponse(month_grid)
+    else:
+        response = render(request, 'session_planner/month_calendar.html', {
+            'community': community,
+            'month_grid': month_grid,
+        })
+    # Adjacent months are prefetched by the grid, so let the browser reuse them briefly
+    patch_vary_headers(response, ['HX-Request'])
+    patch_cache_control(response, private=True, max_age=60)
+    return response
+
+@login_required
+def session_history_view(request):
+    """Past sessions of the member's community, filterable by segment distance and zone."""
+    from django.utils import timezone
+
+    community = request.membership.community
     if not community:
         return redirect('home')
-        
-    session = get_object_or_404(Session, pk=pk, community=community)
+
+    try:
+        months = max(1, min(int(request.GET.get('months', 3)), 24))
+    except ValueError:
+        months = 3
+    today = timezone.now().date()
+    since = today - timedelta(days=months * 30)
+
+    segment_filter = _segment_filter_params(request.GET)
+    sessions = Session.objects.filter(community=community, date__gte=since, date__lte=today)
+    sessions = list(filter_by_segment(sessions, segment_filter['distance'], segment_filter['intensity']))
+    # Older sessions may have been archived; their index rows moved with them
+    archived = ArchivedSession.objects.filter(community=community, date__gte=since, date__lte=today)
+    sessions += filter_by_segment(archived, segment_filter['distance'], segment_filter['intensity'])
+    sessions.sort(key=lambda session: session.date, reverse=True)
+
+    return render(request, 'session_planner/session_history.html', {
+        'community': community,
+        'sessions': sessions,
+        'segment_filter': segment_filter,
+        'months': months,
+        'month_options': (1, 3, 6, 12),
+        'distances': TRACK_DISTANCES,
+        'zones': list(TRAINING_ZONES),
+    })
+
+def calendar_feed_view(request, token):
+    """
+    iCalendar subscription feed for a community, or for one member of it.
+    Calendar clients can't log in, so access is granted by the signed token in the URL.
+    """
+    from communities.models import Community
+    from django.utils.cache import get_conditional_response, patch_cache_control
+    from .ics import get_feed, read_feed_token
+
+    claims = read_feed_token(token)
+    if not claims:
+        return HttpResponse("Invalid feed", status=404)
+    community_id, user_id = claims
+    community = get_object_or_404(Community, id=community_id)
+
+    training_group = ''
+    if user_id:
+        profile = community.members.filter(user_id=user_id).first()
+        if not profile:
+            return HttpResponse("Invalid feed", status=404)
+        training_group = profile.training_group
+
+    body, etag = get_feed(community, training_group=training_group)
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type='text/calendar; charset=utf-8')
+        response['Content-Disposition'] = f'inline; filename="{community.slug}.ics"'
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=900)
+    return response
+
+@login_required
+def session_detail_view(request, pk):
+    """View to show a single session, ensuring it belongs to user's community."""
+    from django.conf import settings
+    from django.utils import timezone
+
+    community = request.membership.community
+
+    if not community:
+        return redirect('home')
+
+    session = Session.objects.filter(pk=pk, community=community).first()
+    if session is None:
+        # Links to sessions that have since been archived keep working
+        get_object_or_404(ArchivedSession, original_id=pk, community=community)
+        return redirect('archived-session', pk=pk)
     
     # Check if user is community manager for edit permissions
-    is_manager = request.user in community.managers.all()
+    is_manager = request.membership.is_manager
+
+    from .cards import group_whatsapp_text, session_group_plans, session_whatsapp_text
+    from .plans import group_for_training_group
+
+    groups = list(session.groups.all().order_by('id'))
+    share_cards = _current_share_cards(session, groups)
+    plans = None
+    if share_cards is None:
+        # Until the background render catches up the share text is built inline,
+        # which needs every plan anyway
+        plans = session_group_plans(session, groups)
+        share_cards = {
+            'image_url': None,
+            'text': session_whatsapp_text(session, plans),
+            'groups': [{'image_url': None, 'text': group_whatsapp_text(plan)} for plan in plans],
+        }
+
+    # Only the member's own group is calculated up front; the other cards are
+    # fetched by session_group_card_view as they scroll into view
+    own_group = group_for_training_group(groups, request.user.profile.training_group)
+    group_cards = []
+    for group, share_card in zip(groups, share_cards['groups']):
+        plan = None
+        if plans is not None:
+            plan = plans[len(group_cards)]
+        elif group == own_group:
+            plan = get_group_plan(group.name, group.vdot, group.get_structure())
+        if plan is not None:
+            plan['share_card'] = share_card
+        card = {'id': group.id, 'name': group.name, 'vdot': round(group.vdot, 2), 'plan': plan}
+        if group == own_group:
+            group_cards.insert(0, card)
+        else:
+            group_cards.append(card)
 
-    groups_data = []
-    for group in session.groups.all():
-        groups_data.append(_process_and_calculate_group_plan(group.name, group.vdot, group.get_structure()))
-        
     return render(request, 'session_planner/session_detail.html', {
         'session': session,
-        'groups': groups_data,
-        'is_manager': is_manager
+        'group_cards': group_cards,
+        'share_cards': share_cards,
+        'is_manager': is_manager,
+        'completion': session.completions.filter(user=request.user).first(),
+        'has_happened': session.date <= timezone.now().date(),
+        'activity_uploads': session.activity_uploads.filter(user=request.user),
+        'live_updates': settings.LIVE_SESSION_UPDATES,
+    })
+
+@login_required
+def complete_session_view(request, pk):
+    """Marks a session as run by the member, with the group they ran it with."""
+    from django.utils import timezone
+    from .models import CompletedSession
+    from .plans import group_for_training_group
+
+    if request.method != 'POST':
+        return HttpResponse("Method not allowed", status=405)
+    community = request.membership.community
+    session = get_object_or_404(Session, pk=pk, community=community)
+    if session.date > timezone.now().date():
+        return HttpResponse("This session hasn't happened yet", status=400)
+    # A repeated submit leaves the existing record alone
+    if session.completions.filter(user=request.user).exists():
+        return redirect('session-detail', pk=pk)
+
+    groups = list(session.groups.all())
+    group = None
+    if request.POST.get('group_id'):
+        group = next((g for g in groups if str(g.id) == request.POST['group_id']), None)
+    group = group or group_for_training_group(groups, request.user.profile.training_group)
+    if group is None:
+        return HttpResponse("Pick the group you ran with", status=400)
+
+    plan = get_group_plan(group.name, group.vdot, group.get_structure())
+    CompletedSession.objects.get_or_create(user=request.user, session=session, defaults={
+        'date': session.date, 'group_name': group.name, 'tss': plan['summary']['tss'],
+    })
+    return redirect('session-detail', pk=pk)
+
+@login_required
+def uncomplete_session_view(request, pk):
+    """Removes the member's record of having run a session."""
+    if request.method != 'POST':
+        return HttpResponse("Method not allowed", status=405)
+    community = request.membership.community
+    session = get_object_or_404(Session, pk=pk, community=community)
+    for completion in session.completions.filter(user=request.user):
+        # Deleted one by one so the fitness signals see it
+        completion.delete()
+    return redirect('session-detail', pk=pk)
+
+def _activity_upload(user, session, group, uploaded_file):
+    """Checks an uploaded activity file and stores it for processing."""
+    from .activity import MAX_ACTIVITY_BYTES, ActivityError, activity_format
+    from .models import ActivityUpload
+
+    if uploaded_file.size > MAX_ACTIVITY_BYTES:
+        raise ActivityError(f"{uploaded_file.name} is too large")
+    fmt = activity_format(uploaded_file.name)
+    return ActivityUpload.objects.create(
+        user=user, session=session, group=group, file=uploaded_file, format=fmt,
+        group_name=group.name, vdot=group.vdot, structure_json=group.get_structure(),
+    )
+
+@login_required
+def upload_activity_view(request, pk):
+    """Uploads the member's recording of a session to compare with the group's plan."""
+    from .activity import ActivityError
+    from .plans import group_for_training_group
+    from .tasks import process_activity_uploads
+
+    if request.method != 'POST':
+        return HttpResponse("Method not allowed", status=405)
+    community = request.membership.community
+    session = get_object_or_404(Session, pk=pk, community=community)
+    groups = list(session.groups.all())
+    group = next((g for g in groups if str(g.id) == request.POST.get('group_id')), None)
+    group = group or group_for_training_group(groups, request.user.profile.training_group)
+    if group is None or 'activity' not in request.FILES:
+        return HttpResponse("Pick a file and the group you ran with", status=400)
+
+    try:
+        upload = _activity_upload(request.user, session, group, request.FILES['activity'])
+    except ActivityError as e:
+        return HttpResponse(str(e), status=400)
+    process_activity_uploads.enqueue([upload.id])
+    return redirect('activity-detail', pk=upload.id)
+
+@login_required
+def bulk_upload_activities_view(request, pk):
+    """
+    Lets a manager upload a whole group's recordings at once. Each file is named
+    after the member who ran it (e.g. jane.gpx) and they are processed in the
+    background.
+    """
+    from django.contrib import messages
+    from django.contrib.auth.models import User
+    from .activity import MAX_BULK_ACTIVITIES, ActivityError
+    from .tasks import process_activity_uploads
+
+    if request.method != 'POST':
+        return HttpResponse("Method not allowed", status=405)
+    community = request.membership.community
+    if not community or not request.membership.is_manager:
+        return HttpResponse("Unauthorized", status=403)
+    session = get_object_or_404(Session, pk=pk, community=community)
+    group = get_object_or_404(session.groups, pk=request.POST.get('group_id'))
+
+    files = request.FILES.getlist('activities')
+    if len(files) > MAX_BULK_ACTIVITIES:
+        messages.error(request, f"Upload at most {MAX_BULK_ACTIVITIES} activities at a time.")
+        return redirect('session-detail', pk=pk)
+    members = {
+        user.username.lower(): user
+        for user in User.objects.filter(profile__community=community)
+    }
+    upload_ids, skipped = [], []
+    for uploaded_file in files:
+        member = members.get(uploaded_file.name.rsplit('.', 1)[0].lower())
+        if member is None:
+            skipped.append(uploaded_file.name)
+            continue
+        try:
+            upload_ids.append(_activity_upload(member, session, group, uploaded_file).id)
+        except ActivityError:
+            skipped.append(uploaded_file.name)
+
+    if upload_ids:
+        process_activity_uploads.enqueue(upload_ids)
+        messages.success(request, f"{len(upload_ids)} activities uploaded for {group.name}.")
+    if skipped:
+        messages.error(request, f"Skipped (not a member's name or not an activity file): {', '.join(skipped)}")
+    return redirect('session-detail', pk=pk)
+
+@login_required
+def activity_detail_view(request, pk):
+    """An uploaded activity's reps next to the paces they were planned at."""
+    from .models import ActivityUpload
+
+    upload = get_object_or_404(ActivityUpload.objects.select_related('session__community', 'user'), pk=pk)
+    if upload.user != request.user:
+        community = upload.session.community if upload.session else None
+        if not request.membership.manages(community):
+            return HttpResponse("Unauthorized", status=403)
+    return render(request, 'session_planner/activity_detail.html', {'upload': upload})
+
+def _check_in_response(request, session, done=False, error=None, status=200):
+    from .checkins import attendance_count
+
+    return render(request, 'session_planner/check_in.html', {
+        'session': session,
+        'done': done,
+        'error': error,
+        'count': attendance_count(session.id) if done else None,
+    }, status=status)
+
+@login_required
+def check_in_view(request, token):
+    """Checks a member in to the session whose QR code they scanned."""
+    from .checkins import check_in, read_checkin_token
+
+    session_id = read_checkin_token(token)
+    if session_id is None:
+        return _check_in_response(request, None, error="This check-in code has expired.", status=404)
+    session = get_object_or_404(Session, pk=session_id)
+    community = request.membership.community
+    if community is None or community.id != session.community_id:
+        return _check_in_response(request, session, error="This session is for another community.", status=403)
+
+    if request.method == 'POST':
+        check_in(session, request.user)
+        return _check_in_response(request, session, done=True)
+    return _check_in_response(request, session)
+
+@login_required
+def join_code_check_in_view(request):
+    """Checks a member in to today's session with the community join code given out at the track."""
+    from communities.models import Community
+    from django.utils import timezone
+    from .checkins import check_in
+
+    if request.method != 'POST':
+        return _check_in_response(request, None)
+
+    community = Community.objects.filter(join_code__iexact=request.POST.get('join_code', '').strip()).first()
+    if community is None or community.id != request.membership.community_id:
+        return _check_in_response(request, None, error="That isn't your community's code.", status=400)
+    session = Session.objects.filter(community=community, date=timezone.now().date()).order_by('id').first()
+    if session is None:
+        return _check_in_response(request, None, error="There is no session today.", status=404)
+    check_in(session, request.user)
+    return _check_in_response(request, session, done=True)
+
+@login_required
+def check_in_board_view(request, pk):
+    """The QR code and join code managers put up at the track, with the live attendance."""
+    import qrcode
+    import qrcode.image.svg
+    from django.utils.safestring import mark_safe
+    from .checkins import attendance_count, make_checkin_token
+
+    community = request.membership.community
+    if not community or not request.membership.is_manager:
+        return HttpResponse("Unauthorized", status=403)
+    session = get_object_or_404(Session, pk=pk, community=community)
+
+    url = request.build_absolute_uri(reverse('check-in', kwargs={'token': make_checkin_token(session)}))
+    qr = qrcode.make(url, image_factory=qrcode.image.svg.SvgPathImage, box_size=20)
+    return render(request, 'session_planner/check_in_board.html', {
+        'session': session,
+        'community': community,
+        'check_in_url': url,
+        'qr_svg': mark_safe(qr.to_string(encoding='unicode')),
+        'count': attendance_count(session.id),
+    })
+
+@login_required
+def attendance_count_view(request, pk):
+    """Polled by the check-in board. Served from the cache, see session_planner.checkins."""
+    from .checkins import attendance_count
+
+    community = request.membership.community
+    if not community or not request.membership.is_manager:
+        return HttpResponse("Unauthorized", status=403)
+    get_object_or_404(Session, pk=pk, community=community)
+    return HttpResponse(str(attendance_count(pk)))
+
+@login_required
+def club_fitness_view(request):
+    """Managers' list of members whose training load has run well ahead of their fitness."""
+    from .fitness import OVERREACHING_TSB, overreaching_runners
+
+    community = request.membership.community
+    if not community:
+        return redirect('home')
+    if not request.membership.is_manager:
+        return HttpResponse("Unauthorized", status=403)
+
+    return render(request, 'session_planner/club_fitness.html', {
+        'community': community,
+        'runners': overreaching_runners(community),
+        'threshold': OVERREACHING_TSB,
+    })
+
+@login_required
+def archived_session_view(request, pk):
+    """A read-only view of an archived session, by the id it had before archiving."""
+    from .cards import group_whatsapp_text
+
+    community = request.membership.community
+
+    session = get_object_or_404(ArchivedSession, original_id=pk, community=community)
+    groups = []
+    for group in session.groups:
+        plan = get_group_plan(group['name'], group['vdot'], session.get_group_structure(group))
+        plan['share_card'] = {'image_url': None, 'text': group_whatsapp_text(plan)}
+        groups.append(plan)
+
+    return render(request, 'session_planner/archived_session.html', {
+        'session': session,
+        'groups': groups,
+    })
+
+@login_required
+def session_group_card_view(request, pk, group_id):
+    """One calculated group card of the session detail page."""
+    community = request.membership.community
+
+    session = get_object_or_404(Session, pk=pk, community=community)
+    groups = list(session.groups.all().order_by('id'))
+    index = next((i for i, group in enumerate(groups) if group.id == group_id), None)
+    if index is None:
+        return HttpResponse("Not found", status=404)
+
+    return render(request, 'session_planner/partials/_session_group_card.html', {
+        'session': session,
+        'group': _group_card_plan(groups, index, _current_share_cards(session, groups)),
+        'group_id': group_id,
+    })
+
+def _group_card_plan(groups, index, share_cards):
+    """A group's calculated plan with the share card its detail card links to."""
+    group = groups[index]
+    plan = get_group_plan(group.name, group.vdot, group.get_structure())
+    if share_cards:
+        plan['share_card'] = share_cards['groups'][index]
+    else:
+        from .cards import group_whatsapp_text
+        plan['share_card'] = {'image_url': None, 'text': group_whatsapp_text(plan)}
+    return plan
+
+def session_channel(session_id):
+    return f'session:{session_id}'
+
+def _session_change_event(session_id):
+    """The 'session-changed' payload: the session's version and every group card, rendered."""
+    from django.template.loader import render_to_string
+
+    session = Session.objects.filter(pk=session_id).first()
+    if session is None:
+        return None
+    groups = list(session.groups.all().order_by('id'))
+    share_cards = _current_share_cards(session, groups)
+    return {
+        'version': session.version,
+        'title': session.title,
+        'groups': [
+            {
+                'id': group.id,
+                'html': render_to_string('session_planner/partials/_session_group_card.html', {
+                    'session': session,
+                    'group': _group_card_plan(groups, index, share_cards),
+                    'group_id': group.id,
+                }),
+            }
+            for index, group in enumerate(groups)
+        ],
+    }
+
+def publish_session_change(session_id):
+    """
+    Tells viewers of a session's detail page that it changed, with every group
+    card re-rendered once here rather than fetched again by each viewer.
+    """
+    from .live import publish, subscriber_count
+
+    channel = session_channel(session_id)
+    if not subscriber_count(channel):
+        return
+    data = _session_change_event(session_id)
+    if data is not None:
+        publish(channel, 'session-changed', data)
+
+@login_required
+async def session_events_view(request, pk):
+    """Server-sent events stream of changes to a session, for its detail page."""
+    from asgiref.sync import sync_to_async
+    from django.conf import settings
+    from django.core.handlers.asgi import ASGIRequest
+    from django.http import StreamingHttpResponse
+    from .live import EventStream, format_event
+
+    # A WSGI server would hold a worker for as long as the stream stays open;
+    # 204 tells the browser's EventSource not to reconnect
+    if not settings.LIVE_SESSION_UPDATES or not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    community_id = await sync_to_async(lambda: request.membership.community_id)()
+    versions = Session.objects.filter(pk=pk, community_id=community_id).values_list('version', flat=True)
+    seen = await versions.afirst()
+    if seen is None:
+        return HttpResponse("Not found", status=404)
+
+    async def poll():
+        # Saves handled by another worker process are only published there
+        nonlocal seen
+        current = await versions.afirst()
+        if current is None or current == seen:
+            return None
+        seen = current
+        data = await sync_to_async(_session_change_event)(pk)
+        return format_event('session-changed', data) if data else None
+
+    response = StreamingHttpResponse(EventStream(session_channel(pk), poll), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def _current_share_cards(session, groups):
+    """The stored share cards with storage URLs, or None if they are out of date."""
+    from django.core.files.storage import default_storage
+    from .cards import share_cards_source_hash
+
+    share_cards = session.share_cards
+    if not share_cards or not groups or share_cards.get('source') != share_cards_source_hash(session, groups):
+        return None
+    return {
+        'image_url': default_storage.url(share_cards['image']),
+        'text': share_cards['text'],
+        'groups': [
+            {'image_url': default_storage.url(g['image']), 'text': g['text']} for g in share_cards['groups']
+        ],
+    }
+
+
+def _managed_session(request, pk):
+    """The session if the user manages its community, otherwise None."""
+    community = request.membership.community
+    if not community or not request.membership.is_manager:
+        return None
+    return Session.objects.filter(pk=pk, community=community).first()
+
+@login_required
+def session_revisions_view(request, pk):
+    """Edit history of a session, newest first."""
+    from .revisions import changed_fields
+
+    session = _managed_session(request, pk)
+    if session is None:
+        return HttpResponse("Unauthorized", status=403)
+
+    revisions = list(session.revisions.select_related('author'))
+    for revision in revisions:
+        revision.changed_fields = changed_fields(revision)
+    return render(request, 'session_planner/session_revisions.html', {
+        'session': session,
+        'revisions': revisions,
     })
 
+@login_required
+def session_revision_view(request, pk, number):
+    """A past revision of a session, rebuilt from its snapshot and patches."""
+    from .models import SessionRevision
+    from .revisions import restore_revision, revision_document
+
+    session = _managed_session(request, pk)
+    if session is None:
+        return HttpResponse("Unauthorized", status=403)
+    revision = get_object_or_404(SessionRevision, session=session, number=number)
+
+    conflict = False
+    if request.method == 'POST':
+        from django.db import transaction
+        if restore_revision(session, number, author=request.user, expected_version=posted_version(request.POST)):
+            transaction.on_commit(partial(render_session_share_cards.enqueue, session.id))
+            transaction.on_commit(partial(publish_session_change, session.id))
+            return redirect('session-detail', pk=session.id)
+        # Saved by someone else since this page was loaded; show it again before restoring over them
+        conflict = True
+        session.refresh_from_db()
+
+    document = revision_document(session, number)
+    return render(request, 'session_planner/session_revision.html', {
+        'session': session,
+        'revision': revision,
+        'document': document,
+        'structure_summary': _structure_summary(document['structure']),
+        'groups': [
+            {**group, 'structure_summary': _structure_summary(group['structure']) if group['structure'] else ''}
+            for group in document['groups']
+        ],
+        'is_latest': not session.revisions.filter(number__gt=number).exists(),
+        'conflict': conflict,
+    }, status=409 if conflict else 200)
 
 @login_required
 def edit_training_block_view(request, block_id):
     block = get_object_or_404(TrainingBlock, id=block_id, created_by=request.user)
     
+    conflict = False
     if request.method == 'POST':
-        if request.POST.get('update_details') == 'true':
-            block.is_tradeable = request.POST.get('is_tradeable') == 'on'
-            block.save()
-            return redirect('edit-block', block_id=block.id)
-
-        template_order = request.POST.get('template_order')
-        if template_order:
-            template_ids = [int(tid) for tid in template_order.split(',') if tid.strip().isdigit()]
-            for index, tid in enumerate(template_ids):
-                # Update week_number based on 1-indexed position
-                from .models import BlockSessionTemplate
-                BlockSessionTemplate.objects.filter(id=tid, block=block).update(week_number=index + 1)
-        return redirect('block-list')
-        
+        from django.db import transaction
+        expected_version = posted_version(request.POST)
+        with transaction.atomic():
+            if claim_version(block, block.version if expected_version is None else expected_version):
+                if request.POST.get('update_details') == 'true':
+                    block.is_tradeable = request.POST.get('is_tradeable') == 'on'
+                    block.save()
+                    return redirect('edit-block', block_id=block.id)
+
+                template_order = request.POST.get('template_order')
+                if template_order:
+                    template_ids = [int(tid) for tid in template_order.split(',') if tid.strip().isdigit()]
+                    for index, tid in enumerate(template_ids):
+                        # Update week_number based on 1-indexed position
+                        from .models import BlockSessionTemplate
+                        BlockSessionTemplate.objects.filter(id=tid, block=block).update(week_number=index + 1)
+                return redirect('block-list')
+
+        # The block changed since the page was loaded; show the current state instead
+        conflict = True
+        block.refresh_from_db()
+
     templates = block.templates.all().order_by('week_number')
+
+    community = block.community
+    if not community:
+        community = request.membership.community
+    projection = get_block_projection(block, community_group_vdots(community), templates=templates)
+
     return render(request, 'session_planner/block_edit.html', {
         'training_block': block,
-        'templates': templates
-    })
+        'templates': templates,
+        'projection': projection,
+        'conflict': conflict,
+    }, status=409 if conflict else 200)
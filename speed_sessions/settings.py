@@ -37,6 +37,10 @@ ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', '127.0.0.1').split(',')
 if IS_VERCEL:
     ALLOWED_HOSTS.append('.vercel.app')
 
+# Absolute links built outside a request (calendar feeds, emails), so they
+# don't depend on whoever happened to trigger a cached rendering
+SITE_URL = os.getenv("SITE_URL", f"https://{ALLOWED_HOSTS[0]}").rstrip('/')
+
 if IS_VERCEL:
     # Vercel handles SSL termination at the proxy level
     SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
@@ -74,6 +78,7 @@ INSTALLED_APPS = [
     'merch.apps.MerchConfig',
     'djstripe',
     'anymail',
+    'django_tasks_db',
 ]
 
 STRIPE_LIVE_PUBLIC_KEY = os.getenv("STRIPE_LIVE_PUBLIC_KEY", "")
@@ -92,6 +97,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'communities.membership.MembershipMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
@@ -272,3 +278,53 @@ if os.getenv("RESEND_API_KEY"):
 else:
     EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
     DEFAULT_FROM_EMAIL = "noreply@runtrash.com"
+
+# The cache holds state every worker has to agree on (schedule versions,
+# membership versions, attendance counts), so it must be shared between
+# processes: Redis when REDIS_URL is set, otherwise a table in the main
+# database (created by `manage.py createcachetable`).
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "django_cache",
+            # Month grids are cached per community, role and month; the default
+            # of 300 entries would keep culling them (and schedule versions)
+            "OPTIONS": {"MAX_ENTRIES": 20000},
+        }
+    }
+
+# Live updates on session detail pages hold a server-sent events connection
+# open per viewer, which only an ASGI server can afford (the Dockerfile runs
+# uvicorn workers and sets this). Under WSGI, as on Vercel or runserver, the
+# page doesn't open the stream.
+LIVE_SESSION_UPDATES = os.getenv("LIVE_SESSION_UPDATES", "False").lower() == "true"
+
+# Background tasks (share card rendering, activity parsing, reminder emails)
+# are stored in the database and run by a separate `manage.py db_worker`
+# process. Vercel has nowhere to run a worker, so there they run inline, in the
+# request or command that enqueued them.
+if IS_VERCEL:
+    TASKS = {"default": {"BACKEND": "django.tasks.backends.immediate.ImmediateBackend"}}
+else:
+    TASKS = {"default": {"BACKEND": "django_tasks_db.DatabaseBackend"}}
+
+# Archival: sessions and calendar events older than this, and delivered merch
+# orders, are moved to archive tables by the archive_schedule and archive_orders
+# commands
+ARCHIVE_SESSIONS_AFTER_DAYS = int(os.getenv("ARCHIVE_SESSIONS_AFTER_DAYS", 365))
+ARCHIVE_BATCH_SIZE = 500
+
+# Session reminder digests, sent the day before by the send_session_reminders
+# command. Members getting the same digest are sent it in batches of up to
+# REMINDER_BATCH_SIZE (one Resend batch API call each, whose limit is 100),
+# making no more calls per second than the mail provider's rate limit allows.
+REMINDER_BATCH_SIZE = 100
+REMINDER_CALLS_PER_SECOND = float(os.getenv("REMINDER_CALLS_PER_SECOND", 2))
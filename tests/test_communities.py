@@ -76,3 +76,120 @@ def test_community_detail_view_permissions(client):
     assert response.status_code == 200
     assert b"Next Scheduled Workout" in response.content
     assert b"A&#x27;s Open Session" in response.content
+
+
+@pytest.mark.django_db
+def test_recurring_event_occurrences_and_exceptions():
+    """A repeating event is one row expanded per window, with cancelled dates left out."""
+    from communities.models import CalendarEvent, CalendarEventException
+    from communities.recurrence import events_between, occurrence_dates
+
+    community = Community.objects.create(name="Club Runs")
+    club_run = CalendarEvent.objects.create(
+        community=community, title="Club Run", date=date(2026, 9, 2), recurrence=CalendarEvent.WEEKLY,
+        recurrence_until=date(2026, 9, 30), is_public=True,
+    )
+    CalendarEvent.objects.create(community=community, title="Social", date=date(2026, 9, 12), is_public=True)
+    CalendarEventException.objects.create(event=club_run, date=date(2026, 9, 16))
+    CalendarEventException.objects.create(event=club_run, date=date(2026, 9, 23), cancelled=False, title="Club Run (hills)")
+
+    events = events_between(community.calendar_events.all(), date(2026, 9, 5), date(2026, 12, 31))
+    assert [(e.date, e.title) for e in events] == [
+        (date(2026, 9, 9), "Club Run"),
+        (date(2026, 9, 12), "Social"),
+        (date(2026, 9, 23), "Club Run (hills)"),
+        (date(2026, 9, 30), "Club Run"),
+    ]
+
+    monthly = CalendarEvent(date=date(2026, 1, 31), recurrence=CalendarEvent.MONTHLY)
+    assert list(occurrence_dates(monthly, date(2026, 2, 1), date(2026, 5, 31))) == [date(2026, 3, 31), date(2026, 5, 31)]
+
+
+@pytest.mark.django_db
+def test_recurring_events_in_timeline_month_and_feed(logged_in_client, user_profile, community):
+    """The timeline, month view and ICS feed all show the occurrences; managers can skip one."""
+    from datetime import timedelta
+    from django.utils import timezone
+    from communities.models import CalendarEvent
+    from session_planner.ics import make_feed_token
+
+    today = timezone.now().date()
+    event = CalendarEvent.objects.create(
+        community=community, title="Parkrun Social", date=today - timedelta(days=14),
+        recurrence=CalendarEvent.WEEKLY, is_public=True,
+    )
+
+    response = logged_in_client.get(reverse('session-list'))
+    dates = [item.date for _, items in response.context['sorted_weeks'] for item in items]
+    assert dates == [today + timedelta(days=7 * week) for week in range(5)]
+
+    month = logged_in_client.get(reverse('month-calendar'))
+    assert month.content.count(b"Parkrun Social") >= 4
+
+    feed = logged_in_client.get(reverse('calendar-feed', args=[make_feed_token(community)]))
+    assert f"UID:event-{event.id}-{today:%Y%m%d}@runtrash.com".encode() in feed.content
+
+    skipped = today + timedelta(days=7)
+    logged_in_client.post(reverse('cancel-event-occurrence', args=[community.slug, event.id, f"{skipped:%Y-%m-%d}"]))
+    response = logged_in_client.get(reverse('session-list'))
+    dates = [item.date for _, items in response.context['sorted_weeks'] for item in items]
+    assert skipped not in dates and today in dates
+
+
+@pytest.mark.django_db
+def test_shift_moves_repeating_events_that_start_after_it(logged_in_client, user_profile, community):
+    from communities.models import CalendarEvent, CalendarEventException
+
+    running = CalendarEvent.objects.create(community=community, title="Club Run", date=date(2026, 9, 2), recurrence=CalendarEvent.WEEKLY)
+    upcoming = CalendarEvent.objects.create(
+        community=community, title="Track Block", date=date(2026, 10, 6), recurrence=CalendarEvent.WEEKLY,
+        recurrence_until=date(2026, 10, 27),
+    )
+    CalendarEventException.objects.create(event=upcoming, date=date(2026, 10, 13))
+    CalendarEventException.objects.create(event=upcoming, date=date(2026, 10, 20))
+
+    logged_in_client.post(reverse('shift-schedule'), {'start_date': '2026-10-01', 'shift_days': '7'})
+
+    running.refresh_from_db()
+    upcoming.refresh_from_db()
+    assert running.date == date(2026, 9, 2)
+    assert (upcoming.date, upcoming.recurrence_until) == (date(2026, 10, 13), date(2026, 11, 3))
+    assert list(upcoming.exceptions.values_list('date', flat=True)) == [date(2026, 10, 20), date(2026, 10, 27)]
+
+@pytest.mark.django_db
+def test_membership_is_cached_in_the_session_until_it_changes(logged_in_client, test_user, user_profile, community):
+    """Roles come from the session between changes, and a demotion or move is seen on the next request."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    url = reverse('community-detail', args=[community.slug])
+    response = logged_in_client.get(url)
+    assert response.context['is_manager'] and response.context['is_member']
+    assert reverse('manage-orders', args=[community.slug]).encode() in response.content
+
+    with CaptureQueriesContext(connection) as queries:
+        assert logged_in_client.get(reverse('season-dashboard')).status_code == 200
+    assert not [q for q in queries.captured_queries if 'communities_community_managers' in q['sql']]
+    assert not [q for q in queries.captured_queries if 'communities_userprofile' in q['sql']]
+
+    community.managers.remove(test_user)
+    response = logged_in_client.get(url)
+    assert not response.context['is_manager'] and response.context['is_member']
+    assert logged_in_client.get(reverse('season-dashboard')).status_code == 403
+
+    other = Community.objects.create(name="Other Club")
+    other.managers.add(test_user)
+    user_profile.community = other
+    user_profile.save()
+    response = logged_in_client.get(url)
+    assert not response.context['is_member'] and response.context['is_visitor_manager']
+
+@pytest.mark.django_db
+def test_membership_version_is_dropped_again_on_commit(test_user, community, django_capture_on_commit_callbacks):
+    """A request that resolves the membership before the change commits can't keep the old role."""
+    from communities.membership import _get_version
+
+    with django_capture_on_commit_callbacks(execute=True):
+        community.managers.remove(test_user)
+        during = _get_version(test_user.id)
+    assert _get_version(test_user.id) != during
@@ -238,3 +238,17 @@ def test_save_workout_as_block_template(logged_in_client, test_user, community,
     template = BlockSessionTemplate.objects.get(block=block, week_number=5)
     assert template.title == 'Template Workout'
     assert template.structure_json[0]['segment']['reps'] == 8
+
+@pytest.mark.django_db
+def test_apply_block_replays_repeated_idempotency_key(logged_in_client, test_user, community, user_profile):
+    """A double-submitted schedule form only creates the sessions once."""
+    block = TrainingBlock.objects.create(title="Base", target_distance="10k", created_by=test_user)
+    BlockSessionTemplate.objects.create(block=block, week_number=1, title="Week 1 Hills", structure_json=[])
+    data = {'block_id': block.id, 'start_date': "2025-03-03", 'idempotency_key': 'double-tap'}
+
+    first = logged_in_client.post(reverse('apply-block-to-calendar'), data)
+    second = logged_in_client.post(reverse('apply-block-to-calendar'), data)
+
+    assert second.content == first.content
+    assert second['Idempotent-Replay'] == 'true'
+    assert Session.objects.filter(community=community, title="Week 1 Hills").count() == 1
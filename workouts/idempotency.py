@@ -0,0 +1,114 @@
+"""
+Idempotency keys for form submissions. Forms carry a one-off key (see the
+idempotency_key template tag); the first POST with a key runs the view and its
+response is stored, and any repeat of that key, such as a double-tap or a retry
+from a flaky connection, gets the stored response back without running it again.
+Keys are rows of IdempotencyKey, so the unique constraint decides which request
+runs, whichever worker each one lands on.
+"""
+import time
+import uuid
+from datetime import timedelta
+from functools import wraps
+
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_FIELD = 'idempotency_key'
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_TTL = 60 * 60 * 24
+# How long a repeat waits for the first request to finish before giving up
+IDEMPOTENCY_WAIT_S = 10
+IDEMPOTENCY_POLL_S = 0.1
+
+
+def new_idempotency_key():
+    return uuid.uuid4().hex
+
+
+def _request_key(request):
+    key = request.POST.get(IDEMPOTENCY_FIELD) or request.headers.get(IDEMPOTENCY_HEADER)
+    if not key or len(key) > 64:
+        return None
+    if request.user.is_authenticated:
+        owner = f'u{request.user.pk}'
+    else:
+        owner = f's{request.session.session_key or ""}'
+    return f'idempotency:{owner}:{request.path}:{key}'
+
+
+def _claim(key):
+    """Inserts the key's row. True for the one request that gets to run the view."""
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(key=key)
+    except IntegrityError:
+        return False
+    IdempotencyKey.objects.filter(created_at__lt=timezone.now() - timedelta(seconds=IDEMPOTENCY_TTL)).delete()
+    return True
+
+
+def _expired(row):
+    age = (timezone.now() - row.created_at).total_seconds()
+    # A pending row this old belongs to a request that died without clearing it
+    return age > IDEMPOTENCY_TTL or (row.status is None and age > IDEMPOTENCY_WAIT_S * 3)
+
+
+def _store(key, response):
+    IdempotencyKey.objects.filter(key=key).update(
+        status=response.status_code,
+        content=response.content,
+        headers=[(k, v) for k, v in response.items() if k.lower() != 'set-cookie'],
+    )
+
+
+def _replay(row):
+    response = HttpResponse(bytes(row.content), status=row.status)
+    for header, value in row.headers:
+        response[header] = value
+    response['Idempotent-Replay'] = 'true'
+    return response
+
+
+def idempotent(view):
+    """
+    Makes a POST view safe to repeat with the same idempotency key. Only
+    successful responses are kept, so a submission that failed validation can
+    be corrected and sent again with the same key. POSTs without a key run as
+    before.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method != 'POST':
+            return view(request, *args, **kwargs)
+        key = _request_key(request)
+        if key is None:
+            return view(request, *args, **kwargs)
+
+        # Only the first request inserts the key, concurrent repeats wait for its response
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_S
+        while not _claim(key):
+            row = IdempotencyKey.objects.filter(key=key).first()
+            if row is not None and _expired(row):
+                IdempotencyKey.objects.filter(pk=row.pk, created_at=row.created_at).delete()
+                continue
+            if row is not None and row.status is not None:
+                return _replay(row)
+            if time.monotonic() >= deadline:
+                return HttpResponse("This request is already being processed.", status=409)
+            time.sleep(IDEMPOTENCY_POLL_S)
+
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception:
+            IdempotencyKey.objects.filter(key=key).delete()
+            raise
+        if response.status_code < 400 and not response.streaming:
+            _store(key, response)
+        else:
+            IdempotencyKey.objects.filter(key=key).delete()
+        return response
+    return wrapper
@@ -1,3 +1,18 @@
 from django.db import models
 
-# Create your models here.
+
+class IdempotencyKey(models.Model):
+    """
+    A form submission's idempotency key (see workouts.idempotency). The unique
+    key lets exactly one INSERT win across every worker; once the view has run,
+    the row holds its response for repeats to replay. status is null while the
+    first request is still running.
+    """
+    key = models.CharField(max_length=255, unique=True)
+    status = models.PositiveSmallIntegerField(null=True, blank=True)
+    content = models.BinaryField(default=b'')
+    headers = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.key
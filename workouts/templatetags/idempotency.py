@@ -0,0 +1,15 @@
+from django import template
+from django.utils.html import format_html
+
+from workouts.idempotency import IDEMPOTENCY_FIELD, new_idempotency_key
+
+register = template.Library()
+
+
+@register.simple_tag
+def idempotency_key():
+    """
+    A hidden input carrying a fresh idempotency key for the surrounding form.
+    Usage: {% load idempotency %}{% idempotency_key %}
+    """
+    return format_html('<input type="hidden" name="{}" value="{}">', IDEMPOTENCY_FIELD, new_idempotency_key())
@@ -1,5 +1,5 @@
 from django.test import TestCase
-from workouts.utils import calculate_vdot, calculate_pace_from_vdot, calculate_tss, _solve_for_time
+from workouts.utils import calculate_vdot, calculate_pace_from_vdot, calculate_tss, calculate_actual_tss, _solve_for_time
 
 class WorkoutUtilsTest(TestCase):
     def test_calculate_vdot(self):
@@ -44,6 +44,17 @@ class WorkoutUtilsTest(TestCase):
         tss_valid = calculate_tss(54.55, [workout_segments[0]])
 
         self.assertEqual(tss_all, tss_valid)
+
+    def test_calculate_actual_tss_matches_planned(self):
+        # 10 x 400m run exactly at the planned Interval pace scores the same as the plan
+        pace = calculate_pace_from_vdot(54.55, 100.0, 400)['target_pace']
+        efforts = [{'distance': 400, 'time_s': pace['minutes'] * 60 + pace['seconds']}] * 10
+        planned = calculate_tss(54.55, [{'reps': 10, 'distance': 400, 'intensity': 'Interval'}])
+        self.assertEqual(calculate_actual_tss(54.55, efforts), planned)
+        # Running the same reps slower is less stressful
+        slower = [{'distance': 400, 'time_s': effort['time_s'] + 5} for effort in efforts]
+        self.assertLess(calculate_actual_tss(54.55, slower), planned)
+
     def test_solve_for_time(self):
         # Happy paths
         # A VDOT of 54.55 and distance of 5000m should result in roughly 18.5 minutes (18:30)
@@ -60,3 +71,46 @@ class WorkoutUtilsTest(TestCase):
         time_minutes_high = _solve_for_time(85, 5000)
         self.assertIsNotNone(time_minutes_high)
         self.assertAlmostEqual(time_minutes_high, 12.62, places=2)
+
+
+class IdempotencyKeyTest(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from workouts.idempotency import idempotent
+        self.user = User.objects.create_user(username='idem', password='password123')
+        self.calls = 0
+
+        def view(request):
+            self.calls += 1
+            return HttpResponse(f"call {self.calls}", status=201)
+
+        self.view = idempotent(view)
+        self.factory = RequestFactory()
+
+    def _post(self, key='once'):
+        request = self.factory.post('/submit/', {'idempotency_key': key})
+        request.user = self.user
+        return self.view(request)
+
+    def test_repeats_replay_the_stored_response(self):
+        from workouts.models import IdempotencyKey
+        first = self._post()
+        repeat = self._post()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual((repeat.status_code, repeat.content), (201, b"call 1"))
+        self.assertEqual(repeat['Idempotent-Replay'], 'true')
+        self.assertEqual(IdempotencyKey.objects.get().status, first.status_code)
+
+    def test_abandoned_claims_are_taken_over(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from workouts.idempotency import IDEMPOTENCY_WAIT_S
+        from workouts.models import IdempotencyKey
+        # A request that died after claiming the key, in any worker
+        IdempotencyKey.objects.create(key=f'idempotency:u{self.user.pk}:/submit/:once')
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(seconds=IDEMPOTENCY_WAIT_S * 4))
+
+        response = self._post()
+        self.assertEqual((response.status_code, self.calls), (201, 1))
@@ -250,6 +250,18 @@ def calculate_pace_from_vdot(vdot_score: float, target_intensity_percent: float,
     }
 
 
+def _threshold_velocity_mps(vdot_score: float) -> float:
+    """T-Pace velocity in m/s, the benchmark for TSS (Intensity Factor of 1.0)."""
+    threshold_intensity = TRAINING_ZONES["Threshold"]["max"]
+    return _get_velocity_from_vdot(vdot_score, threshold_intensity) / 60
+
+
+def _effort_tss(duration_s: float, velocity_mps: float, threshold_velocity_mps: float) -> float:
+    """TSS of running for duration_s at velocity_mps."""
+    intensity_factor = velocity_mps / threshold_velocity_mps
+    return (duration_s * velocity_mps * intensity_factor) / (threshold_velocity_mps * 3600) * 100
+
+
 def calculate_tss(vdot_score: float, workout_segments: list) -> int:
     """
     Calculates the Training Stress Score (TSS) for a workout.
@@ -258,12 +270,9 @@ def calculate_tss(vdot_score: float, workout_segments: list) -> int:
         return 0
 
     # 1. Determine the runner's Threshold Pace (velocity in m/s)
-    # T-Pace is the benchmark for TSS (Intensity Factor of 1.0)
-    threshold_intensity = TRAINING_ZONES["Threshold"]["max"]
-    threshold_velocity_mpm = _get_velocity_from_vdot(vdot_score, threshold_intensity)
-    if threshold_velocity_mpm <= 0:
+    threshold_velocity_mps = _threshold_velocity_mps(vdot_score)
+    if threshold_velocity_mps <= 0:
         return 0
-    threshold_velocity_mps = threshold_velocity_mpm / 60
 
     total_tss = 0
 
@@ -285,14 +294,28 @@ def calculate_tss(vdot_score: float, workout_segments: list) -> int:
             total_duration_s = time_per_rep_s * reps
 
             # 4. Calculate Intensity Factor (IF) and TSS for this segment
-            intensity_factor = segment_velocity_mps / threshold_velocity_mps
-            segment_tss = (total_duration_s * segment_velocity_mps * intensity_factor) / (
-                        threshold_velocity_mps * 3600) * 100
-
-            total_tss += segment_tss
+            total_tss += _effort_tss(total_duration_s, segment_velocity_mps, threshold_velocity_mps)
         except (ValueError, KeyError) as e:
             logger.warning(f"Skipping segment in TSS calculation due to invalid data: {e}")
             continue
 
     return round(total_tss)
 
+
+def calculate_actual_tss(vdot_score: float, efforts: list) -> int:
+    """
+    Calculates the TSS of efforts actually run, each a dict with 'distance' (m)
+    and 'time_s', using the same model as calculate_tss.
+    """
+    if vdot_score <= 0:
+        return 0
+    threshold_velocity_mps = _threshold_velocity_mps(vdot_score)
+    if threshold_velocity_mps <= 0:
+        return 0
+
+    total_tss = 0
+    for effort in efforts:
+        if effort['time_s'] <= 0:
+            continue
+        total_tss += _effort_tss(effort['time_s'], effort['distance'] / effort['time_s'], threshold_velocity_mps)
+    return round(total_tss)
@@ -70,7 +70,17 @@ def home_view(request):
 
 @login_required
 def profile_view(request):
-    if request.method == 'POST':
+    from communities.forms import TrainingGroupForm
+
+    group_form = TrainingGroupForm(instance=request.user.profile)
+    if request.method == 'POST' and 'training_group' in request.POST:
+        form = UserChangeForm(instance=request.user)
+        group_form = TrainingGroupForm(request.POST, instance=request.user.profile)
+        if group_form.is_valid():
+            group_form.save()
+            messages.success(request, 'Your training group and reminders have been updated.')
+            return redirect('profile')
+    elif request.method == 'POST':
         form = UserChangeForm(request.POST, instance=request.user)
         if form.is_valid():
             form.save()
@@ -78,4 +88,4 @@ def profile_view(request):
             return redirect('profile')
     else:
         form = UserChangeForm(instance=request.user)
-    return render(request, 'registration/profile.html', {'form': form})
+    return render(request, 'registration/profile.html', {'form': form, 'group_form': group_form})